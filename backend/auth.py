@@ -1,42 +1,32 @@
 """
 Authentication middleware for Clerk JWT verification
 """
+import hashlib
 import os
 import jwt
-import requests
-from functools import lru_cache
 from typing import Optional, Dict, Any
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from database import get_db
+from cache import SingleFlight, TTLCache
+from database import DATABASE_URL, get_db, route_request, shard_for_therapist
+from jwks import jwks_manager
 import sqlite3
 
 security = HTTPBearer()
 security_optional = HTTPBearer(auto_error=False)
 
+# clerk_user_id -> therapist record
+therapist_cache = TTLCache(
+    maxsize=int(os.getenv("THERAPIST_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("THERAPIST_CACHE_TTL", "300"))
+)
+_therapist_lookups = SingleFlight()
 
-@lru_cache(maxsize=1)
-def get_clerk_jwks() -> Dict[str, Any]:
-    """
-    Fetch Clerk's JSON Web Key Set (JWKS) for token verification
-    Cached to avoid repeated API calls
-    """
-    clerk_frontend_api = os.getenv('CLERK_FRONTEND_API')
-
-    if not clerk_frontend_api:
-        raise RuntimeError("CLERK_FRONTEND_API environment variable not set")
-
-    jwks_url = f"https://{clerk_frontend_api}/.well-known/jwks.json"
-
-    try:
-        response = requests.get(jwks_url, timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to fetch Clerk JWKS: {str(e)}"
-        )
+# sha256(token) -> clerk_user_id for tokens that already passed verification
+verified_tokens = TTLCache(
+    maxsize=int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("VERIFIED_TOKEN_CACHE_TTL", "300"))
+)
 
 
 def get_signing_key(token: str) -> str:
@@ -51,15 +41,11 @@ def get_signing_key(token: str) -> str:
         if not kid:
             raise HTTPException(status_code=401, detail="Token missing key ID")
 
-        # Get JWKS and find matching key
-        jwks = get_clerk_jwks()
-
-        for key in jwks.get('keys', []):
-            if key.get('kid') == kid:
-                # Convert JWK to PEM format for PyJWT
-                from jwt.algorithms import RSAAlgorithm
-                public_key = RSAAlgorithm.from_jwk(key)
-                return public_key
+        # Served from the prefetched key set; an unknown kid makes the
+        # manager refetch the JWKS (at most once per JWKS_MIN_REFETCH_SECONDS)
+        public_key = jwks_manager.get_key(kid)
+        if public_key is not None:
+            return public_key
 
         raise HTTPException(status_code=401, detail="Unable to find signing key")
 
@@ -67,7 +53,7 @@ def get_signing_key(token: str) -> str:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
 
-async def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
+def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)) -> str:
     """
     Verify Clerk JWT token and return clerk_user_id
 
@@ -76,6 +62,12 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Security(secu
     """
     token = credentials.credentials
 
+    # Repeat calls with the same bearer token skip the RSA verification
+    token_hash = hashlib.sha256(token.encode()).hexdigest()
+    clerk_user_id = verified_tokens.get(token_hash)
+    if clerk_user_id is not None:
+        return clerk_user_id
+
     try:
         # Get signing key
         signing_key = get_signing_key(token)
@@ -98,6 +90,9 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Security(secu
         if not clerk_user_id:
             raise HTTPException(status_code=401, detail="Token missing subject claim")
 
+        # Never serve the cached result past the token's own expiry
+        verified_tokens.set(token_hash, clerk_user_id, expires_at=payload.get('exp'))
+
         return clerk_user_id
 
     except jwt.ExpiredSignatureError:
@@ -108,21 +103,15 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Security(secu
         raise HTTPException(status_code=401, detail=f"Token verification failed: {str(e)}")
 
 
-async def get_current_therapist(clerk_user_id: str = Depends(verify_token)) -> Dict[str, Any]:
+def load_therapist(clerk_user_id: str) -> Dict[str, Any]:
     """
     Get or create therapist record from clerk_user_id
 
     This function auto-syncs therapist records:
     - If therapist exists, return their record
     - If therapist doesn't exist, create a new record
-
-    Args:
-        clerk_user_id: The Clerk user ID from the verified token
-
-    Returns:
-        Therapist database record as dictionary
     """
-    with get_db() as conn:
+    with get_db(DATABASE_URL) as conn:
         cursor = conn.cursor()
 
         # Try to find existing therapist
@@ -141,8 +130,9 @@ async def get_current_therapist(clerk_user_id: str = Depends(verify_token)) -> D
         # Note: practice_type will be NULL initially and set via:
         # 1. Clerk sign-up form (new users) - synced via PATCH endpoint
         # 2. Migration modal (existing users) - updated via PATCH endpoint
+        # OR IGNORE makes a first login racing in another worker harmless
         cursor.execute("""
-            INSERT INTO therapists (clerk_user_id, email, first_name, last_name, practice_type)
+            INSERT OR IGNORE INTO therapists (clerk_user_id, email, first_name, last_name, practice_type)
             VALUES (?, ?, ?, ?, ?)
         """, (
             clerk_user_id,
@@ -154,8 +144,8 @@ async def get_current_therapist(clerk_user_id: str = Depends(verify_token)) -> D
 
         # Get the newly created record
         cursor.execute(
-            "SELECT * FROM therapists WHERE id = ?",
-            (cursor.lastrowid,)
+            "SELECT * FROM therapists WHERE clerk_user_id = ?",
+            (clerk_user_id,)
         )
 
         new_therapist = cursor.fetchone()
@@ -166,8 +156,52 @@ async def get_current_therapist(clerk_user_id: str = Depends(verify_token)) -> D
         return dict(new_therapist)
 
 
+def _load_and_cache_therapist(clerk_user_id: str) -> Dict[str, Any]:
+    therapist = therapist_cache.get(clerk_user_id)
+    if therapist is None:
+        therapist = load_therapist(clerk_user_id)
+        therapist_cache.set(clerk_user_id, therapist)
+    return therapist
+
+
+def get_current_therapist(clerk_user_id: str = Depends(verify_token)) -> Dict[str, Any]:
+    """
+    Get (or create, on first login) the therapist record for clerk_user_id
+
+    Served from an in-process cache; concurrent misses for the same user
+    share a single lookup, so a first login only ever inserts once.
+
+    Args:
+        clerk_user_id: The Clerk user ID from the verified token
+
+    Returns:
+        Therapist database record as dictionary
+    """
+    therapist = therapist_cache.get(clerk_user_id)
+    if therapist is None:
+        therapist = _therapist_lookups.do(
+            clerk_user_id, lambda: _load_and_cache_therapist(clerk_user_id)
+        )
+
+    # The rest of the request reads and writes this therapist's shard
+    route_request(shard_for_therapist(therapist['id']))
+
+    # Callers get their own copy; the cached record must stay pristine
+    return dict(therapist)
+
+
+def invalidate_therapist(clerk_user_id: str) -> None:
+    """Drop a cached therapist record after it has been written to"""
+    therapist_cache.pop(clerk_user_id)
+
+
+def get_current_therapist_id(therapist: Dict[str, Any] = Depends(get_current_therapist)) -> int:
+    """Return just the authenticated therapist's ID"""
+    return therapist['id']
+
+
 # Optional: For endpoints that should work without authentication (for testing)
-async def get_current_therapist_optional(
+def get_current_therapist_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Security(security_optional)
 ) -> Optional[Dict[str, Any]]:
     """
@@ -178,7 +212,7 @@ async def get_current_therapist_optional(
         return None
 
     try:
-        clerk_user_id = await verify_token(credentials)
-        return await get_current_therapist(clerk_user_id)
+        clerk_user_id = verify_token(credentials)
+        return get_current_therapist(clerk_user_id)
     except HTTPException:
         return None
@@ -0,0 +1,10 @@
+"""
+Benchmarks for the backend
+
+Each module is a script, run from backend/ so the app modules import:
+
+    python -m bench.<name> [--help]
+
+They work on scratch databases in temporary directories and share the
+helpers in bench.common. The app never imports this package.
+"""
@@ -0,0 +1,82 @@
+"""
+Benchmark broadcasting one message against sending it per recipient
+
+Seeds a scratch database with one therapist's clients and sends the same
+note to N of them two ways, with all triggers in place:
+
+  per-recipient  what POST /api/messages once per client costs in the
+                 database: an INSERT, a SELECT of the new row and a
+                 commit per recipient, content stored N times
+  broadcast      POST /api/messages/broadcast: the recipient check, one
+                 message_bodies row, executemany of the N rows and one
+                 commit
+
+Reports the time per broadcast and the database growth of each.
+
+Usage:
+    python -m bench.broadcast [--recipients N] [--repeat R]
+"""
+import json
+
+from bench.common import argument_parser, database_bytes, insert_clients, median_ms, scratch_connection
+
+NOTE = ("Reminder: the office is closed on Monday for the holiday. Sessions "
+        "move to Tuesday at the same time. Here is the breathing worksheet "
+        "we discussed; try it twice a day this week. ") * 4
+
+ATTACHMENTS = json.dumps([{"type": "pdf", "url": "/api/uploads/worksheet.pdf",
+                           "filename": "Breathing worksheet.pdf", "size": 182311}])
+
+
+def per_recipient(conn, recipients) -> None:
+    for client_id in recipients:
+        cursor = conn.execute(
+            "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content, attachments)"
+            " VALUES (1, 'therapist', ?, 'client', ?, ?)", (client_id, NOTE, ATTACHMENTS)
+        )
+        conn.execute("SELECT * FROM messages WHERE id = ?", (cursor.lastrowid,)).fetchone()
+        conn.commit()
+
+
+def broadcast(conn, recipients) -> None:
+    missing = conn.execute(
+        "SELECT value FROM json_each(?) WHERE value NOT IN (SELECT id FROM clients WHERE therapist_id = 1)",
+        (json.dumps(list(recipients)),)
+    ).fetchall()
+    assert not missing
+    body_id = conn.execute(
+        "INSERT INTO message_bodies (content, attachments) VALUES (?, ?)", (NOTE, ATTACHMENTS)
+    ).lastrowid
+    conn.executemany(
+        "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content, body_id)"
+        " VALUES (1, 'therapist', ?, 'client', '', ?)", [(client_id, body_id) for client_id in recipients]
+    )
+    conn.execute(
+        "SELECT m.*, b.content FROM messages m JOIN message_bodies b ON b.id = m.body_id WHERE m.body_id = ?",
+        (body_id,)
+    ).fetchall()
+    conn.commit()
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--recipients", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    recipients = range(1, args.recipients + 1)
+    for name, send in (("per-recipient", per_recipient), ("broadcast", broadcast)):
+        with scratch_connection() as conn:
+            insert_clients(conn, [(i, 1) for i in recipients])
+            conn.commit()
+
+            before = database_bytes(conn)
+            ms, _ = median_ms(lambda: send(conn, recipients), args.repeat)
+            growth = (database_bytes(conn) - before) / args.repeat
+
+            print(f"{name:>13}: {ms:8.1f} ms per send to {args.recipients} clients,"
+                  f" database grows {growth / 1024:7.1f} KiB per send")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from database import open_connection
+from migrations import run_migrations
+
+
+def argument_parser(doc: str) -> argparse.ArgumentParser:
+    """Parser described by the first line of a script's docstring"""
+    return argparse.ArgumentParser(description=doc.strip().splitlines()[0])
+
+
+@contextmanager
+def scratch_database(name: str = "bench.db") -> Iterator[str]:
+    """Path of a freshly migrated database in a temporary directory"""
+    with tempfile.TemporaryDirectory() as scratch:
+        database = os.path.join(scratch, name)
+        run_migrations(database)
+        yield database
+
+
+@contextmanager
+def scratch_connection() -> Iterator[Any]:
+    """A configured connection to a scratch database, closed afterwards"""
+    with scratch_database() as database:
+        conn = open_connection(database)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+
+def insert_clients(conn, rows: Iterable[Tuple[int, int]]) -> None:
+    """Placeholder clients from (id, therapist_id) pairs"""
+    conn.executemany(
+        "INSERT INTO clients (id, first_name, last_name, date_of_birth, therapist_id)"
+        " VALUES (?, 'First', 'Last', '1990-01-01', ?)", rows
+    )
+
+
+def median_ms(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Median wall time of repeat calls in milliseconds, and the last result"""
+    timings = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), result
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def rss_mib() -> float:
+    """Resident memory of this process"""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def database_bytes(conn) -> int:
+    """Bytes in use by a database after checkpointing its WAL"""
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("PRAGMA page_count").fetchone()[0] - conn.execute("PRAGMA freelist_count").fetchone()[0]
+    return page_size * pages
+
+
+@contextmanager
+def serve(app, port: int) -> Iterator[str]:
+    """Run an ASGI app under uvicorn on a background thread; yields its base URL"""
+    import uvicorn
+
+    # Benchmark clients pause between requests; a stalled event loop would
+    # otherwise expire their keep-alive just as the next request arrives
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", timeout_keep_alive=300)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+@contextmanager
+def serve_app(port: int) -> Iterator[str]:
+    """
+    Run main.app in a scratch directory with every request authenticated
+    as therapist user_1 (id 1); yields its base URL
+
+    The app's databases are created in the scratch directory, which is
+    also the working directory until the server stops.
+    """
+    import requests
+
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)
+        try:
+            import auth
+            import main  # After the chdir: importing the routes creates uploads/
+            main.app.dependency_overrides[auth.verify_token] = lambda: "user_1"
+            with serve(main.app, port) as base_url:
+                requests.post(f"{base_url}/api/auth/sync").raise_for_status()
+                yield base_url
+        finally:
+            os.chdir(previous)
+
+
+def load(base_url: str, plan: Sequence[Tuple[str, int, float]], seconds: float) -> Dict[str, List[float]]:
+    """
+    Request latencies (ms) per path under concurrent load
+
+    plan lists (path, clients, pause): each client is one connection
+    sending GETs for its path for `seconds`, waiting `pause` seconds after
+    each response (0: back to back). Paced clients start at random points
+    within their first pause, so they do not all arrive at once.
+    """
+    import httpx
+
+    async def client(http, path: str, pause: float, deadline: float, latencies: List[float]) -> None:
+        await asyncio.sleep(random.uniform(0, pause))
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            (await http.get(path)).raise_for_status()
+            latencies.append((time.perf_counter() - started) * 1000)
+            if pause:
+                await asyncio.sleep(pause)
+
+    async def run() -> Dict[str, List[float]]:
+        connections = sum(clients for _, clients, _ in plan)
+        limits = httpx.Limits(max_connections=connections, max_keepalive_connections=connections)
+        results = {path: [] for path, _, _ in plan}
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+            deadline = time.perf_counter() + seconds
+            await asyncio.gather(*(
+                client(http, path, pause, deadline, results[path])
+                for path, clients, pause in plan for _ in range(clients)
+            ))
+        return results
+
+    return asyncio.run(run())
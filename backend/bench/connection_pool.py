@@ -0,0 +1,86 @@
+"""
+Benchmark requests per second with and without the connection pool
+
+Runs the app under uvicorn in a scratch directory with one therapist's
+clients and sessions seeded, and loads /api/clients and /api/sessions from
+concurrent clients twice:
+
+  connect  what get_db did before the pool: a fresh sqlite3.connect() per
+           call, closed afterwards, on a rollback-journal database
+  pool     the app as it is: WAL, the connection PRAGMAs and pooled,
+           reused connections
+
+Usage:
+    python -m bench.connection_pool [--clients N] [--seconds S]
+"""
+import sqlite3
+import statistics
+
+import database
+from bench.common import argument_parser, insert_clients, load, serve_app
+from session_content import deflate, inflate
+
+PORT = 8797
+
+
+class ConnectPerCall(database.ConnectionPool):
+    """Stands in for the pool: one new connection per acquire(), closed on release()"""
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.database, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        # The routes read compressed session text through these
+        conn.create_function("inflate", 1, inflate, deterministic=True)
+        conn.create_function("deflate", 1, deflate, deterministic=True)
+        return conn
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        conn.close()
+
+
+def seed(path: str, clients: int, sessions: int) -> None:
+    conn = database.open_connection(path)
+    insert_clients(conn, [(i, 1) for i in range(1, clients + 1)])
+    conn.executemany(
+        "INSERT INTO sessions (client_id, session_date, session_time, duration_minutes, status,"
+        " session_summary, therapist_id) VALUES (?, ?, '10:00', 50, 'completed', 'Summary', 1)",
+        [(i % clients + 1, f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(sessions)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(base_url: str, clients: int, seconds: float) -> dict:
+    results = {}
+    for path in ("/api/clients?limit=20", "/api/sessions?limit=20"):
+        latencies = load(base_url, [(path, clients, 0)], seconds)[path]
+        results[path] = (len(latencies) / seconds, statistics.median(latencies))
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    with serve_app(PORT) as base_url:
+        seed(database.DATABASE_URL, 200, 5_000)
+        pooled = run(base_url, args.clients, args.seconds)
+
+        database.close_pools()
+        conn = sqlite3.connect(database.DATABASE_URL)
+        assert conn.execute("PRAGMA journal_mode = DELETE").fetchone()[0] == "delete"
+        conn.close()
+        database._pools[database.DATABASE_URL] = ConnectPerCall(database.DATABASE_URL)
+        unpooled = run(base_url, args.clients, args.seconds)
+
+    print(f"{args.clients} concurrent clients, {args.seconds:.0f} s per run")
+    for path in pooled:
+        (old_rps, old_ms), (new_rps, new_ms) = unpooled[path], pooled[path]
+        print(f"{path:>24}: connect {old_rps:6.0f} req/s, median {old_ms:5.1f} ms"
+              f" | pool {new_rps:6.0f} req/s, median {new_ms:5.1f} ms | {new_rps / old_rps:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
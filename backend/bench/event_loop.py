@@ -0,0 +1,115 @@
+"""
+Benchmark latency under 200 parallel clients, handlers on and off the event loop
+
+Runs the app under uvicorn in a child process, in a scratch directory with
+a large caseload seeded. N clients each request a page of clients every
+`interval` seconds while one more requests a slow page of sessions (their
+compressed notes and clinical observations inflated) every 0.25 seconds.
+The latency of the fast requests is reported for two versions of the same
+two routes:
+
+  async def  the handlers as they were before: async def functions
+             running sqlite3 directly on the event loop
+  def        the app's routes, run on the threadpool
+
+Usage:
+    python -m bench.event_loop [--clients N] [--interval I] [--seconds S]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict
+
+from fastapi import Depends
+
+import database
+from bench.common import argument_parser, insert_clients, load, percentile, serve_app
+from session_content import deflate
+
+PORT = 8796
+
+FAST = "clients?limit=20"
+SLOW = "sessions?limit=500&fields=notes,clinical_observations"
+
+NOTES = "Client described the week, sleep, work stress and the breathing practice. " * 30
+
+
+def seed(path: str, clients: int, sessions: int) -> None:
+    conn = database.open_connection(path)
+    insert_clients(conn, [(i, 1) for i in range(1, clients + 1)])
+    conn.executemany(
+        "INSERT INTO sessions (id, client_id, session_date, session_time, duration_minutes, status,"
+        " therapist_id) VALUES (?, ?, ?, '10:00', 50, 'completed', 1)",
+        [(i, i % clients + 1, f"20{i % 10 + 15}-{i % 12 + 1:02d}-{i % 28 + 1:02d}") for i in range(1, sessions + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO session_content (session_id, notes, clinical_observations) VALUES (?, ?, ?)",
+        [(i, deflate(NOTES), deflate(NOTES)) for i in range(1, sessions + 1)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def add_blocking_routes(app) -> None:
+    """The two routes as async def handlers that query on the event loop"""
+    from auth import get_current_therapist
+    from main import fetch_clients_page, fetch_sessions_page
+
+    @app.get("/blocking/clients")
+    async def blocking_clients(limit: int, therapist: Dict[str, Any] = Depends(get_current_therapist)):
+        with database.get_db() as conn:
+            return fetch_clients_page(conn, therapist['id'], limit=limit)[0]
+
+    @app.get("/blocking/sessions")
+    async def blocking_sessions(limit: int, fields: str, therapist: Dict[str, Any] = Depends(get_current_therapist)):
+        with database.get_db() as conn:
+            return fetch_sessions_page(conn, therapist['id'], fields=fields, limit=limit)[0]
+
+
+def serve() -> None:
+    """Child process: serve the app until stdin closes"""
+    with serve_app(PORT):
+        import main as app_module
+        add_blocking_routes(app_module.app)
+        seed(database.DATABASE_URL, 500, 20_000)
+        print("ready", flush=True)
+        sys.stdin.read()
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=4.0)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve:
+        return serve()
+
+    # The server gets a process of its own, so the load generator does not
+    # compete with it for the GIL
+    server = subprocess.Popen(
+        [sys.executable, "-m", "bench.event_loop", "--serve"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        while server.stdout.readline().strip() != "ready":
+            if server.poll() is not None:
+                raise RuntimeError("The server process exited")
+
+        base_url = f"http://127.0.0.1:{PORT}"
+        print(f"{args.clients} clients on /{FAST} every {args.interval:g} s, 1 on /{SLOW} every 0.25 s,"
+              f" {args.seconds:.0f} s per run")
+        for name, prefix in (("async def", "/blocking/"), ("def", "/api/")):
+            results = load(base_url, [(prefix + FAST, args.clients, args.interval), (prefix + SLOW, 1, 0.25)], args.seconds)
+            fast, slow = results[prefix + FAST], results[prefix + SLOW]
+            print(f"{name:>9}: fast p50 {statistics.median(fast):7.1f} ms, p99 {percentile(fast, 0.99):7.1f} ms"
+                  f" | slow p50 {statistics.median(slow):6.1f} ms, {len(slow)} done")
+    finally:
+        server.stdin.close()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
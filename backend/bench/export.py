@@ -0,0 +1,129 @@
+"""
+Benchmark the streamed export against building it in memory
+
+Seeds a scratch database with one therapist's sessions (with compressed
+content), todos and messages, then exports it two ways at a few sizes and
+reports the peak Python heap (tracemalloc) and throughput:
+
+  fetchall  every table read with fetchall() and serialized into one
+            body, as a JSON endpoint returning the whole practice would
+  stream    export_routes.stream_export: cursors read row by row, NDJSON
+            sent in CHUNK_SIZE chunks
+
+The streamed export is then run again while a second connection keeps
+committing updates, to show its read snapshot does not block writers.
+
+Usage:
+    python -m bench.export [--sizes N,N,...]
+"""
+import json
+import threading
+import time
+import tracemalloc
+
+import export_routes
+from bench.common import argument_parser, insert_clients, scratch_database
+from database import get_pool, open_connection
+from session_content import deflate
+
+THERAPIST = {'id': 1, 'clerk_user_id': 'user_1', 'email': 'bench@example.com'}
+
+TEXT = "The client described a week of improved sleep and fewer panic episodes. " * 20
+
+
+def seed(conn, sessions: int) -> None:
+    insert_clients(conn, [(i, 1) for i in range(1, 101)])
+    for start in range(0, sessions, 5_000):
+        ids = range(start + 1, min(start + 5_000, sessions) + 1)
+        conn.executemany(
+            "INSERT INTO sessions (id, client_id, session_date, duration_minutes, status,"
+            " session_summary, interventions, therapist_id)"
+            " VALUES (?, ?, '2024-01-01', 50, 'completed', 'Summary', '[\"CBT\"]', 1)",
+            [(i, i % 100 + 1) for i in ids]
+        )
+        conn.executemany(
+            "INSERT INTO session_content (session_id, notes, ai_assisted_data) VALUES (?, ?, ?)",
+            [(i, deflate(TEXT), deflate(json.dumps({"transcript": TEXT}))) for i in ids]
+        )
+        conn.executemany(
+            "INSERT INTO todos (client_id, therapist_id, text) VALUES (?, 1, 'Practice breathing')",
+            [(i % 100 + 1,) for i in ids]
+        )
+        conn.executemany(
+            "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content)"
+            " VALUES (1, 'therapist', ?, 'client', 'See you next week')",
+            [(i % 100 + 1,) for i in ids]
+        )
+        conn.commit()
+
+
+def export_fetchall(database: str) -> int:
+    conn = open_connection(database)
+    records = [('therapist', THERAPIST)]
+    for record_type, query in (
+        ('client', "SELECT * FROM clients WHERE therapist_id = 1"),
+        ('session', "SELECT s.*, inflate(sc.notes) AS notes, inflate(sc.ai_assisted_data) AS ai_assisted_data"
+                    " FROM sessions s LEFT JOIN session_content sc ON sc.session_id = s.id"
+                    " WHERE s.therapist_id = 1"),
+        ('todo', "SELECT * FROM todos WHERE therapist_id = 1"),
+        ('message', "SELECT * FROM messages WHERE sender_id = 1 AND sender_type = 'therapist'"),
+    ):
+        records.extend((record_type, dict(row)) for row in conn.execute(query).fetchall())
+    body = "\n".join(json.dumps({'type': t, 'data': d}, default=str) for t, d in records).encode()
+    conn.close()
+    return len(body)
+
+
+def export_stream(database: str) -> int:
+    return sum(len(chunk) for chunk in export_routes.stream_export(database, THERAPIST, False))
+
+
+def measure(fn, database: str):
+    tracemalloc.start()
+    started = time.perf_counter()
+    size = fn(database)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return size, elapsed, peak
+
+
+def concurrent_writes(database: str, stop: threading.Event, counts: list) -> None:
+    conn = open_connection(database)
+    while not stop.is_set():
+        conn.execute("UPDATE clients SET phone = ? WHERE id = 1", (str(time.time()),))
+        conn.commit()
+        counts[0] += 1
+    conn.close()
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--sizes", default="10000,40000")
+    args = parser.parse_args()
+
+    for sessions in (int(size) for size in args.sizes.split(',')):
+        with scratch_database() as database:
+            conn = open_connection(database)
+            seed(conn, sessions)
+            conn.close()
+
+            _, old_time, old_peak = measure(export_fetchall, database)
+            size, new_time, new_peak = measure(export_stream, database)
+
+            stop, counts = threading.Event(), [0]
+            writer = threading.Thread(target=concurrent_writes, args=(database, stop, counts))
+            writer.start()
+            export_stream(database)
+            stop.set()
+            writer.join()
+
+            print(f"{sessions:>7} sessions, {size / 2**20:6.0f} MiB NDJSON |"
+                  f" fetchall peak {old_peak / 2**20:7.1f} MiB, {old_time:5.1f} s |"
+                  f" stream peak {new_peak / 2**20:5.1f} MiB, {new_time:5.1f} s,"
+                  f" {counts[0]} writes committed during a second export")
+            get_pool(database).close()
+
+
+if __name__ == "__main__":
+    main()
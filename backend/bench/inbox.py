@@ -0,0 +1,120 @@
+"""
+Benchmark the conversations table against deriving threads from messages
+
+Seeds a scratch database with messages between therapists and their
+clients (a share of them unread) and compares, per request:
+
+  unread badge  COUNT(*) over the therapist's unread messages (the old
+                query, on the partial idx_messages_unread) against one
+                inbox_unread row
+  inbox         threads grouped out of the therapist's messages, with the
+                last message and unread counts, against one range of
+                idx_conversations_inbox
+
+It also reports what the triggers add to sending a message (one
+committed insert per send, as send_message does).
+
+Usage:
+    python -m bench.inbox [--messages N] [--therapists T] [--repeat R]
+"""
+import random
+import time
+
+from bench.common import argument_parser, insert_clients, median_ms, scratch_connection
+
+DERIVED_INBOX = """
+    SELECT other_party_id, other_party_type, MAX(id) AS last_message_id,
+           SUM(unread) AS unread_count, SUM(other_party_unread) AS other_party_unread
+    FROM (
+        SELECT recipient_id AS other_party_id, recipient_type AS other_party_type, id,
+               0 AS unread, read = 0 AS other_party_unread
+        FROM messages WHERE sender_id = ?1 AND sender_type = 'therapist'
+        UNION ALL
+        SELECT sender_id, sender_type, id, read = 0, 0
+        FROM messages WHERE recipient_id = ?1 AND recipient_type = 'therapist'
+    )
+    GROUP BY other_party_id, other_party_type
+    ORDER BY last_message_id DESC
+    LIMIT 100
+"""
+
+INBOX = """
+    SELECT cv.*, c.first_name, c.last_name
+    FROM conversations cv
+    LEFT JOIN clients c ON cv.other_party_type = 'client' AND c.id = cv.other_party_id
+    WHERE cv.therapist_id = ?
+    ORDER BY cv.last_message_id DESC LIMIT 100
+"""
+
+
+def message_rows(count: int, therapists: int):
+    for _ in range(count):
+        therapist = random.randint(1, therapists)
+        client = therapist * 1000 + random.randint(1, 60)
+        if random.random() < 0.5:
+            yield therapist, 'therapist', client, 'client', random.random() < 0.1
+        else:
+            yield client, 'client', therapist, 'therapist', random.random() < 0.05
+
+
+def seed(conn, count: int, therapists: int) -> None:
+    insert_clients(conn, [(t * 1000 + n, t) for t in range(1, therapists + 1) for n in range(1, 61)])
+    conn.executemany(
+        "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content, read)"
+        " VALUES (?, ?, ?, ?, 'Thanks, see you Thursday', ?)",
+        ((s, st, r, rt, 0 if unread else 1) for s, st, r, rt, unread in message_rows(count, therapists))
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def sends_per_second(conn, sends: int, therapists: int) -> float:
+    rows = list(message_rows(sends, therapists))
+    started = time.perf_counter()
+    for sender, sender_type, recipient, recipient_type, _ in rows:
+        conn.execute(
+            "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content)"
+            " VALUES (?, ?, ?, ?, 'Running late, be there at 3:10')",
+            (sender, sender_type, recipient, recipient_type)
+        )
+        conn.commit()
+    return sends / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--therapists", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with scratch_connection() as conn:
+        seed(conn, args.messages, args.therapists)
+        print(f"{args.messages} messages over {args.therapists} therapists")
+
+        old_ms, old = median_ms(lambda: conn.execute(
+            "SELECT COUNT(*) FROM messages WHERE recipient_id = ? AND recipient_type = 'therapist' AND read = 0",
+            (1,)).fetchone()[0], args.repeat)
+        new_ms, new = median_ms(lambda: conn.execute(
+            "SELECT unread_count FROM inbox_unread WHERE therapist_id = ?", (1,)).fetchone()[0], args.repeat)
+        assert old == new
+        print(f"unread badge ({new}): COUNT(*) {old_ms:7.3f} ms | inbox_unread {new_ms:7.3f} ms"
+              f" | {old_ms / new_ms:6.1f}x")
+
+        old_ms, old = median_ms(lambda: conn.execute(DERIVED_INBOX, (1,)).fetchall(), args.repeat)
+        new_ms, new = median_ms(lambda: conn.execute(INBOX, (1,)).fetchall(), args.repeat)
+        assert [(r['other_party_id'], r['unread_count']) for r in old] == \
+               [(r['other_party_id'], r['unread_count']) for r in new]
+        print(f"inbox ({len(new)} threads): derived {old_ms:7.2f} ms | conversations {new_ms:7.3f} ms"
+              f" | {old_ms / new_ms:6.1f}x")
+
+        with_triggers = sends_per_second(conn, 2_000, args.therapists)
+        for name in ("conversations_message_insert", "conversations_message_read",
+                     "conversations_message_delete"):
+            conn.execute(f"DROP TRIGGER {name}")
+        without = sends_per_second(conn, 2_000, args.therapists)
+        print(f"send_message insert: {without:6.0f}/s without the triggers | {with_triggers:6.0f}/s with")
+
+
+if __name__ == "__main__":
+    main()
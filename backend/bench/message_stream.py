@@ -0,0 +1,108 @@
+"""
+Benchmark /api/messages/stream with many idle connections
+
+Runs the app under uvicorn in a scratch directory (token verification
+overridden for a single therapist), opens N concurrent streams on one
+thread, then sends messages and measures how long each takes to reach
+every stream. Reports the memory each idle stream costs and, for
+comparison, what N threads polling get_message_thread every 10 seconds
+would cost.
+
+Usage:
+    python -m bench.message_stream [--streams N] [--messages M]
+"""
+import asyncio
+import statistics
+import time
+
+import requests
+
+from bench.common import argument_parser, median_ms, rss_mib, serve_app
+from message_hub import hub
+
+PORT = 8799
+BASE_URL = f"http://127.0.0.1:{PORT}"
+POLL_INTERVAL_SECONDS = 10
+
+
+async def open_stream(client_id: int, last_event_id: int):
+    reader, writer = await asyncio.open_connection("127.0.0.1", PORT)
+    writer.write(
+        f"GET /api/messages/stream?other_party_id={client_id} HTTP/1.1\r\n"
+        f"Host: 127.0.0.1\r\nLast-Event-ID: {last_event_id}\r\n\r\n".encode()
+    )
+    await writer.drain()
+    while not (await reader.readline()).startswith(b"retry:"):
+        pass
+    return reader, writer
+
+
+async def wait_for_message(reader, content: str) -> float:
+    needle = content.encode()
+    while True:
+        line = await reader.readline()
+        if not line:
+            raise ConnectionError("stream closed")
+        if needle in line:
+            return time.perf_counter()
+
+
+async def run(streams: int, messages: int) -> None:
+    session = requests.Session()
+    client_id = session.post(f"{BASE_URL}/api/clients", json={
+        "first_name": "Bench", "last_name": "Client", "date_of_birth": "1990-01-01"
+    }).json()["id"]
+    for n in range(200):
+        session.post(f"{BASE_URL}/api/messages", json={
+            "recipient_id": client_id, "recipient_type": "client", "content": f"History {n}"
+        })
+    last_id = session.get(
+        f"{BASE_URL}/api/messages/thread/{client_id}", params={"other_party_type": "client"}
+    ).json()[-1]["id"]
+
+    loop = asyncio.get_running_loop()
+    before = rss_mib()
+    started = time.perf_counter()
+    connections = await asyncio.gather(*(open_stream(client_id, last_id) for _ in range(streams)))
+    print(f"{streams} streams open in {time.perf_counter() - started:.1f} s, "
+          f"{(rss_mib() - before) * 1024 / streams:.1f} KiB each (server and bench client)")
+
+    latencies = []
+    for n in range(messages):
+        content = f"Broadcast {n}"
+        waiters = [asyncio.ensure_future(wait_for_message(reader, content)) for reader, _ in connections]
+        sent = time.perf_counter()
+        await loop.run_in_executor(None, lambda: session.post(f"{BASE_URL}/api/messages", json={
+            "recipient_id": client_id, "recipient_type": "client", "content": content
+        }).raise_for_status())
+        arrivals = await asyncio.gather(*waiters)
+        latencies.append((max(arrivals) - sent) * 1000)
+    print(f"message to all {streams} streams: median {statistics.median(latencies):.0f} ms,"
+          f" worst {max(latencies):.0f} ms")
+
+    for _, writer in connections:
+        writer.close()
+    await asyncio.sleep(1)
+    print(f"subscriptions left after the clients disconnected: {hub.subscriber_count()}")
+
+    # Polling comparison: one full-thread fetch, as each open thread did every 10 s
+    per_poll_ms, _ = median_ms(lambda: session.get(
+        f"{BASE_URL}/api/messages/thread/{client_id}", params={"other_party_type": "client"}
+    ), 20)
+    print(f"polling instead: {streams / POLL_INTERVAL_SECONDS:.0f} thread fetches/s at"
+          f" {per_poll_ms:.1f} ms each = {streams / POLL_INTERVAL_SECONDS * per_poll_ms / 1000:.1f}"
+          f" worker-seconds per second, idle or not")
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--streams", type=int, default=2000)
+    parser.add_argument("--messages", type=int, default=5)
+    args = parser.parse_args()
+
+    with serve_app(PORT):
+        asyncio.run(run(args.streams, args.messages))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark message thread reads: whole history against id cursors
+
+Seeds a scratch database with one long thread among many others and
+times, per request:
+
+  full     the old get_message_thread query: the whole thread (OR of both
+           directions, ordered by created_at)
+  latest   fetch_thread_messages(newest=True): the latest page
+  after    fetch_thread_messages(after_id=...): catching up on 5 new messages
+  before   fetch_thread_messages(before_id=...): one page of history from
+           the middle of the thread
+
+Usage:
+    python -m bench.message_thread [--thread N] [--others N] [--repeat R]
+"""
+from bench.common import argument_parser, median_ms, scratch_connection
+from communication_routes import fetch_thread_messages, message_from_row
+from pagination import PAGE_SIZE
+
+FULL_THREAD = """
+    SELECT * FROM messages
+    WHERE (sender_id = ? AND sender_type = 'therapist' AND recipient_id = ? AND recipient_type = ?)
+    OR (sender_id = ? AND sender_type = ? AND recipient_id = ? AND recipient_type = 'therapist')
+    ORDER BY created_at ASC
+"""
+
+
+def seed(conn, thread: int, others: int) -> None:
+    rows = []
+    for n in range(thread + others):
+        if n % ((thread + others) // thread) == 0:
+            # Therapist 1 and client 1, alternating sides
+            rows.append((1, 'therapist', 1, 'client') if n % 2 else (1, 'client', 1, 'therapist'))
+        else:
+            client = n % 500 + 2
+            rows.append((n % 50 + 1, 'therapist', client, 'client'))
+    conn.executemany(
+        "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content)"
+        " VALUES (?, ?, ?, ?, 'How did the breathing exercise go this week?')", rows
+    )
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--thread", type=int, default=20_000)
+    parser.add_argument("--others", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with scratch_connection() as conn:
+        seed(conn, args.thread, args.others)
+
+        thread_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM messages WHERE (sender_id = 1 AND sender_type = 'therapist' AND recipient_id = 1)"
+            " OR (sender_id = 1 AND sender_type = 'client' AND recipient_id = 1) ORDER BY id"
+        )]
+        print(f"thread of {len(thread_ids)} messages among {args.thread + args.others}")
+
+        cases = {
+            "full": lambda: [message_from_row(row) for row in conn.execute(
+                FULL_THREAD, (1, 1, 'client', 1, 'client', 1)).fetchall()],
+            "latest": lambda: fetch_thread_messages(conn, 1, 1, 'client', limit=PAGE_SIZE + 1, newest=True),
+            "after": lambda: fetch_thread_messages(conn, 1, 1, 'client', after_id=thread_ids[-6],
+                                                   limit=PAGE_SIZE + 1),
+            "before": lambda: fetch_thread_messages(conn, 1, 1, 'client', before_id=thread_ids[len(thread_ids) // 2],
+                                                    limit=PAGE_SIZE + 1, newest=True),
+        }
+        baseline = None
+        for name, fn in cases.items():
+            ms, messages = median_ms(fn, args.repeat)
+            baseline = baseline or ms
+            print(f"{name:>7}: {ms:8.2f} ms, {len(messages):6d} messages | {baseline / ms:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark the calendar range query against fetch-all-and-filter
+
+Seeds a scratch database with one therapist holding a large caseload, then
+compares, for a one-week and a one-month window of scheduled sessions:
+
+  fetch-all  what the Dashboard used to do: load every session of the
+             therapist (full rows, JSON fields parsed) and filter by date
+             and status afterwards
+  range      the /api/sessions/range query on idx_sessions_therapist_keyset
+
+Usage:
+    python -m bench.session_range [--sessions N] [--repeat R]
+"""
+import json
+import random
+import sqlite3
+from datetime import date, timedelta
+
+from bench.common import argument_parser, median_ms, scratch_connection
+
+FETCH_ALL = """
+    SELECT s.* FROM sessions s
+    JOIN clients c ON s.client_id = c.id
+    WHERE c.therapist_id = ?
+    ORDER BY s.session_date DESC
+"""
+
+RANGE = """
+    SELECT
+        s.id, s.client_id, s.session_date, s.session_time,
+        s.duration_minutes, s.status,
+        c.first_name, c.last_name
+    FROM sessions s
+    JOIN clients c ON s.client_id = c.id
+    WHERE s.therapist_id = ? AND s.session_date BETWEEN ? AND ? AND s.status = ?
+    ORDER BY s.session_date, s.session_time, s.id
+"""
+
+
+def seed(conn: sqlite3.Connection, session_count: int) -> None:
+    """One therapist with session_count sessions spread over ten years, plus noise"""
+    conn.executemany(
+        "INSERT INTO therapists (clerk_user_id, email) VALUES (?, ?)",
+        [(f"user_{i}", f"user_{i}@example.com") for i in range(1, 11)]
+    )
+    conn.executemany(
+        "INSERT INTO clients (first_name, last_name, date_of_birth, therapist_id)"
+        " VALUES (?, ?, '1990-01-01', ?)",
+        [(f"First{i}", f"Last{i}", i % 10 + 1) for i in range(2000)]
+    )
+    notes = "Client discussed progress at work and sleep. " * 10
+    ai_data = json.dumps({"transcript": "lorem ipsum " * 200, "emotions": ["anxiety"]})
+    start = date.today() - timedelta(days=3650)
+    rows = []
+    for i in range(session_count * 2):
+        # Even rows belong to therapist 1, odd rows to the other therapists
+        therapist_id = 1 if i % 2 == 0 else random.randint(2, 10)
+        client_id = random.randrange(therapist_id - 1, 2000, 10) + 1
+        day = start + timedelta(days=random.randint(0, 3650 + 180))
+        status = "scheduled" if day >= date.today() else random.choice(["completed", "cancelled"])
+        rows.append((
+            client_id, day.isoformat(), f"{random.randint(8, 18):02d}:00", status,
+            notes, ai_data, '{"work": "notes"}', '{"anxiety": "notes"}', '["CBT"]',
+            therapist_id
+        ))
+    conn.executemany(
+        "INSERT INTO sessions (client_id, session_date, session_time, duration_minutes, status,"
+        " notes, ai_assisted_data, life_domains, emotional_themes, interventions, therapist_id)"
+        " VALUES (?, ?, ?, 50, ?, ?, ?, ?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def fetch_all_and_filter(conn, first: str, last: str):
+    rows = conn.execute(FETCH_ALL, (1,)).fetchall()
+    sessions = []
+    for row in rows:
+        session = dict(row)
+        for field in ('life_domains', 'emotional_themes', 'interventions'):
+            session[field] = json.loads(session[field]) if session[field] else None
+        sessions.append(session)
+    return [
+        s for s in sessions
+        if s['status'] == 'scheduled' and first <= s['session_date'] <= last
+    ]
+
+
+def fetch_range(conn, first: str, last: str):
+    return [dict(row) for row in conn.execute(RANGE, (1, first, last, 'scheduled'))]
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--sessions", type=int, default=50_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with scratch_connection() as conn:
+        seed(conn, args.sessions)
+
+        today = date.today()
+        monday = today + timedelta(days=7 - today.weekday())
+        windows = {
+            "week": (monday, monday + timedelta(days=6)),
+            "month": (today, today + timedelta(days=30)),
+        }
+
+        print(f"{args.sessions} sessions for the benchmarked therapist")
+        for name, (first, last) in windows.items():
+            first, last = first.isoformat(), last.isoformat()
+            old_ms, old = median_ms(lambda: fetch_all_and_filter(conn, first, last), args.repeat)
+            new_ms, new = median_ms(lambda: fetch_range(conn, first, last), args.repeat)
+            assert sorted(s['id'] for s in old) == sorted(s['id'] for s in new)
+
+            # fetch-all downloads the whole history before filtering
+            old_bytes = len(json.dumps([dict(row) for row in conn.execute(FETCH_ALL, (1,))]))
+            new_bytes = len(json.dumps(new))
+            print(f"{name:>5}: {len(new)} sessions | fetch-all {old_ms:8.2f} ms, "
+                  f"{old_bytes / 1024:8.0f} KiB | range {new_ms:6.2f} ms, "
+                  f"{new_bytes / 1024:6.1f} KiB | {old_ms / new_ms:6.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Benchmark /api/search against scanning the stored text
+
+Seeds a scratch database (all migrations applied, so the search index is
+kept by its triggers) with sessions spread over a number of therapists,
+text drawn from a Zipf-distributed vocabulary, and compares for a few
+queries:
+
+  scan    LIKE over the summary and the inflated notes, clinical
+          observations and AI-assisted data of the therapist's sessions
+          (the best a server can do without an index)
+  search  session_search.search_sessions: one FTS5 MATCH, BM25 ranked,
+          with snippets
+
+Usage:
+    python -m bench.session_search [--sessions N] [--therapists T] [--repeat R]
+"""
+import itertools
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from bench.common import argument_parser, insert_clients, median_ms, scratch_database
+from database import open_connection
+from session_content import deflate
+from session_search import search_sessions
+
+CLINICAL_WORDS = (
+    "anxiety sleep work family partner conflict progress boundaries mood "
+    "avoidance exposure breathing journal relapse trigger coping support "
+    "grief anger sadness motivation routine exercise medication therapy goal"
+).split()
+
+QUERIES = {
+    "common word": "anxiety",
+    "rare word": None,  # filled in from the vocabulary tail
+    "two words": "sleep medication",
+    "prefix": "bound*",
+}
+
+SCAN = """
+    SELECT s.id FROM sessions s
+    LEFT JOIN session_content c ON c.session_id = s.id
+    WHERE s.therapist_id = ?1 AND (
+        s.session_summary LIKE ?2 OR inflate(c.notes) LIKE ?2
+        OR inflate(c.clinical_observations) LIKE ?2 OR inflate(c.ai_assisted_data) LIKE ?2
+    )
+"""
+
+
+def vocabulary(size: int):
+    """Words and their cumulative Zipf weights"""
+    words = CLINICAL_WORDS + [f"w{n:05d}" for n in range(size)]
+    return words, list(itertools.accumulate(1 / rank for rank in range(1, len(words) + 1)))
+
+
+def seed(conn: sqlite3.Connection, session_count: int, therapists: int, words, cum_weights) -> None:
+    def prose(count):
+        return " ".join(random.choices(words, cum_weights=cum_weights, k=count))
+
+    insert_clients(conn, [(i, i % therapists + 1) for i in range(1, therapists * 50 + 1)])
+    start = date.today() - timedelta(days=3650)
+    for chunk_start in range(0, session_count, 5_000):
+        ids = range(chunk_start + 1, min(chunk_start + 5_000, session_count) + 1)
+        sessions, content = [], []
+        for session_id in ids:
+            client_id = session_id % (therapists * 50) + 1
+            sessions.append((
+                session_id, client_id, (start + timedelta(days=random.randint(0, 3650))).isoformat(),
+                prose(20), client_id % therapists + 1
+            ))
+            content.append((
+                session_id, deflate(prose(80)), deflate(prose(30)),
+                deflate(json.dumps({"transcript": prose(300), "emotions": ["anxiety"]}))
+            ))
+        conn.executemany(
+            "INSERT INTO sessions (id, client_id, session_date, duration_minutes, status,"
+            " session_summary, therapist_id) VALUES (?, ?, ?, 50, 'completed', ?, ?)", sessions
+        )
+        conn.executemany(
+            "INSERT INTO session_content (session_id, notes, clinical_observations, ai_assisted_data)"
+            " VALUES (?, ?, ?, ?)", content
+        )
+        conn.commit()
+    conn.execute("INSERT INTO session_search (session_search) VALUES ('optimize')")
+    conn.execute("ANALYZE")
+    conn.commit()
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--sessions", type=int, default=200_000)
+    parser.add_argument("--therapists", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    words, cum_weights = vocabulary(20_000)
+    QUERIES["rare word"] = words[5_000]
+
+    with scratch_database() as database:
+        conn = open_connection(database)
+
+        started = time.perf_counter()
+        seed(conn, args.sessions, args.therapists, words, cum_weights)
+        print(f"{args.sessions} sessions over {args.therapists} therapists, "
+              f"seeded and indexed in {time.perf_counter() - started:.0f} s, "
+              f"database {os.path.getsize(database) / 2**20:.0f} MiB")
+
+        for name, q in QUERIES.items():
+            search_ms, hits = median_ms(lambda: search_sessions(conn, 1, q, 20), args.repeat)
+            line = f"{name:>12} ({q}): search {search_ms:7.2f} ms, {len(hits):2d} hits"
+            if not q.endswith('*') and ' ' not in q:
+                scan_ms, matches = median_ms(
+                    lambda: conn.execute(SCAN, (1, f"%{q}%")).fetchall(), 1
+                )
+                line += f" | scan {scan_ms:8.1f} ms, {len(matches)} matches | {scan_ms / search_ms:6.1f}x"
+            print(line)
+
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measure the effect of moving session text out of row (migration 0005)
+
+Seeds a scratch database with sessions whose notes, AI-assisted data and
+clinical text are stored inline, the way they were before session_content
+existed, and measures the file size and a few list queries. It then runs the
+0005 migration on the same data, VACUUMs, and measures again.
+
+Usage:
+    python -m bench.session_storage [--sessions N] [--repeat R]
+"""
+import json
+import os
+import random
+import sqlite3
+import time
+from datetime import date, timedelta
+
+from bench.common import argument_parser, median_ms, scratch_database
+from database import open_connection
+from migrations import discover_migrations
+from session_content import load_session_content
+
+WORDS = (
+    "anxiety sleep work family partner conflict progress boundaries mood "
+    "avoidance exposure breathing journal relapse trigger coping support "
+    "grief anger sadness motivation routine exercise medication therapy goal "
+    "reflection insight pattern thought feeling behavior session week plan"
+).split()
+
+QUERIES = {
+    # /api/sessions default projection over a whole caseload
+    "summary list": """
+        SELECT s.id, s.client_id, s.session_date, s.session_time, s.duration_minutes,
+               s.status, s.summary, s.overall_progress, s.session_summary
+        FROM sessions s
+        WHERE s.therapist_id = ?
+        ORDER BY s.session_date DESC
+    """,
+    # Session-prep style stats across every client
+    "completed counts": """
+        SELECT client_id, COUNT(*), MIN(session_date) FROM sessions
+        WHERE therapist_id = ? AND status = 'completed'
+        GROUP BY client_id
+    """,
+    # Full table walk, e.g. an export or analytics job
+    "table scan": "SELECT COUNT(*), SUM(duration_minutes) FROM sessions WHERE therapist_id >= ?",
+}
+
+
+def prose(word_count: int) -> str:
+    return " ".join(random.choice(WORDS) for _ in range(word_count))
+
+
+def seed(conn: sqlite3.Connection, session_count: int) -> None:
+    """Sessions for one therapist with realistic amounts of inline text"""
+    conn.execute("INSERT INTO therapists (clerk_user_id, email) VALUES ('user_1', 'user_1@example.com')")
+    conn.executemany(
+        "INSERT INTO clients (first_name, last_name, date_of_birth, therapist_id)"
+        " VALUES (?, ?, '1990-01-01', 1)",
+        [(f"First{i}", f"Last{i}") for i in range(200)]
+    )
+    start = date.today() - timedelta(days=3650)
+    rows = []
+    for i in range(session_count):
+        ai_data = json.dumps({
+            "transcript": prose(1500),
+            "emotions": random.sample(WORDS, 3),
+            "clarifyingQuestions": [prose(12) for _ in range(3)],
+        })
+        rows.append((
+            i % 200 + 1, (start + timedelta(days=random.randint(0, 3650))).isoformat(),
+            f"{random.randint(8, 18):02d}:00", random.choice(["completed", "scheduled", "cancelled"]),
+            prose(150), prose(20), ai_data, prose(60), prose(30), prose(80), prose(20), prose(40)
+        ))
+        if len(rows) == 5_000:
+            _insert(conn, rows)
+            rows = []
+    if rows:
+        _insert(conn, rows)
+    conn.commit()
+
+
+def _insert(conn, rows):
+    conn.executemany(
+        "INSERT INTO sessions (client_id, session_date, session_time, duration_minutes, status,"
+        " notes, summary, ai_assisted_data, session_summary, client_insights,"
+        " clinical_observations, risk_assessment, homework_assigned, therapist_id)"
+        " VALUES (?, ?, ?, 50, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)", rows
+    )
+
+
+def measure(database: str, repeat: int) -> dict:
+    conn = open_connection(database)
+    conn.execute("ANALYZE")
+    results = {"size": os.path.getsize(database)}
+    for name, sql in QUERIES.items():
+        results[name], _ = median_ms(lambda: conn.execute(sql, (1,)).fetchall(), repeat)
+
+    # Single-session detail: the row plus (after the move) its content
+    ids = [row[0] for row in conn.execute("SELECT id FROM sessions ORDER BY random() LIMIT 200")]
+    started = time.perf_counter()
+    for session_id in ids:
+        conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        load_session_content(conn, session_id)
+    results["detail"] = (time.perf_counter() - started) * 1000 / len(ids)
+    conn.close()
+    return results
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--sessions", type=int, default=20_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with scratch_database() as database:
+        # Put the text back inline, as it was stored before 0005
+        conn = open_connection(database)
+        seed(conn, args.sessions)
+        conn.execute("VACUUM")
+        conn.close()
+        before = measure(database, args.repeat)
+
+        (move,) = [m for m in discover_migrations() if m.version == 5]
+        conn = open_connection(database)  # the search index triggers need inflate()
+        started = time.perf_counter()
+        move.upgrade(conn)
+        conn.commit()
+        migrate_seconds = time.perf_counter() - started
+        conn.execute("VACUUM")
+        conn.close()
+        after = measure(database, args.repeat)
+
+    print(f"{args.sessions} sessions, migration took {migrate_seconds:.1f} s")
+    print(f"{'':>18} {'inline':>12} {'out of row':>12}")
+    print(f"{'database size':>18} {before['size'] / 2**20:9.1f} MiB {after['size'] / 2**20:9.1f} MiB")
+    for name in (*QUERIES, "detail"):
+        print(f"{name:>18} {before[name]:9.2f} ms {after[name]:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
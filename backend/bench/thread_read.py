@@ -0,0 +1,85 @@
+"""
+Benchmark marking a thread read: per message against one UPDATE
+
+Seeds a scratch database with threads holding N unread messages each and
+times opening one of them:
+
+  per-message  what MessageThread.jsx used to trigger: one
+               PATCH /messages/{id}/read per unread message, each an
+               ownership SELECT, an UPDATE and a commit
+  thread       POST /messages/thread/{id}/read?up_to_id=: one UPDATE over
+               the thread's index range and one commit
+
+Both include the counter triggers. HTTP round trips are not included, and
+those are N against 1.
+
+Usage:
+    python -m bench.thread_read [--unread N] [--threads T]
+"""
+import time
+
+from bench.common import argument_parser, scratch_connection
+
+
+def seed(conn, threads: int, unread: int) -> None:
+    conn.executemany(
+        "INSERT INTO messages (sender_id, sender_type, recipient_id, recipient_type, content)"
+        " VALUES (?, 'client', 1, 'therapist', 'Quick question about the worksheet')",
+        [(client,) for _ in range(unread) for client in range(1, threads + 1)]
+    )
+    conn.commit()
+
+
+def per_message(conn, client_id: int) -> int:
+    ids = [row[0] for row in conn.execute(
+        "SELECT id FROM messages WHERE sender_id = ? AND sender_type = 'client'"
+        " AND recipient_id = 1 AND recipient_type = 'therapist' AND read = 0", (client_id,)
+    )]
+    for message_id in ids:
+        conn.execute(
+            "SELECT * FROM messages WHERE id = ? AND recipient_id = 1 AND recipient_type = 'therapist'",
+            (message_id,)
+        ).fetchone()
+        conn.execute("UPDATE messages SET read = 1, read_at = CURRENT_TIMESTAMP WHERE id = ?", (message_id,))
+        conn.commit()
+    return len(ids)
+
+
+def whole_thread(conn, client_id: int) -> int:
+    marked = conn.execute("""
+        UPDATE messages SET read = 1, read_at = CURRENT_TIMESTAMP
+        WHERE sender_id = ? AND sender_type = 'client' AND recipient_id = 1 AND recipient_type = 'therapist'
+        AND id <= ? AND read = 0
+    """, (client_id, 2 ** 63 - 1)).rowcount
+    conn.commit()
+    return marked
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--unread", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=20)
+    args = parser.parse_args()
+
+    with scratch_connection() as conn:
+        seed(conn, args.threads, args.unread)
+
+        half = args.threads // 2
+        results = {}
+        for name, fn, clients in (("per-message", per_message, range(1, half + 1)),
+                                  ("thread", whole_thread, range(half + 1, args.threads + 1))):
+            started = time.perf_counter()
+            marked = sum(fn(conn, client_id) for client_id in clients)
+            results[name] = (time.perf_counter() - started) * 1000 / len(clients)
+            assert marked == args.unread * len(clients)
+        remaining = conn.execute("SELECT unread_count FROM inbox_unread WHERE therapist_id = 1").fetchone()[0]
+        assert remaining == 0
+
+        print(f"opening a thread with {args.unread} unread messages:"
+              f" per-message {results['per-message']:7.2f} ms ({args.unread} requests)"
+              f" | thread {results['thread']:5.2f} ms (1 request)"
+              f" | {results['per-message'] / results['thread']:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
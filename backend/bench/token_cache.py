@@ -0,0 +1,71 @@
+"""
+Benchmark bearer token verifications per second with and without the caches
+
+Signs a token with a locally generated 2048-bit RSA key published under
+one kid, and calls auth.verify_token with it repeatedly in three setups:
+
+  parse        what verify_token did before: the JWK converted to an RSA
+               key on every call, and the RS256 signature checked
+  key cache    parsed keys kept by kid, the signature still checked
+  token cache  the app as it is: repeat tokens answered from
+               verified_tokens without touching the signature
+
+Usage:
+    python -m bench.token_cache [--calls N]
+"""
+import json
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.security import HTTPAuthorizationCredentials
+from jwt.algorithms import RSAAlgorithm
+
+import auth
+from bench.common import argument_parser
+from jwks import jwks_manager
+
+KID = "bench"
+
+
+def verifications_per_second(credentials: HTTPAuthorizationCredentials, calls: int) -> float:
+    started = time.perf_counter()
+    for _ in range(calls):
+        assert auth.verify_token(credentials) == "user_1"
+    return calls / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(key.public_key()))
+    now = int(time.time())
+    token = jwt.encode({"sub": "user_1", "iat": now, "exp": now + 3600}, key, algorithm="RS256",
+                       headers={"kid": KID})
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    cached_get = auth.verified_tokens.get
+    auth.verified_tokens.get = lambda key, default=None: default
+    try:
+        jwks_manager.get_key = lambda kid: RSAAlgorithm.from_jwk(jwk) if kid == KID else None
+        parse = verifications_per_second(credentials, args.calls)
+        del jwks_manager.get_key
+
+        jwks_manager._keys = {KID: RSAAlgorithm.from_jwk(jwk)}
+        key_cache = verifications_per_second(credentials, args.calls)
+    finally:
+        auth.verified_tokens.get = cached_get
+
+    auth.verified_tokens.clear()
+    token_cache = verifications_per_second(credentials, args.calls * 50)
+
+    print(f"One 2048-bit RS256 token, {args.calls} calls per setup ({args.calls * 50} with the token cache)")
+    for name, rate in (("parse", parse), ("key cache", key_cache), ("token cache", token_cache)):
+        print(f"{name:>11}: {rate:9.0f} verifications/s | {rate / parse:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
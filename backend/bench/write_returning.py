@@ -0,0 +1,104 @@
+"""
+Benchmark the single-statement write paths against select-update-select
+
+Seeds a scratch database, then runs each rewritten write endpoint's
+statements in a loop, one committed transaction per write as a request
+does, and reports writes per second for:
+
+  3-step     ownership SELECT, UPDATE, then SELECT of the updated row
+  returning  one UPDATE ... WHERE id = ? AND therapist_id = ? RETURNING *
+             (database.update_returning)
+
+Usage:
+    python -m bench.write_returning [--writes N] [--rows N]
+"""
+import random
+import sqlite3
+import time
+from datetime import datetime
+
+import database
+from bench.common import argument_parser, insert_clients, scratch_connection
+from database import update_returning
+
+# Endpoint -> (table, SET clauses, SET params factory)
+WRITES = {
+    "update_client": ("clients", ["phone = ?", "updated_at = ?"],
+                      lambda i: [f"555-{i:04d}", datetime.now().isoformat()]),
+    "update_session": ("sessions", ["overall_progress = ?", "updated_at = ?"],
+                       lambda i: [random.choice(["improving", "stable"]), datetime.now().isoformat()]),
+    "cancel_session": ("sessions", ["status = 'cancelled'", "updated_at = ?"],
+                       lambda i: [datetime.now().isoformat()]),
+    "update_todo": ("todos", ["status = ?", "updated_at = CURRENT_TIMESTAMP"],
+                    lambda i: [random.choice(["open", "completed"])]),
+    "update_homework": ("homework_assignments", ["title = ?"],
+                        lambda i: [f"Worksheet {i}"]),
+}
+
+
+def seed(conn: sqlite3.Connection, rows: int) -> None:
+    """rows clients, sessions, todos and assignments spread over ten therapists"""
+    insert_clients(conn, [(i, i % 10 + 1) for i in range(1, rows + 1)])
+    conn.executemany(
+        "INSERT INTO sessions (id, client_id, session_date, duration_minutes, status, therapist_id)"
+        " VALUES (?, ?, '2024-01-01', 50, 'scheduled', ?)",
+        [(i, i, i % 10 + 1) for i in range(1, rows + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO todos (id, client_id, therapist_id, text) VALUES (?, ?, ?, 'Practice')",
+        [(i, i, i % 10 + 1) for i in range(1, rows + 1)]
+    )
+    conn.executemany(
+        "INSERT INTO homework_assignments (id, therapist_id, client_id, title, instructions)"
+        " VALUES (?, ?, ?, 'Worksheet', 'Fill it in')",
+        [(i, i % 10 + 1, i) for i in range(1, rows + 1)]
+    )
+    conn.commit()
+
+
+def three_step(conn, table, assignments, params, row_id, therapist_id):
+    if not conn.execute(
+        f"SELECT * FROM {table} WHERE id = ? AND therapist_id = ?", (row_id, therapist_id)
+    ).fetchone():
+        return None
+    conn.execute(f"UPDATE {table} SET {', '.join(assignments)} WHERE id = ?", [*params, row_id])
+    return conn.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,)).fetchone()
+
+
+def returning(conn, table, assignments, params, row_id, therapist_id):
+    return update_returning(conn, table, assignments, params, "id = ? AND therapist_id = ?", (row_id, therapist_id))
+
+
+def measure(fn, conn, write, writes: int, rows: int) -> float:
+    table, assignments, make_params = write
+    started = time.perf_counter()
+    for i in range(writes):
+        row_id = random.randint(1, rows)
+        row = fn(conn, table, assignments, make_params(i), row_id, row_id % 10 + 1)
+        assert row is not None
+        conn.commit()
+    return writes / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argument_parser(__doc__)
+    parser.add_argument("--writes", type=int, default=5_000)
+    parser.add_argument("--rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    if not database.SUPPORTS_RETURNING:
+        print(f"SQLite {sqlite3.sqlite_version} has no RETURNING; update_returning uses the fallback")
+
+    with scratch_connection() as conn:
+        seed(conn, args.rows)
+
+        print(f"SQLite {sqlite3.sqlite_version}, {args.writes} committed writes each")
+        for name, write in WRITES.items():
+            old = measure(three_step, conn, write, args.writes, args.rows)
+            new = measure(returning, conn, write, args.writes, args.rows)
+            print(f"{name:>16}: 3-step {old:8.0f} writes/s | returning {new:8.0f} writes/s"
+                  f" | {new / old:4.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+"""
+Verify that every route query is served by an index
+
+Checks two sets of statements against a freshly migrated database and
+reports any full SCAN of an application table:
+
+  literal  the SQL string literals passed to execute() in the route
+           modules, as written
+  traced   every statement the routes actually ran while the app served
+           a scripted tour of its endpoints, captured at execute() time
+           with its parameters filled in. This covers the SQL assembled at
+           run time: += chains, f-strings, column lists and
+           update_returning().
+
+Usage:
+    python check_query_plans.py [--seed-sessions N]
+
+tests/test_query_plans.py runs the same checks as part of the test suite;
+this script adds the timings on a seeded database.
+
+With --seed-sessions, the scratch database is filled with N sessions first
+and each query is also timed, which makes the effect of the indexes
+visible. Exits non-zero if any query scans a table or a route fails.
+"""
+import argparse
+import ast
+import os
+import random
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+import traceback
+from contextlib import contextmanager
+from pathlib import Path
+
+import database
+from database import open_connection
+from migrations import run_migrations
+
+BACKEND_DIR = Path(__file__).resolve().parent
+ROUTE_MODULES = (
+    "main.py", "intake_routes.py", "communication_routes.py", "export_routes.py", "session_search.py",
+)
+
+# Tables that grow with usage; a SCAN of any of these is a failure
+LARGE_TABLES = {
+    "therapists", "clients", "sessions", "todos", "intake_responses",
+    "assessment_responses", "form_links", "messages",
+    "homework_assignments", "homework_submissions", "conversations",
+    "session_content", "message_bodies",
+}
+
+SQL_START = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+SCAN_DETAIL = re.compile(r"\bSCAN (?:TABLE )?(\w+)")
+PLACEHOLDER = re.compile(r"\{\w+\}")
+# String and number literals, so traced statements that differ only in
+# their parameters are checked once
+SQL_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def collect_statements(module_path: Path):
+    """
+    Yield (line number, SQL) for each literal statement passed to execute()
+
+    Queries assembled in a local variable are checked using the literal the
+    variable starts from; f-string statements are skipped. Literals filled
+    in with str.format() are checked with `*` for every placeholder. The
+    traced run checks all of these as they were actually assembled.
+    """
+    tree = ast.parse(module_path.read_text())
+    for function in ast.walk(tree):
+        if not isinstance(function, ast.FunctionDef):
+            continue
+
+        literals = {}
+        for node in ast.walk(function):
+            if (isinstance(node, ast.Assign) and len(node.targets) == 1
+                    and isinstance(node.targets[0], ast.Name)
+                    and isinstance(node.value, ast.Constant)
+                    and isinstance(node.value.value, str)):
+                literals[node.targets[0].id] = node.value
+
+        for node in ast.walk(function):
+            if not (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute)
+                    and node.func.attr in ("execute", "executemany") and node.args):
+                continue
+            statement = node.args[0]
+            if (isinstance(statement, ast.Call) and isinstance(statement.func, ast.Attribute)
+                    and statement.func.attr == "format"):
+                statement = statement.func.value
+            if isinstance(statement, ast.Name):
+                statement = literals.get(statement.id)
+            if isinstance(statement, ast.Constant) and isinstance(statement.value, str):
+                if SQL_START.match(statement.value):
+                    sql = PLACEHOLDER.sub("*", statement.value)
+                    yield statement.lineno, " ".join(sql.split())
+
+
+class StatementTrace:
+    """
+    sqlite3 trace callback collecting the statements the routes run
+
+    Keeps one example per (source line, statement shape). The line is the
+    innermost route module frame on the stack, so a statement built by a
+    helper such as update_returning() is reported where the route calls it.
+    Statements run outside the route modules, e.g. the therapist lookup in
+    auth.py, are reported at their innermost app frame.
+    """
+
+    def __init__(self):
+        self.statements = {}  # (module, lineno, shape) -> expanded SQL
+
+    def __call__(self, sql: str) -> None:
+        if not SQL_START.match(sql):
+            return  # BEGIN, COMMIT, PRAGMA and trigger bodies
+        stack = [
+            frame for frame in traceback.extract_stack()
+            if Path(frame.filename).parent == BACKEND_DIR
+            and Path(frame.filename).name not in ("database.py", "check_query_plans.py")
+        ]
+        origin = next(
+            (frame for frame in reversed(stack) if Path(frame.filename).name in ROUTE_MODULES),
+            stack[-1] if stack else None
+        )
+        module, lineno = (Path(origin.filename).name, origin.lineno) if origin else ("?", 0)
+        shape = " ".join(SQL_LITERAL.sub("?", sql).split())
+        self.statements.setdefault((module, lineno, shape), " ".join(sql.split()))
+
+
+@contextmanager
+def tracing_connections(trace: StatementTrace):
+    """Install trace on every connection the app opens meanwhile"""
+    original = database.open_connection
+
+    def open_traced(*args, **kwargs):
+        conn = original(*args, **kwargs)
+        conn.set_trace_callback(trace)
+        return conn
+
+    database.open_connection = open_traced
+    try:
+        yield
+    finally:
+        database.open_connection = original
+
+
+def exercise_routes(http) -> list:
+    """
+    Call each endpoint, with the parameter variants that change its SQL
+
+    Returns "METHOD path -> status" for every call that failed with a
+    server error. Not covered: the SSE stream (it never returns), file
+    uploads and link previews (they need files and the network).
+    """
+    failures = []
+
+    def call(method: str, path: str, **kwargs):
+        response = http.request(method, path, **kwargs)
+        if response.status_code >= 500:
+            failures.append(f"{method} {path} -> {response.status_code}")
+        return response
+
+    call("POST", "/api/auth/sync")
+    call("GET", "/api/auth/me")
+    call("PATCH", "/api/therapist/practice-type", json={"practice_type": "therapy"})
+
+    client_ids = [
+        call("POST", "/api/clients", json={
+            "first_name": f"First{n}", "last_name": f"Last{n}", "date_of_birth": "1990-01-01"
+        }).json()["id"]
+        for n in range(3)
+    ]
+    client_id = client_ids[0]
+    call("PUT", f"/api/clients/{client_id}", json={"phone": "555-0100"})
+    call("PUT", f"/api/clients/{client_id}", json={})
+    call("GET", f"/api/clients/{client_id}")
+    for query in ("", "?status=active", "?status=inactive", "?limit=1"):
+        response = call("GET", f"/api/clients{query}")
+        if response.headers.get("X-Next-Cursor"):
+            call("GET", f"/api/clients?limit=1&cursor={response.headers['X-Next-Cursor']}")
+
+    session = {"client_id": client_id, "duration_minutes": 50, "notes": "Slept badly, work stress"}
+    session_ids = [
+        call("POST", "/api/sessions", json={**session, "session_date": "2024-01-01", "session_time": "10:00"}).json()["id"],
+        call("POST", "/api/sessions", json={**session, "session_date": "2024-01-01"}).json()["id"],
+    ]
+    call("POST", "/api/sessions/schedule", json={**session, "session_date": "2030-01-01", "session_time": "09:00"})
+    session_id = session_ids[0]
+    call("GET", f"/api/sessions/{session_id}")
+    call("PUT", f"/api/sessions/{session_id}", json={
+        "summary": "Summary", "ai_assisted_data": '{"transcript": "work stress", "emotions": []}'
+    })
+    call("PUT", f"/api/sessions/{session_id}", json={"notes": "Autosaved notes"})
+    version = call("GET", f"/api/sessions/{session_id}").json().get("ai_assisted_data_version", 0)
+    call("PATCH", f"/api/sessions/{session_id}/ai-data", json={"draftSummary": "Draft"},
+         headers={"If-Match": f'"{version}"'})
+    call("PATCH", f"/api/sessions/{session_id}/ai-data",
+         content='[{"op": "add", "path": "/emotions/-", "value": "calm"}]',
+         headers={"Content-Type": "application/json-patch+json"})
+    for query in ("", f"?client_id={client_id}", "?fields=notes,ai_assisted_data", "?fields=status,has_risk", "?limit=1"):
+        call("GET", f"/api/sessions{query}")
+    for query in ("", f"?client_id={client_id}"):
+        cursor = call("GET", f"/api/sessions?limit=1{query.replace('?', '&')}").headers.get("X-Next-Cursor")
+        if cursor:
+            call("GET", f"/api/sessions?limit=1&cursor={cursor}{query.replace('?', '&')}")
+    call("GET", "/api/sessions/today")
+    call("GET", "/api/sessions/today?fields=notes")
+    call("GET", "/api/sessions/range?from=2024-01-01&to=2030-12-31")
+    call("GET", "/api/sessions/range?from=2024-01-01&to=2030-12-31&status=scheduled")
+    call("GET", "/api/sessions/range?to=2030-12-31&status=scheduled")
+    call("GET", "/api/search?q=work")
+    call("GET", f"/api/clients/{client_id}/session-prep")
+    call("GET", "/api/dashboard/bootstrap")
+    call("GET", "/api/dashboard/bootstrap?include=clients,today,scheduled&fields=notes")
+    call("GET", f"/api/clients/{client_id}/workspace")
+    call("GET", f"/api/clients/{client_id}/workspace?include=sessions,todos,prep&todo_status=open")
+
+    todo_id = call("POST", "/api/todos", json={
+        "text": "Practice breathing", "client_id": client_id, "source_session_id": session_id
+    }).json()["id"]
+    call("GET", f"/api/todos?client_id={client_id}")
+    call("GET", f"/api/todos?client_id={client_id}&status=open")
+    call("PATCH", f"/api/todos/{todo_id}", json={"status": "completed", "completed_session_id": session_id})
+    call("GET", f"/api/todos/client/{client_id}")
+    call("GET", f"/api/todos/session/{session_id}")
+    call("DELETE", f"/api/todos/{todo_id}")
+
+    message_ids = [
+        call("POST", "/api/messages", json={
+            "recipient_id": client_id, "recipient_type": "client", "content": f"Message {n}"
+        }).json()["id"]
+        for n in range(3)
+    ]
+    call("POST", "/api/messages/broadcast", json={"recipient_ids": client_ids, "content": "Office closed Monday"})
+    thread = f"/api/messages/thread/{client_id}?other_party_type=client"
+    call("GET", thread)
+    call("GET", f"{thread}&after_id={message_ids[0]}")
+    call("GET", f"{thread}&before_id={message_ids[-1]}&limit=1")
+    call("PATCH", f"/api/messages/{message_ids[0]}/read", json={"read": True})
+    call("POST", f"/api/messages/thread/{client_id}/read?up_to_id={message_ids[-1]}")
+    call("GET", "/api/messages/unread-count")
+    cursor = call("GET", "/api/messages/inbox?limit=1").headers.get("X-Next-Cursor")
+    if cursor:
+        call("GET", f"/api/messages/inbox?limit=1&cursor={cursor}")
+
+    assignment_id = call("POST", "/api/homework", json={
+        "client_id": client_id, "title": "Journal", "instructions": "Write daily", "session_id": session_id
+    }).json()["id"]
+    call("PATCH", f"/api/homework/{assignment_id}", json={"status": "assigned", "due_date": "2030-01-08"})
+    submission_id = call("POST", f"/api/homework/{assignment_id}/submit?client_id={client_id}", json={
+        "assignment_id": assignment_id, "content": "Done"
+    }).json().get("id")
+    if submission_id:
+        call("PATCH", f"/api/homework/submission/{submission_id}/feedback", json={"therapist_feedback": "Good"})
+    call("GET", f"/api/homework/client/{client_id}")
+
+    token = call("POST", "/api/intake/create-link", json={
+        "client_email": "new@example.com", "client_name": "New Client", "form_type": "therapy"
+    }).json()["link_token"]
+    call("GET", f"/api/intake/form/{token}")
+    call("POST", f"/api/intake/submit/{token}", json={"first_name": "New", "last_name": "Client"})
+    call("POST", f"/api/intake/submit-assessment/{token}", json={"assessment_id": "phq-9", "responses": {"q1": 1}})
+    call("POST", f"/api/intake/complete/{token}")
+    for intake in call("GET", "/api/intake/pending").json():
+        call("GET", f"/api/intake/review/{intake['id']}")
+        call("POST", f"/api/intake/approve/{intake['id']}")
+
+    call("GET", "/api/export")
+    call("GET", "/api/export?attachments=true")
+    call("PATCH", f"/api/sessions/{session_ids[1]}/cancel")
+    call("DELETE", f"/api/sessions/{session_ids[1]}")
+    call("DELETE", f"/api/clients/{client_ids[-1]}")
+    return failures
+
+
+def trace_routes() -> tuple:
+    """
+    Serve the app from the current directory and run exercise_routes()
+
+    Requests are authenticated as therapist user_1. Returns the trace and
+    the failed calls.
+    """
+    from fastapi.testclient import TestClient
+
+    import auth
+    import main  # Imported here: the routes create uploads/ in the working directory
+
+    trace = StatementTrace()
+    main.app.dependency_overrides[auth.verify_token] = lambda: "user_1"
+    try:
+        with tracing_connections(trace):
+            with TestClient(main.app, raise_server_exceptions=False) as http:
+                failures = exercise_routes(http)
+            database.close_pools()
+    finally:
+        main.app.dependency_overrides.pop(auth.verify_token)
+    return trace, failures
+
+
+def seed(conn: sqlite3.Connection, session_count: int) -> None:
+    """Fill the scratch database with sessions spread over many therapists"""
+    therapist_count = 100
+    clients_per_therapist = 50
+    conn.executemany(
+        "INSERT INTO therapists (clerk_user_id, email) VALUES (?, ?)",
+        [(f"user_{i}", f"user_{i}@example.com") for i in range(therapist_count)]
+    )
+    conn.executemany(
+        "INSERT INTO clients (first_name, last_name, date_of_birth, status, therapist_id)"
+        " VALUES (?, ?, '1990-01-01', ?, ?)",
+        [(f"First{i}", f"Last{i}", random.choice(["active", "inactive"]),
+          i % therapist_count + 1)
+         for i in range(therapist_count * clients_per_therapist)]
+    )
+    client_count = therapist_count * clients_per_therapist
+    rows = []
+    for i in range(session_count):
+        client_id = i % client_count + 1
+        day = f"20{random.randint(15, 25)}-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}"
+        rows.append((client_id, day, f"{random.randint(8, 18):02d}:00",
+                     random.choice(["completed", "scheduled", "cancelled"]),
+                     (client_id - 1) % therapist_count + 1))
+        if len(rows) == 50_000:
+            conn.executemany(
+                "INSERT INTO sessions (client_id, session_date, session_time, duration_minutes,"
+                " status, therapist_id) VALUES (?, ?, ?, 50, ?, ?)", rows)
+            rows = []
+    if rows:
+        conn.executemany(
+            "INSERT INTO sessions (client_id, session_date, session_time, duration_minutes,"
+            " status, therapist_id) VALUES (?, ?, ?, 50, ?, ?)", rows)
+    conn.commit()
+    conn.execute("ANALYZE")
+
+
+def plan_scans(conn: sqlite3.Connection, sql: str, params: list) -> list:
+    """The steps of a statement's query plan that scan a large table"""
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+    return [
+        row[3] for row in plan
+        if (match := SCAN_DETAIL.search(row[3])) and match.group(1) in LARGE_TABLES
+    ]
+
+
+def check_plan(conn: sqlite3.Connection, where: str, sql: str, params: list, timed: bool) -> bool:
+    """Print the verdict for one statement; False if it scans a large table or fails"""
+    try:
+        scans = plan_scans(conn, sql, params)
+    except sqlite3.Error as e:
+        print(f"ERROR {where}: {e}\n    {sql}")
+        return False
+
+    timing = ""
+    if timed and sql.upper().startswith(("SELECT", "WITH")):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timing = f" ({(time.perf_counter() - started) * 1000:.2f} ms)"
+
+    if scans:
+        print(f"SCAN  {where}{timing}\n    {sql}")
+        for detail in scans:
+            print(f"      -> {detail}")
+        return False
+    print(f"ok    {where}{timing}")
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seed-sessions", type=int, default=0)
+    args = parser.parse_args()
+
+    failures = 0
+    previous = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        # The app keeps its database in the working directory
+        os.chdir(scratch)
+        try:
+            run_migrations(database.DATABASE_URL)
+            conn = open_connection(database.DATABASE_URL)  # registers the SQL functions routes use
+            if args.seed_sessions:
+                seed(conn, args.seed_sessions)
+
+            print("Literal statements:")
+            for module in ROUTE_MODULES:
+                for lineno, sql in collect_statements(BACKEND_DIR / module):
+                    params = [1] * sql.count("?")
+                    failures += not check_plan(conn, f"{module}:{lineno}", sql, params, args.seed_sessions)
+
+            print("\nStatements traced while serving the routes:")
+            trace, route_failures = trace_routes()
+            for (module, lineno, _), sql in sorted(trace.statements.items()):
+                failures += not check_plan(conn, f"{module}:{lineno}", sql, [], args.seed_sessions)
+            for failure in route_failures:
+                print(f"ROUTE {failure}")
+            failures += len(route_failures)
+
+            conn.close()
+        finally:
+            os.chdir(previous)
+
+    if failures:
+        print(f"\n{failures} statement(s) or route(s) failed the check")
+        return 1
+    print("\nAll route queries use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
-from database import get_db
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status, UploadFile, File
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from database import get_db, shard_for_therapist, update_returning
 from models import (
     TodoCreate, TodoUpdate, Todo,
-    MessageCreate, MessageUpdate, Message,
+    MessageCreate, MessageBroadcast, MessageUpdate, Message,
     HomeworkAssignmentCreate, HomeworkAssignmentUpdate, HomeworkAssignment, HomeworkAssignmentWithSubmission,
     HomeworkSubmissionCreate, HomeworkSubmissionUpdate, HomeworkSubmission
 )
-from auth import get_current_therapist
+from auth import get_current_therapist_id
+from data_versions import not_modified
+from message_hub import hub
+from pagination import PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, HAS_MORE_HEADER, decode_cursor, fetch_page
 import json
 import os
 import uuid
 import re
-from datetime import datetime
 from pathlib import Path
 from urllib.parse import urlparse
 import requests
@@ -30,9 +34,9 @@ UPLOAD_DIR.mkdir(exist_ok=True)
 # ============================================
 
 @router.post("/upload")
-async def upload_file(
+def upload_file(
     file: UploadFile = File(...),
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Upload a file (image, document, etc.) and return the file URL"""
     try:
@@ -42,7 +46,7 @@ async def upload_file(
         file_path = UPLOAD_DIR / unique_filename
 
         # Save file
-        contents = await file.read()
+        contents = file.file.read()
         with open(file_path, "wb") as f:
             f.write(contents)
 
@@ -76,7 +80,7 @@ async def get_uploaded_file(filename: str):
 
 
 @router.post("/fetch-link-preview")
-async def fetch_link_preview(url: str, therapist_id: int = Depends(get_current_therapist)):
+def fetch_link_preview(url: str, therapist_id: int = Depends(get_current_therapist_id)):
     """Fetch OpenGraph metadata for a URL to create rich link previews"""
     try:
         # Validate URL
@@ -182,11 +186,11 @@ async def fetch_link_preview(url: str, therapist_id: int = Depends(get_current_t
 # TODO ROUTES
 # ============================================
 
-@router.get("/todos/client/{client_id}")
+@router.get("/todos/client/{client_id}", dependencies=[Depends(not_modified)])
 def get_client_todos(
     client_id: int,
     status: str = None,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Get all todos for a specific client"""
     with get_db() as conn:
@@ -224,10 +228,10 @@ def get_client_todos(
         return todos
 
 
-@router.get("/todos/session/{session_id}")
+@router.get("/todos/session/{session_id}", dependencies=[Depends(not_modified)])
 def get_session_todos(
     session_id: int,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Get todos for a specific session (created in that session or pending from previous)"""
     with get_db() as conn:
@@ -272,7 +276,7 @@ def get_session_todos(
 @router.post("/todos")
 def create_todo(
     todo: TodoCreate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Create a new todo"""
     with get_db() as conn:
@@ -312,47 +316,38 @@ def create_todo(
 def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Update a todo (mark as completed, change text, etc.)"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Verify todo belongs to therapist
-        cursor.execute("SELECT * FROM todos WHERE id = ? AND therapist_id = ?",
-                      (todo_id, therapist_id))
-        todo = cursor.fetchone()
-        if not todo:
-            raise HTTPException(status_code=404, detail="Todo not found")
+    # Build update query
+    update_fields = []
+    params = []
 
-        # Build update query
-        update_fields = []
-        params = []
+    if todo_update.text is not None:
+        update_fields.append("text = ?")
+        params.append(todo_update.text)
 
-        if todo_update.text is not None:
-            update_fields.append("text = ?")
-            params.append(todo_update.text)
+    if todo_update.status is not None:
+        update_fields.append("status = ?")
+        params.append(todo_update.status)
 
-        if todo_update.status is not None:
-            update_fields.append("status = ?")
-            params.append(todo_update.status)
+    if todo_update.completed_session_id is not None:
+        update_fields.append("completed_session_id = ?")
+        params.append(todo_update.completed_session_id)
 
-        if todo_update.completed_session_id is not None:
-            update_fields.append("completed_session_id = ?")
-            params.append(todo_update.completed_session_id)
+    if not update_fields:
+        raise HTTPException(status_code=400, detail="No fields to update")
 
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No fields to update")
+    update_fields.append("updated_at = CURRENT_TIMESTAMP")
 
-        update_fields.append("updated_at = CURRENT_TIMESTAMP")
-        params.append(todo_id)
-
-        query = f"UPDATE todos SET {', '.join(update_fields)} WHERE id = ?"
-        cursor.execute(query, params)
-
-        # Return updated todo
-        cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,))
-        row = cursor.fetchone()
+    with get_db() as conn:
+        # The WHERE clause doubles as the ownership check
+        row = update_returning(
+            conn, "todos", update_fields, params,
+            "id = ? AND therapist_id = ?", (todo_id, therapist_id)
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Todo not found")
 
         return {
             'id': row['id'],
@@ -370,7 +365,7 @@ def update_todo(
 @router.delete("/todos/{todo_id}")
 def delete_todo(
     todo_id: int,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Delete a todo"""
     with get_db() as conn:
@@ -391,92 +386,387 @@ def delete_todo(
 # MESSAGE ROUTES
 # ============================================
 
-@router.get("/messages/thread/{other_party_id}")
+# Live message streams (Server-Sent Events)
+STREAM_HEARTBEAT_SECONDS = 15
+STREAM_RETRY_MS = 3000
+# Messages a reconnecting stream may replay; a longer gap sends a
+# `resync` event and the client reloads the thread instead
+STREAM_REPLAY_LIMIT = 500
+
+MAX_BROADCAST_RECIPIENTS = 1000
+
+
+def message_from_row(row):
+    """
+    API representation of a messages row
+
+    The row must carry body_content and body_attachments from a LEFT JOIN
+    of message_bodies: broadcast messages keep their content there.
+    """
+    content, attachments = row['content'], row['attachments']
+    if row['body_id'] is not None:
+        content, attachments = row['body_content'], row['body_attachments']
+    return {
+        'id': row['id'],
+        'sender_id': row['sender_id'],
+        'sender_type': row['sender_type'],
+        'recipient_id': row['recipient_id'],
+        'recipient_type': row['recipient_type'],
+        'content': content,
+        'attachments': json.loads(attachments) if attachments else [],
+        'related_session_id': row['related_session_id'],
+        'read': bool(row['read']),
+        'read_at': row['read_at'],
+        'created_at': row['created_at']
+    }
+
+
+def publish_message(message, received=None):
+    """
+    Push a committed message to the live streams of both parties
+
+    received is the recipient's copy of the message when it has one in
+    another shard; their stream gets that one, whose id it can resume from.
+    """
+    received = received or message
+    hub.publish((message['sender_type'], message['sender_id']),
+                {'event': 'message', 'id': message['id'], 'data': message})
+    hub.publish((received['recipient_type'], received['recipient_id']),
+                {'event': 'message', 'id': received['id'], 'data': received})
+
+
+def mark_mirrors_read(sender_id: int, mirror_ids: List[int]) -> None:
+    """Mark read the sender's copies, in the sender's shard, of messages a therapist has read"""
+    if not mirror_ids:
+        return
+    with get_db(shard_for_therapist(sender_id)) as conn:
+        conn.execute(
+            "UPDATE messages SET read = 1, read_at = CURRENT_TIMESTAMP"
+            " WHERE id IN (SELECT value FROM json_each(?)) AND read = 0",
+            (json.dumps(mirror_ids),)
+        )
+
+
+# Upper bound for an open-ended id range
+MAX_MESSAGE_ID = 2 ** 63 - 1
+
+
+def fetch_thread_messages(
+    conn, therapist_id: int, other_party_id: int, other_party_type: str,
+    after_id: int = 0, before_id: int = MAX_MESSAGE_ID, limit: int = PAGE_SIZE, newest: bool = False
+):
+    """
+    Up to `limit` messages of a thread with after_id < id < before_id, oldest first
+
+    Takes the oldest messages of the range, or with newest=True the newest.
+    Each direction of the thread is a range of idx_messages_thread (the
+    four party columns, then the rowid), and SQLite merges the two in id
+    order, so the LIMIT ends both index reads early.
+    """
+    params = (therapist_id, other_party_id, other_party_type, after_id, before_id,
+              other_party_id, other_party_type, therapist_id, after_id, before_id, limit)
+    if newest:
+        rows = conn.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE sender_id = ? AND sender_type = 'therapist' AND recipient_id = ? AND recipient_type = ?
+            AND m.id > ? AND m.id < ?
+            UNION ALL
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE sender_id = ? AND sender_type = ? AND recipient_id = ? AND recipient_type = 'therapist'
+            AND m.id > ? AND m.id < ?
+            ORDER BY id DESC
+            LIMIT ?
+        """, params).fetchall()
+        rows.reverse()
+    else:
+        rows = conn.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE sender_id = ? AND sender_type = 'therapist' AND recipient_id = ? AND recipient_type = ?
+            AND m.id > ? AND m.id < ?
+            UNION ALL
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE sender_id = ? AND sender_type = ? AND recipient_id = ? AND recipient_type = 'therapist'
+            AND m.id > ? AND m.id < ?
+            ORDER BY id
+            LIMIT ?
+        """, params).fetchall()
+    return [message_from_row(row) for row in rows]
+
+
+@router.get("/messages/thread/{other_party_id}", dependencies=[Depends(not_modified)])
 def get_message_thread(
+    response: Response,
     other_party_id: int,
     other_party_type: str,  # 'client' or 'therapist'
-    therapist_id: int = Depends(get_current_therapist)
+    after_id: Optional[int] = Query(None, ge=0),
+    before_id: Optional[int] = Query(None, ge=1),
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
-    """Get message thread between therapist and client"""
+    """
+    Get message thread between therapist and client, oldest first
+
+    Returns the latest `limit` messages. With after_id, the messages sent
+    after that one (the oldest first, to catch up); with before_id, the
+    ones before it (to page back through history). X-Has-More tells
+    whether another request in the same direction would return more.
+    """
+    # Reading back from the newest unless catching up
+    newest = after_id is None
     with get_db() as conn:
-        cursor = conn.cursor()
-
-        # For therapist, get messages with specific client
-        cursor.execute("""
-            SELECT * FROM messages
-            WHERE (sender_id = ? AND sender_type = 'therapist' AND recipient_id = ? AND recipient_type = ?)
-            OR (sender_id = ? AND sender_type = ? AND recipient_id = ? AND recipient_type = 'therapist')
-            ORDER BY created_at ASC
-        """, (therapist_id, other_party_id, other_party_type,
-              other_party_id, other_party_type, therapist_id))
-
-        rows = cursor.fetchall()
-
-        messages = []
-        for row in rows:
-            attachments = json.loads(row['attachments']) if row['attachments'] else []
-            messages.append({
-                'id': row['id'],
-                'sender_id': row['sender_id'],
-                'sender_type': row['sender_type'],
-                'recipient_id': row['recipient_id'],
-                'recipient_type': row['recipient_type'],
-                'content': row['content'],
-                'attachments': attachments,
-                'related_session_id': row['related_session_id'],
-                'read': bool(row['read']),
-                'read_at': row['read_at'],
-                'created_at': row['created_at']
-            })
+        messages = fetch_thread_messages(
+            conn, therapist_id, other_party_id, other_party_type,
+            after_id or 0, before_id or MAX_MESSAGE_ID, limit + 1, newest
+        )
+
+    has_more = len(messages) > limit
+    if has_more:
+        messages = messages[1:] if newest else messages[:limit]
+    response.headers[HAS_MORE_HEADER] = "true" if has_more else "false"
+    return messages
+
+
+def load_missed_messages(therapist_id: int, after_id: int, other_party_id: Optional[int], other_party_type: str):
+    """
+    Messages of a therapist (or of one thread) with id > after_id, oldest first
+
+    Called from a stream's body, after the request's route has returned.
+    """
+    with get_db(shard_for_therapist(therapist_id)) as conn:
+        if other_party_id is not None:
+            return fetch_thread_messages(
+                conn, therapist_id, other_party_id, other_party_type,
+                after_id=after_id, limit=STREAM_REPLAY_LIMIT + 1
+            )
+        rows = conn.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE sender_id = ? AND sender_type = 'therapist' AND m.id > ?
+            UNION ALL
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE recipient_id = ? AND recipient_type = 'therapist' AND m.id > ?
+            AND NOT (sender_id = ? AND sender_type = 'therapist')
+            ORDER BY id
+            LIMIT ?
+        """, (therapist_id, after_id, therapist_id, after_id, therapist_id,
+              STREAM_REPLAY_LIMIT + 1)).fetchall()
+        return [message_from_row(row) for row in rows]
+
+
+def format_event(event):
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+async def message_events(therapist_id: int, after_id: Optional[int], other_party_id: Optional[int], other_party_type: str):
+    """
+    Body of a message stream: missed messages, then live ones as they arrive
+
+    Subscribing before the replay query means nothing committed in between
+    is lost; live events the replay already sent are skipped by id.
+    """
+    subscription = hub.subscribe(('therapist', therapist_id))
+    try:
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+
+        last_id = after_id or 0
+        if after_id is not None:
+            missed = await run_in_threadpool(
+                load_missed_messages, therapist_id, after_id, other_party_id, other_party_type
+            )
+            if len(missed) > STREAM_REPLAY_LIMIT:
+                last_id = missed[-1]['id']
+                yield "event: resync\ndata: {}\n\n"
+            else:
+                for message in missed:
+                    last_id = message['id']
+                    yield format_event({'event': 'message', 'id': message['id'], 'data': message})
+
+        while True:
+            event = await subscription.next_event(STREAM_HEARTBEAT_SECONDS)
+            if event is None:
+                if subscription.overflowed:
+                    break  # The client reconnects and replays what it missed
+                yield ": heartbeat\n\n"
+                continue
+            message = event['data']
+            if event['id'] <= last_id:
+                continue
+            if other_party_id is not None and not (
+                (message['sender_type'], message['sender_id']) == (other_party_type, other_party_id)
+                or (message['recipient_type'], message['recipient_id']) == (other_party_type, other_party_id)
+            ):
+                continue
+            last_id = event['id']
+            yield format_event(event)
+    finally:
+        hub.unsubscribe(subscription)
+
+
+@router.get("/messages/stream")
+def stream_messages(
+    other_party_id: Optional[int] = None,
+    other_party_type: str = 'client',
+    last_event_id: Optional[str] = Header(None),
+    therapist_id: int = Depends(get_current_therapist_id)
+):
+    """
+    Server-Sent Events stream of the therapist's new messages
 
-        return messages
+    Optionally limited to one thread. Each event's id is the message id; a
+    reconnect sending Last-Event-ID first receives the messages it missed.
+    Comment lines are sent as a heartbeat while the stream is idle.
+    """
+    try:
+        after_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid Last-Event-ID")
+
+    return StreamingResponse(
+        message_events(therapist_id, after_id, other_party_id, other_party_type),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Stop proxies from buffering the stream
+            "X-Accel-Buffering": "no",
+        }
+    )
 
 
 @router.post("/messages")
 def send_message(
     message: MessageCreate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
+):
+    """
+    Send a message to a client or another therapist
+
+    A therapist on another shard reads their own shard, so they get a copy
+    of the message there; the two copies point at each other (mirror_id).
+    """
+    # Serialize attachments
+    attachments_json = json.dumps(message.attachments) if message.attachments else None
+    recipient_shard = None
+    if message.recipient_type == 'therapist' and \
+            shard_for_therapist(message.recipient_id) != shard_for_therapist(therapist_id):
+        recipient_shard = shard_for_therapist(message.recipient_id)
+
+    def insert_message(conn, mirror_id=None):
+        message_id = conn.execute("""
+            INSERT INTO messages
+            (sender_id, sender_type, recipient_id, recipient_type, content, attachments, related_session_id, mirror_id)
+            VALUES (?, 'therapist', ?, ?, ?, ?, ?, ?)
+        """, (therapist_id, message.recipient_id, message.recipient_type,
+              message.content, attachments_json, message.related_session_id, mirror_id)).lastrowid
+        row = conn.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE m.id = ?
+        """, (message_id,)).fetchone()
+        return message_from_row(row)
+
+    with get_db() as conn:
+        created = insert_message(conn)
+
+    received = None
+    if recipient_shard is not None:
+        # Two shards, two commits. The sender's copy commits first, so a
+        # crash in between leaves at worst a sent message without a
+        # delivered copy (mirror_id still NULL), never a message in the
+        # recipient's inbox that its sender has no record of. A failure
+        # that can still be handled here deletes whatever was written.
+        try:
+            with get_db(recipient_shard) as recipient_conn:
+                received = insert_message(recipient_conn, mirror_id=created['id'])
+            with get_db() as conn:
+                conn.execute("UPDATE messages SET mirror_id = ? WHERE id = ?", (received['id'], created['id']))
+        except Exception:
+            if received is not None:
+                with get_db(recipient_shard) as recipient_conn:
+                    recipient_conn.execute("DELETE FROM messages WHERE id = ?", (received['id'],))
+            with get_db() as conn:
+                conn.execute("DELETE FROM messages WHERE id = ?", (created['id'],))
+            raise
+
+    # Committed; only now may streams see it
+    publish_message(created, received)
+    return created
+
+
+@router.post("/messages/broadcast")
+def broadcast_message(
+    broadcast: MessageBroadcast,
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
-    """Send a message to a client"""
+    """
+    Send one message to many clients
+
+    The content and attachments are stored once in message_bodies and every
+    recipient's row points to them. All rows are inserted in one
+    transaction, then pushed to live streams. Returns the created messages.
+    """
+    recipient_ids = list(dict.fromkeys(broadcast.recipient_ids))
+    if not recipient_ids:
+        raise HTTPException(status_code=400, detail="No recipients")
+    if len(recipient_ids) > MAX_BROADCAST_RECIPIENTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {MAX_BROADCAST_RECIPIENTS} recipients per broadcast"
+        )
+    if broadcast.recipient_type != 'client':
+        raise HTTPException(status_code=400, detail="Broadcasts can only be sent to clients")
+
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # Serialize attachments
-        attachments_json = json.dumps(message.attachments) if message.attachments else None
-
-        cursor.execute("""
+        cursor.execute(
+            "SELECT value FROM json_each(?) WHERE value NOT IN"
+            " (SELECT id FROM clients WHERE therapist_id = ?)",
+            (json.dumps(recipient_ids), therapist_id)
+        )
+        missing = [row[0] for row in cursor.fetchall()]
+        if missing:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Clients not found: {', '.join(str(client_id) for client_id in missing)}"
+            )
+
+        attachments_json = json.dumps(broadcast.attachments) if broadcast.attachments else None
+        cursor.execute(
+            "INSERT INTO message_bodies (content, attachments) VALUES (?, ?)",
+            (broadcast.content, attachments_json)
+        )
+        body_id = cursor.lastrowid
+
+        cursor.executemany("""
             INSERT INTO messages
-            (sender_id, sender_type, recipient_id, recipient_type, content, attachments, related_session_id)
-            VALUES (?, 'therapist', ?, ?, ?, ?, ?)
-        """, (therapist_id, message.recipient_id, message.recipient_type,
-              message.content, attachments_json, message.related_session_id))
-
-        message_id = cursor.lastrowid
+            (sender_id, sender_type, recipient_id, recipient_type, content, body_id, related_session_id)
+            VALUES (?, 'therapist', ?, 'client', '', ?, ?)
+        """, [(therapist_id, recipient_id, body_id, broadcast.related_session_id)
+              for recipient_id in recipient_ids])
 
-        # Return created message
-        cursor.execute("SELECT * FROM messages WHERE id = ?", (message_id,))
-        row = cursor.fetchone()
+        cursor.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m JOIN message_bodies b ON b.id = m.body_id
+            WHERE m.body_id = ?
+            ORDER BY m.id
+        """, (body_id,))
+        created = [message_from_row(row) for row in cursor.fetchall()]
 
-        attachments = json.loads(row['attachments']) if row['attachments'] else []
-        return {
-            'id': row['id'],
-            'sender_id': row['sender_id'],
-            'sender_type': row['sender_type'],
-            'recipient_id': row['recipient_id'],
-            'recipient_type': row['recipient_type'],
-            'content': row['content'],
-            'attachments': attachments,
-            'related_session_id': row['related_session_id'],
-            'read': bool(row['read']),
-            'read_at': row['read_at'],
-            'created_at': row['created_at']
-        }
+    # Committed when the block exits
+    for message in created:
+        publish_message(message)
+    return created
 
 
 @router.patch("/messages/{message_id}/read")
 def mark_message_read(
     message_id: int,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Mark a message as read"""
     with get_db() as conn:
@@ -488,7 +778,8 @@ def mark_message_read(
             WHERE id = ? AND recipient_id = ? AND recipient_type = 'therapist'
         """, (message_id, therapist_id))
 
-        if not cursor.fetchone():
+        message = cursor.fetchone()
+        if not message:
             raise HTTPException(status_code=404, detail="Message not found")
 
         cursor.execute("""
@@ -497,34 +788,120 @@ def mark_message_read(
             WHERE id = ?
         """, (message_id,))
 
-        return {"message": "Message marked as read"}
+    if message['mirror_id'] is not None:
+        mark_mirrors_read(message['sender_id'], [message['mirror_id']])
+    return {"message": "Message marked as read"}
 
 
-@router.get("/messages/unread-count")
+@router.post("/messages/thread/{other_party_id}/read")
+def mark_thread_read(
+    other_party_id: int,
+    up_to_id: int = Query(..., ge=1),
+    other_party_type: str = 'client',
+    therapist_id: int = Depends(get_current_therapist_id)
+):
+    """
+    Mark every unread message the therapist received in a thread, up to
+    and including up_to_id, as read
+
+    One UPDATE over the thread's range of idx_messages_thread; the
+    conversation and inbox counters follow in the same transaction (the
+    message triggers). Returns how many messages changed and the
+    therapist's remaining unread count.
+    """
+    params = (other_party_id, other_party_type, therapist_id, up_to_id)
+    with get_db() as conn:
+        mirror_ids = []
+        if other_party_type == 'therapist':
+            mirror_ids = [row[0] for row in conn.execute("""
+                SELECT mirror_id FROM messages
+                WHERE sender_id = ? AND sender_type = ? AND recipient_id = ? AND recipient_type = 'therapist'
+                AND id <= ? AND read = 0 AND mirror_id IS NOT NULL
+            """, params)]
+
+        marked = conn.execute("""
+            UPDATE messages
+            SET read = 1, read_at = CURRENT_TIMESTAMP
+            WHERE sender_id = ? AND sender_type = ? AND recipient_id = ? AND recipient_type = 'therapist'
+            AND id <= ? AND read = 0
+        """, params).rowcount
+
+        row = conn.execute(
+            "SELECT unread_count FROM inbox_unread WHERE therapist_id = ?", (therapist_id,)
+        ).fetchone()
+
+    mark_mirrors_read(other_party_id, mirror_ids)
+    return {"marked_read": marked, "unread_count": row['unread_count'] if row else 0}
+
+
+@router.get("/messages/unread-count", dependencies=[Depends(not_modified)])
 def get_unread_message_count(
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Get count of unread messages for therapist"""
     with get_db() as conn:
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT COUNT(*) as count FROM messages
-            WHERE recipient_id = ? AND recipient_type = 'therapist' AND read = 0
-        """, (therapist_id,))
+        # Kept current by the message triggers (migration 0011)
+        row = conn.execute(
+            "SELECT unread_count FROM inbox_unread WHERE therapist_id = ?", (therapist_id,)
+        ).fetchone()
+        return {"unread_count": row['unread_count'] if row else 0}
+
+
+@router.get("/messages/inbox", dependencies=[Depends(not_modified)])
+def get_inbox(
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    therapist_id: int = Depends(get_current_therapist_id)
+):
+    """Therapist's conversations, most recent message first, with unread counts"""
+    after = decode_cursor(cursor, 1)
+
+    query = """
+        SELECT cv.*, c.first_name, c.last_name
+        FROM conversations cv
+        LEFT JOIN clients c ON cv.other_party_type = 'client' AND c.id = cv.other_party_id
+        WHERE cv.therapist_id = ?
+    """
+    params = [therapist_id]
+    if after:
+        query += " AND cv.last_message_id < ?"
+        params.extend(after)
+    query += " ORDER BY cv.last_message_id DESC LIMIT ?"
+    params.append(limit + 1)
 
-        row = cursor.fetchone()
-        return {"unread_count": row['count']}
+    with get_db() as conn:
+        rows, next_cursor = fetch_page(
+            conn.execute(query, params), limit, lambda row: (row['last_message_id'],)
+        )
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return [
+        {
+            'other_party_id': row['other_party_id'],
+            'other_party_type': row['other_party_type'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'last_message_id': row['last_message_id'],
+            'last_message_at': row['last_message_at'],
+            'last_message_preview': row['last_message_preview'],
+            'last_sender_type': row['last_sender_type'],
+            'unread_count': row['unread_count'],
+            'other_party_unread': row['other_party_unread']
+        }
+        for row in rows
+    ]
 
 
 # ============================================
 # HOMEWORK ROUTES
 # ============================================
 
-@router.get("/homework/client/{client_id}")
+@router.get("/homework/client/{client_id}", dependencies=[Depends(not_modified)])
 def get_client_homework(
     client_id: int,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Get all homework assignments for a client with their submissions"""
     with get_db() as conn:
@@ -593,7 +970,7 @@ def get_client_homework(
 @router.post("/homework")
 def create_homework_assignment(
     assignment: HomeworkAssignmentCreate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Create a new homework assignment"""
     with get_db() as conn:
@@ -640,54 +1017,44 @@ def create_homework_assignment(
 def update_homework_assignment(
     assignment_id: int,
     assignment_update: HomeworkAssignmentUpdate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Update a homework assignment"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Verify assignment belongs to therapist
-        cursor.execute("SELECT * FROM homework_assignments WHERE id = ? AND therapist_id = ?",
-                      (assignment_id, therapist_id))
-        assignment = cursor.fetchone()
-        if not assignment:
-            raise HTTPException(status_code=404, detail="Assignment not found")
-
-        # Build update query
-        update_fields = []
-        params = []
-
-        if assignment_update.title is not None:
-            update_fields.append("title = ?")
-            params.append(assignment_update.title)
-
-        if assignment_update.instructions is not None:
-            update_fields.append("instructions = ?")
-            params.append(assignment_update.instructions)
+    # Build update query
+    update_fields = []
+    params = []
 
-        if assignment_update.attachments is not None:
-            update_fields.append("attachments = ?")
-            params.append(json.dumps(assignment_update.attachments))
+    if assignment_update.title is not None:
+        update_fields.append("title = ?")
+        params.append(assignment_update.title)
 
-        if assignment_update.due_date is not None:
-            update_fields.append("due_date = ?")
-            params.append(assignment_update.due_date)
+    if assignment_update.instructions is not None:
+        update_fields.append("instructions = ?")
+        params.append(assignment_update.instructions)
 
-        if assignment_update.status is not None:
-            update_fields.append("status = ?")
-            params.append(assignment_update.status)
+    if assignment_update.attachments is not None:
+        update_fields.append("attachments = ?")
+        params.append(json.dumps(assignment_update.attachments))
 
-        if not update_fields:
-            raise HTTPException(status_code=400, detail="No fields to update")
+    if assignment_update.due_date is not None:
+        update_fields.append("due_date = ?")
+        params.append(assignment_update.due_date)
 
-        params.append(assignment_id)
+    if assignment_update.status is not None:
+        update_fields.append("status = ?")
+        params.append(assignment_update.status)
 
-        query = f"UPDATE homework_assignments SET {', '.join(update_fields)} WHERE id = ?"
-        cursor.execute(query, params)
+    if not update_fields:
+        raise HTTPException(status_code=400, detail="No fields to update")
 
-        # Return updated assignment
-        cursor.execute("SELECT * FROM homework_assignments WHERE id = ?", (assignment_id,))
-        row = cursor.fetchone()
+    with get_db() as conn:
+        # The WHERE clause doubles as the ownership check
+        row = update_returning(
+            conn, "homework_assignments", update_fields, params,
+            "id = ? AND therapist_id = ?", (assignment_id, therapist_id)
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Assignment not found")
 
         attachments = json.loads(row['attachments']) if row['attachments'] else []
         return {
@@ -760,7 +1127,7 @@ def submit_homework(
 def add_homework_feedback(
     submission_id: int,
     feedback_update: HomeworkSubmissionUpdate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """Add feedback to a homework submission"""
     with get_db() as conn:
@@ -0,0 +1,59 @@
+"""
+Conditional GETs for list endpoints
+
+Every write to a therapist's data bumps their counter in data_versions
+(maintained by triggers). List endpoints depend on not_modified(), which
+reads the counter, sends it in the ETag and answers 304 Not Modified when
+the client already holds that version, before the route runs its query.
+It lands the therapist's queued autosaves first, so neither the ETag nor the route's query
+misses a write the client has already been told about.
+
+The ETag also covers the therapist record and today's date, since the
+bootstrap payload and the "today" views depend on them.
+"""
+import hashlib
+from datetime import date
+from typing import Any, Dict, Optional
+
+from fastapi import Depends, Header, HTTPException, Response
+
+from auth import get_current_therapist
+from database import get_db
+from write_queue import writer
+
+# Responses hold client data: only the user's own browser may keep them,
+# and it must revalidate every time
+CACHE_CONTROL = "private, no-cache"
+
+
+def current_data_version(conn, therapist_id: int) -> int:
+    row = conn.execute(
+        "SELECT version FROM data_versions WHERE therapist_id = ?", (therapist_id,)
+    ).fetchone()
+    return row[0] if row else 0
+
+
+def data_version_etag(therapist: Dict[str, Any], version: int) -> str:
+    key = f"{therapist['id']}:{therapist.get('updated_at')}:{date.today().isoformat()}"
+    return f'W/"{version}-{hashlib.sha1(key.encode()).hexdigest()[:12]}"'
+
+
+def not_modified(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+) -> None:
+    """Route dependency: set the ETag, or stop with 304 if the client is current"""
+    # Queued autosaves bump the version too; land them before reading it,
+    # and before the route reads the rows they change
+    writer.flush(therapist['id'])
+
+    with get_db() as conn:
+        etag = data_version_etag(therapist, current_data_version(conn, therapist['id']))
+
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if if_none_match and (if_none_match.strip() == '*' or etag in [
+        tag.strip() for tag in if_none_match.split(',')
+    ]):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
@@ -1,267 +1,331 @@
+import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from contextvars import ContextVar
+from typing import Dict, Generator, List, Optional, Sequence
+
+from migrations import run_migrations
+from session_content import deflate, inflate
 
 DATABASE_URL = "therapy.db"
 
+# Optional sharded storage. With DB_SHARD_COUNT > 0 each therapist's data
+# lives in shard file (therapist_id % DB_SHARD_COUNT), and DATABASE_URL only
+# serves as the directory: therapist accounts and intake link routing.
+SHARD_COUNT = int(os.getenv("DB_SHARD_COUNT", "0"))
+SHARD_FILE_PATTERN = os.getenv("DB_SHARD_FILE_PATTERN", "therapy_shard_{:03d}.db")
+# Shard n hands out ids from n << SHARD_ID_BITS upwards, so an id names one
+# row across all shards (in exports, and for messages stored in two shards).
+# 2**40 ids per shard keeps every id below 2**53, which JavaScript holds
+# exactly, for up to 8192 shards.
+SHARD_ID_BITS = 40
+
+# Connection pool sizing (per worker process)
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# How many of those a streamed response (an export) may hold at once
+STREAMING_CONNECTIONS = int(os.getenv("DB_STREAMING_CONNECTIONS", str(max(1, POOL_SIZE // 4))))
+
+# UPDATE ... RETURNING needs SQLite 3.35
+SUPPORTS_RETURNING = sqlite3.sqlite_version_info >= (3, 35, 0)
+
+# Applied once when a pooled connection is opened
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",  # 64 MiB page cache
+    "PRAGMA mmap_size = 268435456",  # 256 MiB memory-mapped I/O
+    "PRAGMA busy_timeout = 5000",
+    "PRAGMA temp_store = MEMORY",
+)
+
 
 def init_db():
-    """Initialize database and create tables"""
-    conn = sqlite3.connect(DATABASE_URL)
-    cursor = conn.cursor()
-
-    # Create therapists table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS therapists (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            clerk_user_id TEXT NOT NULL UNIQUE,
-            email TEXT NOT NULL,
-            first_name TEXT,
-            last_name TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS clients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            first_name TEXT NOT NULL,
-            last_name TEXT NOT NULL,
-            date_of_birth TEXT NOT NULL,
-            phone TEXT,
-            email TEXT,
-            emergency_contact_name TEXT,
-            emergency_contact_phone TEXT,
-            status TEXT NOT NULL DEFAULT 'active',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS sessions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            client_id INTEGER NOT NULL,
-            session_date TEXT NOT NULL,
-            duration_minutes INTEGER NOT NULL,
-
-            -- Structured data (stored as JSON)
-            life_domains TEXT,
-            emotional_themes TEXT,
-            interventions TEXT,
-
-            -- Progress and clinical notes
-            overall_progress TEXT,
-            session_summary TEXT,
-            client_insights TEXT,
-            homework_assigned TEXT,
-            clinical_observations TEXT,
-            risk_assessment TEXT,
-
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (client_id) REFERENCES clients (id)
-        )
-    """)
-
-    # Migration: Add session_time and status columns if they don't exist
-    cursor.execute("PRAGMA table_info(sessions)")
-    columns = [column[1] for column in cursor.fetchall()]
-
-    if 'session_time' not in columns:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN session_time TEXT")
-        print("Added session_time column to sessions table")
-
-    if 'status' not in columns:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN status TEXT NOT NULL DEFAULT 'completed'")
-        print("Added status column to sessions table")
-
-    # Migration: Add therapist_id foreign key to clients table
-    cursor.execute("PRAGMA table_info(clients)")
-    client_columns = [column[1] for column in cursor.fetchall()]
-
-    if 'therapist_id' not in client_columns:
-        cursor.execute("ALTER TABLE clients ADD COLUMN therapist_id INTEGER REFERENCES therapists(id)")
-        print("Added therapist_id column to clients table")
-
-    # Migration: Add therapist_id foreign key to sessions table
-    cursor.execute("PRAGMA table_info(sessions)")
-    session_columns = [column[1] for column in cursor.fetchall()]
-
-    if 'therapist_id' not in session_columns:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN therapist_id INTEGER REFERENCES therapists(id)")
-        print("Added therapist_id column to sessions table")
-
-    # Migration: Add notes and summary fields to sessions table
-    if 'notes' not in session_columns:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN notes TEXT")
-        print("Added notes column to sessions table")
-
-    if 'summary' not in session_columns:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN summary TEXT")
-        print("Added summary column to sessions table")
-
-    # Migration: Add practice_type to therapists table
-    cursor.execute("PRAGMA table_info(therapists)")
-    therapist_columns = [column[1] for column in cursor.fetchall()]
-
-    if 'practice_type' not in therapist_columns:
-        cursor.execute("ALTER TABLE therapists ADD COLUMN practice_type TEXT")
-        print("Added practice_type column to therapists table")
-
-    # Migration: Add ai_assisted_data to sessions table
-    cursor.execute("PRAGMA table_info(sessions)")
-    session_columns_check = [column[1] for column in cursor.fetchall()]
-
-    if 'ai_assisted_data' not in session_columns_check:
-        cursor.execute("ALTER TABLE sessions ADD COLUMN ai_assisted_data TEXT")
-        print("Added ai_assisted_data column to sessions table")
-
-    # Create todos table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS todos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            client_id INTEGER NOT NULL,
-            therapist_id INTEGER NOT NULL,
-            text TEXT NOT NULL,
-            status TEXT NOT NULL DEFAULT 'open',
-            source_session_id INTEGER,
-            completed_session_id INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (client_id) REFERENCES clients (id),
-            FOREIGN KEY (therapist_id) REFERENCES therapists (id),
-            FOREIGN KEY (source_session_id) REFERENCES sessions (id),
-            FOREIGN KEY (completed_session_id) REFERENCES sessions (id)
-        )
-    """)
-
-    # Create intake_responses table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS intake_responses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            client_id INTEGER,
-            therapist_id INTEGER NOT NULL,
-            form_type TEXT NOT NULL,
-            responses TEXT NOT NULL,
-            status TEXT DEFAULT 'pending',
-            started_at TIMESTAMP,
-            completed_at TIMESTAMP,
-            reviewed_at TIMESTAMP,
-            link_token TEXT UNIQUE,
-            expires_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (client_id) REFERENCES clients (id),
-            FOREIGN KEY (therapist_id) REFERENCES therapists (id)
-        )
-    """)
-
-    # Create assessment_responses table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS assessment_responses (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            client_id INTEGER,
-            therapist_id INTEGER NOT NULL,
-            intake_response_id INTEGER,
-            assessment_id TEXT NOT NULL,
-            responses TEXT NOT NULL,
-            scores TEXT NOT NULL,
-            completed_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (client_id) REFERENCES clients (id),
-            FOREIGN KEY (therapist_id) REFERENCES therapists (id),
-            FOREIGN KEY (intake_response_id) REFERENCES intake_responses (id)
-        )
-    """)
-
-    # Create form_links table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS form_links (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            therapist_id INTEGER NOT NULL,
-            client_email TEXT NOT NULL,
-            client_name TEXT,
-            link_token TEXT UNIQUE NOT NULL,
-            form_type TEXT NOT NULL,
-            included_assessments TEXT,
-            status TEXT DEFAULT 'sent',
-            expires_at TIMESTAMP NOT NULL,
-            sent_at TIMESTAMP,
-            opened_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (therapist_id) REFERENCES therapists (id)
-        )
-    """)
-
-    # Create messages table (bidirectional correspondence)
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS messages (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            sender_id INTEGER NOT NULL,
-            sender_type TEXT NOT NULL,
-            recipient_id INTEGER NOT NULL,
-            recipient_type TEXT NOT NULL,
-            content TEXT NOT NULL,
-            attachments TEXT,
-            related_session_id INTEGER,
-            read BOOLEAN DEFAULT 0,
-            read_at TIMESTAMP,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (related_session_id) REFERENCES sessions (id)
-        )
-    """)
-
-    # Create homework_assignments table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS homework_assignments (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            therapist_id INTEGER NOT NULL,
-            client_id INTEGER NOT NULL,
-            session_id INTEGER,
-            title TEXT NOT NULL,
-            instructions TEXT NOT NULL,
-            attachments TEXT,
-            due_date DATE,
-            status TEXT DEFAULT 'assigned',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (therapist_id) REFERENCES therapists (id),
-            FOREIGN KEY (client_id) REFERENCES clients (id),
-            FOREIGN KEY (session_id) REFERENCES sessions (id)
-        )
-    """)
-
-    # Create homework_submissions table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS homework_submissions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            assignment_id INTEGER NOT NULL,
-            client_id INTEGER NOT NULL,
-            content TEXT NOT NULL,
-            attachments TEXT,
-            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            therapist_feedback TEXT,
-            feedback_at TIMESTAMP,
-            FOREIGN KEY (assignment_id) REFERENCES homework_assignments (id),
-            FOREIGN KEY (client_id) REFERENCES clients (id)
-        )
-    """)
-
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully")
+    """Bring the directory and every shard up to date by applying pending migrations"""
+    if SHARD_COUNT > 1 << (53 - SHARD_ID_BITS):
+        raise RuntimeError(f"DB_SHARD_COUNT can be at most {1 << (53 - SHARD_ID_BITS)}")
+    for database in all_databases():
+        applied = run_migrations(database)
+        if applied:
+            print(f"{database} migrated to version {applied[-1].version}")
+    for shard in range(SHARD_COUNT):
+        reserve_id_range(SHARD_FILE_PATTERN.format(shard), shard)
+
+
+def reserve_id_range(database: str, shard: int) -> None:
+    """Make every AUTOINCREMENT table of a shard file continue in the shard's id range"""
+    floor = shard << SHARD_ID_BITS
+    conn = sqlite3.connect(database)
+    try:
+        tables = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND sql LIKE '%AUTOINCREMENT%'"
+        )]
+        for table in tables:
+            # sqlite_sequence only gets a table's row with its first insert
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ? AND seq < ?", (floor, table, floor))
+            conn.execute(
+                "INSERT INTO sqlite_sequence (name, seq) SELECT ?, ?"
+                " WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = ?)",
+                (table, floor, table)
+            )
+        conn.commit()
+    finally:
+        conn.close()
 
 
-@contextmanager
-def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Context manager for database connections"""
-    conn = sqlite3.connect(DATABASE_URL)
+def open_connection(database: str) -> sqlite3.Connection:
+    """Open a connection and apply the per-connection PRAGMAs"""
+    # Connections are shared between the threadpool workers that serve a
+    # single request, never used concurrently
+    conn = sqlite3.connect(database, check_same_thread=False)
     conn.row_factory = sqlite3.Row  # Enable column access by name
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    # Lets SQL read and write compressed session_content fields
+    conn.create_function("inflate", 1, inflate, deterministic=True)
+    conn.create_function("deflate", 1, deflate, deterministic=True)
+    return conn
+
+
+class PoolExhausted(RuntimeError):
+    """No connection became available in time"""
+
+
+class ConnectionPool:
+    """
+    Fixed-size pool of configured SQLite connections
+
+    Connections are opened lazily up to `size`; once all are handed out,
+    acquire() waits up to `timeout` seconds for one to be released.
+    """
+
+    def __init__(self, database: str, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+
+        if can_open:
+            try:
+                return open_connection(self.database)
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolExhausted(f"Timed out waiting for a connection to {self.database}")
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self._lock:
+                self._opened -= 1
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+_streaming_slots = threading.BoundedSemaphore(STREAMING_CONNECTIONS)
+
+
+def get_pool(database: str = DATABASE_URL) -> ConnectionPool:
+    """Return the process-wide pool for a database file, creating it on first use"""
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = _pools[database] = ConnectionPool(database)
+    return pool
+
+
+def close_pools() -> None:
+    """Close every idle pooled connection (called on shutdown)"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+class _RequestState:
+    """Per-request database routing and the connections open in it"""
+
+    def __init__(self):
+        self.database = DATABASE_URL
+        # database -> [connection, number of get_db() blocks open on it]
+        self.open: Dict[str, list] = {}
+
+
+# Set by request_scope(); None outside of a request. The state object is
+# mutated in place so that routing decided in a dependency (which runs in a
+# copied context on the threadpool) is visible to the route handler.
+_request_state: ContextVar[Optional[_RequestState]] = ContextVar("request_state", default=None)
+
+
+@contextmanager
+def request_scope() -> Generator[None, None, None]:
+    """
+    Route a request's get_db() calls
+
+    Holds no connection itself: get_db() checks one out when a request
+    first needs the database and returns it when that block exits, so
+    slow work outside the database (link previews, uploads, file serving)
+    never occupies the pool.
+    """
+    token = _request_state.set(_RequestState())
     try:
+        yield
+    finally:
+        # A streamed body may still be running with the state; it releases
+        # its own connections
+        _request_state.reset(token)
+
+
+def shard_for_therapist(therapist_id: int) -> str:
+    """Database file holding a therapist's clients, sessions and messages"""
+    if not SHARD_COUNT:
+        return DATABASE_URL
+    return SHARD_FILE_PATTERN.format(therapist_id % SHARD_COUNT)
+
+
+def all_databases() -> List[str]:
+    """The directory database followed by every shard file"""
+    return [DATABASE_URL] + [SHARD_FILE_PATTERN.format(n) for n in range(SHARD_COUNT)]
+
+
+def route_request(database: str) -> None:
+    """Send the current request's get_db() calls to a shard"""
+    state = _request_state.get()
+    if state is not None:
+        state.database = database
+
+
+def current_database() -> str:
+    """Database file get_db() uses by default in the current context"""
+    state = _request_state.get()
+    return state.database if state is not None else DATABASE_URL
+
+
+@contextmanager
+def get_db(database: Optional[str] = None, snapshot: bool = False) -> Generator[sqlite3.Connection, None, None]:
+    """
+    Context manager for database connections
+
+    Defaults to the database the current request is routed to: the
+    therapist's shard once authenticated, otherwise DATABASE_URL. Pass
+    DATABASE_URL explicitly for the therapist directory.
+
+    The connection comes out of the pool when the block is entered and
+    goes back when it exits; get_db() blocks nested inside it in the same
+    request share it. A connection is therefore only held while a thread
+    is running database code, never while a request waits for its next
+    turn on the threadpool, which is what lets the pool itself be the
+    admission control: waiting in acquire() cannot starve a request that
+    already holds a connection.
+
+    With snapshot=True the block runs in one transaction, so every read in
+    it sees the same state of the database even while other connections
+    write (WAL readers keep their snapshot until the transaction ends).
+    """
+    state = _request_state.get()
+    pool = get_pool(database or current_database())
+
+    shared = state.open.get(pool.database) if state is not None else None
+    if shared is None:
+        conn = pool.acquire()
+        if state is not None:
+            shared = state.open[pool.database] = [conn, 0]
+    else:
+        conn = shared[0]
+    if shared is not None:
+        shared[1] += 1
+
+    try:
+        if snapshot and not conn.in_transaction:
+            conn.execute("BEGIN")
         yield conn
         conn.commit()
     except Exception:
         conn.rollback()
         raise
     finally:
-        conn.close()
+        if shared is not None:
+            shared[1] -= 1
+            if shared[1] == 0:
+                del state.open[pool.database]
+                pool.release(conn)
+        else:
+            pool.release(conn)
+
+
+@contextmanager
+def streaming_connection(database: str) -> Generator[sqlite3.Connection, None, None]:
+    """
+    A pooled connection for a response body that reads while it streams
+
+    It is checked out of the same pool as get_db() connections, but at most
+    STREAMING_CONNECTIONS of them are held at once: a streaming body holds
+    its connection across many threadpool turns, and requests waiting in
+    acquire() must always find a connection that is released without one.
+    Raises PoolExhausted straight away when the streaming share is taken.
+    """
+    if not _streaming_slots.acquire(blocking=False):
+        raise PoolExhausted(f"All {STREAMING_CONNECTIONS} streaming connections are in use")
+    try:
+        pool = get_pool(database)
+        conn = pool.acquire()
+        try:
+            yield conn
+        finally:
+            pool.release(conn)
+    finally:
+        _streaming_slots.release()
+
+
+def update_returning(
+    conn: sqlite3.Connection, table: str, assignments: Sequence[str], params: Sequence,
+    where: str, where_params: Sequence
+) -> Optional[sqlite3.Row]:
+    """
+    UPDATE table SET assignments WHERE where, returning the updated row
+
+    Returns None when no row matches, so the WHERE clause can carry the
+    ownership check. One statement with RETURNING where SQLite supports it;
+    otherwise the row is read back with the same WHERE clause.
+    """
+    query = f"UPDATE {table} SET {', '.join(assignments)} WHERE {where}"
+    if SUPPORTS_RETURNING:
+        rows = conn.execute(f"{query} RETURNING *", [*params, *where_params]).fetchall()
+        return rows[0] if rows else None
+
+    if conn.execute(query, [*params, *where_params]).rowcount == 0:
+        return None
+    return conn.execute(f"SELECT * FROM {table} WHERE {where}", where_params).fetchone()
@@ -0,0 +1,314 @@
+"""
+Data Export API Route
+Streams everything a therapist owns as NDJSON, optionally zipped with the
+uploaded files it references
+
+Each line is one {"type": ..., "data": {...}} object. Rows are read table
+by table from open cursors and sent as they are produced, so memory use
+stays flat however large the practice is. The export runs in a single read
+transaction on its own streaming connection: under WAL it sees one snapshot
+of the shard from start to finish while other requests keep writing.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+import io
+import itertools
+import json
+import sqlite3
+import time
+import zipfile
+from datetime import date, datetime
+from pathlib import Path
+from database import PoolExhausted, shard_for_therapist, streaming_connection
+from session_content import CONTENT_FIELDS, inflate
+from auth import get_current_therapist
+from communication_routes import UPLOAD_DIR
+from write_queue import writer
+
+router = APIRouter()
+
+FORMAT_VERSION = 1
+
+# Bytes sent per chunk; each chunk is one hop from the threadpool to the
+# event loop
+CHUNK_SIZE = 64 * 1024
+
+UPLOAD_URL_PREFIX = "/api/uploads/"
+
+# Columns holding JSON text, sent parsed
+JSON_COLUMNS = {
+    'session': ('life_domains', 'emotional_themes', 'interventions'),
+    'message': ('attachments',),
+    'homework_assignment': ('attachments',),
+    'homework_submission': ('attachments',),
+    'intake_response': ('responses',),
+    'assessment_response': ('responses', 'scores'),
+}
+
+# Records whose attachments are packed into the zip
+ATTACHMENT_TYPES = ('message', 'homework_assignment', 'homework_submission')
+
+Record = Tuple[str, Dict[str, Any]]
+
+
+def parse_json_columns(record_type: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    for column in JSON_COLUMNS.get(record_type, ()):
+        if data.get(column):
+            try:
+                data[column] = json.loads(data[column])
+            except ValueError:
+                pass  # Exported as stored
+    return data
+
+
+def uploaded_files(attachments) -> Iterator[str]:
+    """Names of the files in UPLOAD_DIR that an attachments list points to"""
+    if not isinstance(attachments, list):
+        return
+    for attachment in attachments:
+        url = attachment.get('url') if isinstance(attachment, dict) else None
+        if isinstance(url, str) and url.startswith(UPLOAD_URL_PREFIX):
+            name = url[len(UPLOAD_URL_PREFIX):]
+            # Never follow a stored URL out of the upload directory
+            if name and Path(name).name == name:
+                yield name
+
+
+def message_record(row: sqlite3.Row) -> Dict[str, Any]:
+    """A messages row, with a broadcast's shared content filled in"""
+    message = dict(row)
+    content, attachments = message.pop('body_content'), message.pop('body_attachments')
+    if message['body_id'] is not None:
+        message['content'], message['attachments'] = content, attachments
+    return message
+
+
+def session_record(row: sqlite3.Row) -> Dict[str, Any]:
+    """A sessions row joined with its session_content, content inflated"""
+    session = dict(row)
+    for field in CONTENT_FIELDS:
+        session[field] = inflate(session.pop(f'content_{field}'))
+    session['ai_assisted_data_version'] = session['ai_assisted_data_version'] or 0
+    return session
+
+
+def export_records(
+    conn: sqlite3.Connection,
+    therapist: Dict[str, Any],
+    files: Optional[Set[str]] = None
+) -> Iterator[Record]:
+    """
+    Every record of a therapist's data, table by table
+
+    When files is given, the names of the uploaded files referenced by
+    messages and homework are added to it as their rows go by.
+    """
+    therapist_id = therapist['id']
+
+    yield 'export', {
+        'format_version': FORMAT_VERSION,
+        'exported_at': datetime.now().isoformat(),
+        'therapist_id': therapist_id,
+    }
+    yield 'therapist', dict(therapist)
+
+    tables = (
+        ('client', conn.execute("""
+            SELECT * FROM clients WHERE therapist_id = ?
+            ORDER BY last_name, first_name
+        """, (therapist_id,))),
+        # Walks the (therapist_id, session_date, session_time) index, so no
+        # sort has to hold the therapist's sessions
+        ('session', conn.execute("""
+            SELECT
+                s.*,
+                sc.notes AS content_notes,
+                sc.ai_assisted_data AS content_ai_assisted_data,
+                sc.client_insights AS content_client_insights,
+                sc.homework_assigned AS content_homework_assigned,
+                sc.clinical_observations AS content_clinical_observations,
+                sc.risk_assessment AS content_risk_assessment,
+                sc.ai_assisted_data_version
+            FROM sessions s
+            LEFT JOIN session_content sc ON sc.session_id = s.id
+            WHERE s.therapist_id = ?
+            ORDER BY s.session_date, s.session_time
+        """, (therapist_id,))),
+        ('todo', conn.execute("""
+            SELECT t.* FROM clients c
+            JOIN todos t ON t.client_id = c.id
+            WHERE c.therapist_id = ?
+        """, (therapist_id,))),
+        ('message', conn.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE sender_id = ? AND sender_type = 'therapist'
+        """, (therapist_id,))),
+        ('message', conn.execute("""
+            SELECT m.*, b.content AS body_content, b.attachments AS body_attachments
+            FROM messages m LEFT JOIN message_bodies b ON b.id = m.body_id
+            WHERE recipient_id = ? AND recipient_type = 'therapist'
+            AND NOT (sender_id = ? AND sender_type = 'therapist')
+        """, (therapist_id, therapist_id))),
+        ('homework_assignment', conn.execute("""
+            SELECT h.* FROM clients c
+            JOIN homework_assignments h ON h.client_id = c.id
+            WHERE c.therapist_id = ?
+        """, (therapist_id,))),
+        ('homework_submission', conn.execute("""
+            SELECT hs.* FROM clients c
+            JOIN homework_assignments h ON h.client_id = c.id
+            JOIN homework_submissions hs ON hs.assignment_id = h.id
+            WHERE c.therapist_id = ?
+        """, (therapist_id,))),
+        ('intake_response', conn.execute("""
+            SELECT * FROM intake_responses WHERE therapist_id = ?
+        """, (therapist_id,))),
+        ('assessment_response', conn.execute("""
+            SELECT * FROM assessment_responses WHERE therapist_id = ?
+        """, (therapist_id,))),
+    )
+
+    for record_type, cursor in tables:
+        for row in cursor:
+            if record_type == 'session':
+                data = session_record(row)
+            elif record_type == 'message':
+                data = message_record(row)
+            else:
+                data = dict(row)
+            data = parse_json_columns(record_type, data)
+            if files is not None and record_type in ATTACHMENT_TYPES:
+                files.update(uploaded_files(data.get('attachments')))
+            yield record_type, data
+
+
+def ndjson_lines(records: Iterator[Record]) -> Iterator[bytes]:
+    for record_type, data in records:
+        line = json.dumps({'type': record_type, 'data': data}, default=str, ensure_ascii=False)
+        yield line.encode('utf-8') + b"\n"
+
+
+def chunked(pieces: Iterator[bytes]) -> Iterator[bytes]:
+    """Join small pieces into chunks of about CHUNK_SIZE bytes"""
+    buffer, size = [], 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+class ZipSink(io.RawIOBase):
+    """
+    Unseekable file that ZipFile writes into, drained as the zip streams
+
+    Without seek() and tell() ZipFile writes each entry's sizes in a data
+    descriptor after its content, so nothing has to be rewritten later.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._pending = []
+        self.pending_size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._pending.append(bytes(data))
+        self.pending_size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._pending)
+        self._pending, self.pending_size = [], 0
+        return data
+
+
+def zip_chunks(records: Iterator[Record], files: Set[str]) -> Iterator[bytes]:
+    """
+    A zip of export.ndjson followed by attachments/<name> for each upload
+
+    The file names are gathered while export.ndjson is written (ZipFile
+    writes one entry at a time), which is the only state that grows with
+    the export: one short name per uploaded file.
+    """
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        # The size is unknown up front; zip64 allows for more than 4 GiB
+        with archive.open('export.ndjson', 'w', force_zip64=True) as entry:
+            for line in ndjson_lines(records):
+                entry.write(line)
+                if sink.pending_size >= CHUNK_SIZE:
+                    yield sink.drain()
+
+        for name in sorted(files):
+            path = UPLOAD_DIR / name
+            if not path.is_file():
+                continue
+            stat = path.stat()
+            info = zipfile.ZipInfo(f'attachments/{name}', time.localtime(stat.st_mtime)[:6])
+            info.file_size = stat.st_size
+            # Uploads are mostly images and PDFs, already compressed
+            info.compress_type = zipfile.ZIP_STORED
+            with archive.open(info, 'w') as entry, open(path, 'rb') as upload:
+                while block := upload.read(CHUNK_SIZE):
+                    entry.write(block)
+                    yield sink.drain()
+    yield sink.drain()
+
+
+def stream_export(database: str, therapist: Dict[str, Any], attachments: bool) -> Iterator[bytes]:
+    """
+    Response body of an export
+
+    The body outlives the route, so the export reads through a streaming
+    connection of its own for as long as it streams.
+    """
+    with streaming_connection(database) as conn:
+        # Deferred: the snapshot is taken by the first read
+        conn.execute("BEGIN")
+        if attachments:
+            files = set()
+            yield from zip_chunks(export_records(conn, therapist, files), files)
+        else:
+            yield from chunked(ndjson_lines(export_records(conn, therapist)))
+
+
+@router.get("/export")
+def export_data(
+    attachments: bool = False,
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """Download all of the therapist's data as NDJSON, or as a zip with the uploaded files"""
+    # Queued autosaves land before the snapshot is taken
+    writer.flush(therapist['id'])
+
+    stamp = date.today().isoformat()
+    if attachments:
+        media_type, filename = "application/zip", f"therapy-export-{stamp}.zip"
+    else:
+        media_type, filename = "application/x-ndjson", f"therapy-export-{stamp}.ndjson"
+
+    body = stream_export(shard_for_therapist(therapist['id']), therapist, attachments)
+    try:
+        # Runs the body up to its first chunk here, so the connection is
+        # taken (or refused) before the response starts
+        first_chunk = next(body)
+    except PoolExhausted:
+        raise HTTPException(status_code=503, detail="Too many exports in progress, try again shortly")
+
+    return StreamingResponse(
+        itertools.chain([first_chunk], body),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+        }
+    )
@@ -8,14 +8,15 @@ from typing import List
 import json
 import secrets
 from datetime import datetime, timedelta
-from database import get_db
+from database import DATABASE_URL, SHARD_COUNT, get_db, route_request, shard_for_therapist
 from models import (
     FormLinkCreate, FormLink,
     IntakeResponseCreate, IntakeResponseUpdate, IntakeResponse,
     AssessmentResponseCreate, AssessmentResponse,
     IntakeWithAssessments
 )
-from auth import get_current_therapist
+from auth import get_current_therapist_id
+from write_queue import WriteFailed, writer
 
 router = APIRouter(prefix="/api/intake", tags=["intake"])
 
@@ -25,6 +26,57 @@ def generate_secure_token():
     return secrets.token_urlsafe(32)
 
 
+def route_to_link_shard(token: str):
+    """
+    Route a public intake request to the shard of the therapist who issued
+    the link (no-op unless sharding is enabled)
+    """
+    if not SHARD_COUNT:
+        return
+
+    with get_db(DATABASE_URL) as conn:
+        row = conn.execute(
+            "SELECT therapist_id FROM intake_link_routes WHERE link_token = ?", (token,)
+        ).fetchone()
+
+    if not row:
+        raise HTTPException(status_code=404, detail="Invalid link")
+
+    route_request(shard_for_therapist(row[0]))
+
+
+def flush_link_autosaves(token: str) -> None:
+    """Land the queued autosaves of the therapist who issued a link"""
+    with get_db() as conn:
+        row = conn.execute(
+            "SELECT therapist_id FROM form_links WHERE link_token = ?", (token,)
+        ).fetchone()
+    if row:
+        writer.flush(row[0])
+
+
+def save_intake_responses(conn, payload):
+    """Merge autosaved answers into an intake (runs on the group-commit writer)"""
+    intake_id, responses, started_at = payload
+    row = conn.execute(
+        "SELECT responses FROM intake_responses WHERE id = ?", (intake_id,)
+    ).fetchone()
+    existing = json.loads(row[0]) if row and row[0] else {}
+    existing.update(responses)
+
+    conn.execute("""
+        UPDATE intake_responses
+        SET responses = ?, status = 'in_progress', started_at = COALESCE(started_at, ?)
+        WHERE id = ?
+    """, (json.dumps(existing), started_at, intake_id))
+
+
+def merge_intake_responses(older, newer):
+    """Collapse two queued autosaves of the same intake into one"""
+    intake_id, responses, started_at = older
+    return (intake_id, {**responses, **newer[1]}, started_at)
+
+
 # ============================================================================
 # THERAPIST ENDPOINTS (Protected)
 # ============================================================================
@@ -32,21 +84,51 @@ def generate_secure_token():
 @router.post("/create-link", response_model=dict)
 def create_intake_link(
     form_data: FormLinkCreate,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """
     Create a secure intake form link
     Returns link token and public URL
     """
+    # Generate unique token
+    link_token = generate_secure_token()
+
+    # Calculate expiration
+    expires_at = datetime.now() + timedelta(days=form_data.expires_in_days)
+
+    if SHARD_COUNT:
+        # Let public endpoints find this therapist's shard from the token.
+        # The route is written before the link: a route whose link never
+        # got written only leads to a 404, while a link without a route
+        # could never be opened.
+        with get_db(DATABASE_URL) as conn:
+            conn.execute(
+                "INSERT INTO intake_link_routes (link_token, therapist_id) VALUES (?, ?)",
+                (link_token, therapist_id)
+            )
+
+    try:
+        create_link_rows(link_token, expires_at, form_data, therapist_id)
+    except Exception:
+        if SHARD_COUNT:
+            with get_db(DATABASE_URL) as conn:
+                conn.execute("DELETE FROM intake_link_routes WHERE link_token = ?", (link_token,))
+        raise
+
+    return {
+        "link_token": link_token,
+        "public_url": f"/intake/{link_token}",
+        "expires_at": expires_at.isoformat(),
+        "client_email": form_data.client_email,
+        "form_type": form_data.form_type
+    }
+
+
+def create_link_rows(link_token: str, expires_at: datetime, form_data: FormLinkCreate, therapist_id: int) -> None:
+    """Insert a new link and its empty intake response in the therapist's shard"""
     with get_db() as conn:
         cursor = conn.cursor()
 
-        # Generate unique token
-        link_token = generate_secure_token()
-
-        # Calculate expiration
-        expires_at = datetime.now() + timedelta(days=form_data.expires_in_days)
-
         # Insert form link
         cursor.execute("""
             INSERT INTO form_links (
@@ -82,20 +164,12 @@ def create_intake_link(
 
         conn.commit()
 
-        return {
-            "link_token": link_token,
-            "public_url": f"/intake/{link_token}",
-            "expires_at": expires_at.isoformat(),
-            "client_email": form_data.client_email,
-            "form_type": form_data.form_type
-        }
-
 
 @router.post("/send-email")
 def send_intake_email(
     link_token: str,
     custom_message: str = "",
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """
     Send intake form email to client
@@ -134,10 +208,13 @@ def send_intake_email(
 
 
 @router.get("/pending", response_model=List[dict])
-def get_pending_intakes(therapist_id: int = Depends(get_current_therapist)):
+def get_pending_intakes(therapist_id: int = Depends(get_current_therapist_id)):
     """
     Get all pending/completed intake responses for therapist
     """
+    # Land any queued autosaves first; they move intakes to in_progress
+    writer.flush(therapist_id)
+
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -175,11 +252,14 @@ def get_pending_intakes(therapist_id: int = Depends(get_current_therapist)):
 @router.get("/review/{intake_id}", response_model=dict)
 def get_intake_for_review(
     intake_id: int,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """
     Get intake response and assessments for therapist review
     """
+    # Land any queued autosaves first
+    writer.flush(therapist_id)
+
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -236,11 +316,14 @@ def get_intake_for_review(
 def approve_intake(
     intake_id: int,
     create_client: bool = True,
-    therapist_id: int = Depends(get_current_therapist)
+    therapist_id: int = Depends(get_current_therapist_id)
 ):
     """
     Approve intake and optionally create client profile
     """
+    # Land any queued autosaves first
+    writer.flush(therapist_id)
+
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -324,11 +407,14 @@ def approve_intake(
 # PUBLIC ENDPOINTS (No authentication required)
 # ============================================================================
 
-@router.get("/form/{token}", response_model=dict)
+@router.get("/form/{token}", response_model=dict, dependencies=[Depends(route_to_link_shard)])
 def get_intake_form_by_token(token: str):
     """
     Get intake form configuration by token (public endpoint)
     """
+    # Land any queued autosaves first, so a reload shows the latest answers
+    flush_link_autosaves(token)
+
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -380,7 +466,7 @@ def get_intake_form_by_token(token: str):
         }
 
 
-@router.post("/submit/{token}")
+@router.post("/submit/{token}", dependencies=[Depends(route_to_link_shard)])
 def submit_intake_section(token: str, responses: dict):
     """
     Submit intake form section (public endpoint)
@@ -403,9 +489,8 @@ def submit_intake_section(token: str, responses: dict):
         if datetime.now() > expires_at:
             raise HTTPException(status_code=410, detail="Link has expired")
 
-        # Get existing responses
         cursor.execute("""
-            SELECT id, responses, started_at
+            SELECT id, therapist_id
             FROM intake_responses
             WHERE link_token = ?
         """, (token,))
@@ -414,25 +499,25 @@ def submit_intake_section(token: str, responses: dict):
         if not intake:
             raise HTTPException(status_code=404, detail="Intake not found")
 
-        # Merge new responses with existing
-        existing = json.loads(intake[1]) if intake[1] else {}
-        existing.update(responses)
-
-        # Update with merged responses
-        started_at = intake[2] if intake[2] else datetime.now().isoformat()
-
-        cursor.execute("""
-            UPDATE intake_responses
-            SET responses = ?, status = 'in_progress', started_at = ?
-            WHERE id = ?
-        """, (json.dumps(existing), started_at, intake[0]))
-
-        conn.commit()
+        # Merged into the stored responses by the group-commit writer;
+        # repeated autosaves within the commit window collapse into one write
+        try:
+            writer.submit(
+                ('intake_responses', intake[0]),
+                save_intake_responses,
+                (intake[0], responses, datetime.now().isoformat()),
+                merge=merge_intake_responses,
+                owner=intake[1]
+            )
+        except WriteFailed:
+            raise HTTPException(
+                status_code=503, detail="Earlier answers were not saved; please save again"
+            )
 
         return {"success": True, "message": "Progress saved"}
 
 
-@router.post("/submit-assessment/{token}")
+@router.post("/submit-assessment/{token}", dependencies=[Depends(route_to_link_shard)])
 def submit_assessment(token: str, assessment_data: dict):
     """
     Submit assessment responses (public endpoint)
@@ -486,11 +571,14 @@ def submit_assessment(token: str, assessment_data: dict):
         return {"success": True, "message": "Assessment submitted"}
 
 
-@router.post("/complete/{token}")
+@router.post("/complete/{token}", dependencies=[Depends(route_to_link_shard)])
 def complete_intake(token: str):
     """
     Mark intake as completed (public endpoint)
     """
+    # Land any queued autosaves first
+    flush_link_autosaves(token)
+
     with get_db() as conn:
         cursor = conn.cursor()
 
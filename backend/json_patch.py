@@ -0,0 +1,140 @@
+"""
+JSON Patch (RFC 6902) for session documents
+
+Applied in Python because the patched documents are stored compressed and
+SQLite's JSON functions cannot express array insertion, move, copy or
+test. Merge patches (RFC 7396) need none of that and are applied in SQL
+with json_patch().
+"""
+import copy
+from typing import Any, List, Tuple
+
+
+class JsonPatchError(ValueError):
+    """The patch document is malformed or does not apply to the target"""
+
+
+class JsonPatchTestFailed(JsonPatchError):
+    """A `test` operation did not match the current document"""
+
+
+def _parse_pointer(pointer: Any) -> List[str]:
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith('/')):
+        raise JsonPatchError(f"Invalid JSON pointer: {pointer!r}")
+    if pointer == '':
+        return []
+    return [token.replace('~1', '/').replace('~0', '~') for token in pointer[1:].split('/')]
+
+
+def _array_index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == '-':
+        return len(container)
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise JsonPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JsonPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(doc: Any, tokens: List[str]) -> Tuple[Any, str]:
+    """Container holding the target of tokens, and the last token"""
+    container = doc
+    for token in tokens[:-1]:
+        if isinstance(container, dict):
+            if token not in container:
+                raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+            container = container[token]
+        elif isinstance(container, list):
+            container = container[_array_index(container, token, allow_end=False)]
+        else:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+    return container, tokens[-1]
+
+
+def _get(doc: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        return doc
+    container, token = _resolve(doc, tokens)
+    if isinstance(container, dict):
+        if token not in container:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        return container[token]
+    if isinstance(container, list):
+        return container[_array_index(container, token, allow_end=False)]
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def _add(doc: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    container, token = _resolve(doc, tokens)
+    if isinstance(container, dict):
+        container[token] = value
+    elif isinstance(container, list):
+        container.insert(_array_index(container, token, allow_end=True), value)
+    else:
+        raise JsonPatchError(f"Cannot add to a scalar at /{'/'.join(tokens)}")
+    return doc
+
+
+def _remove(doc: Any, tokens: List[str]) -> Tuple[Any, Any]:
+    if not tokens:
+        raise JsonPatchError("Cannot remove the whole document")
+    container, token = _resolve(doc, tokens)
+    if isinstance(container, dict):
+        if token not in container:
+            raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+        return doc, container.pop(token)
+    if isinstance(container, list):
+        return doc, container.pop(_array_index(container, token, allow_end=False))
+    raise JsonPatchError(f"Path not found: /{'/'.join(tokens)}")
+
+
+def apply_json_patch(doc: Any, operations: Any) -> Any:
+    """
+    Apply an RFC 6902 patch and return the new document
+
+    The input document is not modified. Raises JsonPatchTestFailed when a
+    `test` operation fails and JsonPatchError for any other problem.
+    """
+    if not isinstance(operations, list):
+        raise JsonPatchError("A JSON Patch document must be an array of operations")
+
+    doc = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict) or 'op' not in operation or 'path' not in operation:
+            raise JsonPatchError(f"Invalid operation: {operation!r}")
+        op = operation['op']
+        path = _parse_pointer(operation['path'])
+
+        if op in ('add', 'replace', 'test') and 'value' not in operation:
+            raise JsonPatchError(f"'{op}' needs a value")
+        if op in ('move', 'copy') and 'from' not in operation:
+            raise JsonPatchError(f"'{op}' needs a from")
+
+        if op == 'add':
+            doc = _add(doc, path, copy.deepcopy(operation['value']))
+        elif op == 'remove':
+            doc, _ = _remove(doc, path)
+        elif op == 'replace':
+            _get(doc, path)  # target must exist
+            if path:
+                doc, _ = _remove(doc, path)
+            doc = _add(doc, path, copy.deepcopy(operation['value']))
+        elif op == 'move':
+            source = _parse_pointer(operation['from'])
+            if path[:len(source)] == source and path != source:
+                raise JsonPatchError("Cannot move a value into one of its children")
+            doc, value = _remove(doc, source)
+            doc = _add(doc, path, value)
+        elif op == 'copy':
+            value = copy.deepcopy(_get(doc, _parse_pointer(operation['from'])))
+            doc = _add(doc, path, value)
+        elif op == 'test':
+            if _get(doc, path) != operation['value']:
+                raise JsonPatchTestFailed(f"Test failed at {operation['path']}")
+        else:
+            raise JsonPatchError(f"Unknown operation: {op!r}")
+
+    return doc
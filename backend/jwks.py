@@ -0,0 +1,106 @@
+"""
+Clerk JSON Web Key Set (JWKS) management
+
+Keys are fetched once at startup and refreshed by a background thread every
+JWKS_REFRESH_SECONDS. Lookups never wait on that refresh: they are served
+from the last good key set, even if it is stale. Only a token signed with an
+unknown `kid` (e.g. right after a key rotation) triggers an on-demand fetch,
+which concurrent requests share and which is rate limited so a stream of
+forged kids cannot hammer Clerk.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import requests
+from jwt.algorithms import RSAAlgorithm
+
+from cache import SingleFlight
+
+JWKS_REFRESH_SECONDS = float(os.getenv("JWKS_REFRESH_SECONDS", "3600"))
+JWKS_MIN_REFETCH_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+JWKS_FETCH_TIMEOUT = 5
+
+
+def clerk_jwks_url() -> str:
+    """JWKS endpoint: CLERK_JWKS_URL if set, else derived from CLERK_FRONTEND_API"""
+    url = os.getenv('CLERK_JWKS_URL')
+    if url:
+        return url
+
+    clerk_frontend_api = os.getenv('CLERK_FRONTEND_API')
+
+    if not clerk_frontend_api:
+        raise RuntimeError("CLERK_FRONTEND_API environment variable not set")
+
+    return f"https://{clerk_frontend_api}/.well-known/jwks.json"
+
+
+class JWKSManager:
+    def __init__(
+        self,
+        url: Callable[[], str] = clerk_jwks_url,
+        refresh_interval: float = JWKS_REFRESH_SECONDS,
+        min_refetch_interval: float = JWKS_MIN_REFETCH_SECONDS
+    ):
+        self._url = url
+        self.refresh_interval = refresh_interval
+        self.min_refetch_interval = min_refetch_interval
+        self._keys: Dict[str, Any] = {}  # kid -> parsed public key, replaced wholesale
+        self._last_fetch_attempt = 0.0
+        self._fetches = SingleFlight()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Prefetch the key set and start the background refresher"""
+        try:
+            self.refresh()
+        except Exception as e:
+            # Not fatal: the first unknown kid will retry on demand
+            print(f"Warning: initial JWKS fetch failed: {e}")
+
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="jwks-refresh", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def get_key(self, kid: str) -> Optional[Any]:
+        """Parsed public key for kid, or None if Clerk doesn't publish it"""
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: probably a rotation we haven't picked up yet
+        if time.monotonic() - self._last_fetch_attempt >= self.min_refetch_interval:
+            self._fetches.do('jwks', self.refresh)
+        return self._keys.get(kid)
+
+    def refresh(self) -> None:
+        """Fetch the key set and swap it in; on failure the old keys stay"""
+        self._last_fetch_attempt = time.monotonic()
+
+        response = requests.get(self._url(), timeout=JWKS_FETCH_TIMEOUT)
+        response.raise_for_status()
+
+        keys = {}
+        for jwk in response.json().get('keys', []):
+            if jwk.get('kid') and jwk.get('kty') == 'RSA':
+                keys[jwk['kid']] = RSAAlgorithm.from_jwk(jwk)
+        self._keys = keys
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self._fetches.do('jwks', self.refresh)
+            except Exception as e:
+                print(f"Warning: JWKS refresh failed, keeping previous keys: {e}")
+
+
+jwks_manager = JWKSManager()
@@ -1,21 +1,35 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Body, Header, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Optional, Union
+import sqlite3
+from datetime import date, datetime, timedelta
 import json
 import os
 from dotenv import load_dotenv
 
-from database import init_db, get_db
+from database import DATABASE_URL, init_db, get_db, update_returning, request_scope, close_pools
 from models import (
     Client, ClientCreate, ClientUpdate,
-    Session, SessionCreate, SessionUpdate, SessionWithClient,
+    Session, SessionCreate, SessionUpdate, SessionCalendarEntry,
+    SessionFields, SessionFieldsWithClient, SessionSearchResult, AIDataPatchResult,
+    DashboardBootstrap, ClientWorkspace,
     Therapist, TherapistUpdate,
     Todo, TodoCreate, TodoUpdate
 )
-from auth import get_current_therapist
+from auth import get_current_therapist, invalidate_therapist
+from data_versions import not_modified
+from pagination import PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, HAS_MORE_HEADER, decode_cursor, fetch_page
+from jwks import jwks_manager
+from write_queue import WriteFailed, writer
+from session_search import search_sessions
+from session_content import (
+    CONTENT_FIELDS, deflate, inflate, parse_ai_assisted_data, save_session_content, load_session_content,
+    transcript_digest
+)
+from json_patch import JsonPatchError, JsonPatchTestFailed, apply_json_patch
 from intake_routes import router as intake_router
 from communication_routes import router as communication_router
+from export_routes import router as export_router
 
 # Load environment variables
 load_dotenv()
@@ -29,13 +43,31 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, HAS_MORE_HEADER],
 )
 
 
+@app.middleware("http")
+async def route_request_database(request: Request, call_next):
+    """Let the auth dependency route the request's get_db() calls to a shard"""
+    with request_scope():
+        return await call_next(request)
+
+
 @app.on_event("startup")
 def startup_event():
     """Initialize database on startup"""
     init_db()
+    writer.start()
+    jwks_manager.start()
+
+
+@app.on_event("shutdown")
+def shutdown_event():
+    """Flush queued writes and close pooled database connections"""
+    jwks_manager.stop()
+    writer.stop()
+    close_pools()
 
 
 @app.get("/")
@@ -49,10 +81,13 @@ app.include_router(intake_router)
 # Include communication routes (todos, messages, homework)
 app.include_router(communication_router, prefix="/api")
 
+# Include the data export
+app.include_router(export_router, prefix="/api")
+
 
 # Authentication Endpoints
 @app.post("/api/auth/sync", response_model=Therapist)
-async def sync_therapist(therapist: Dict[str, Any] = Depends(get_current_therapist)):
+def sync_therapist(therapist: Dict[str, Any] = Depends(get_current_therapist)):
     """
     Auto-create/sync therapist record on first login
     Called automatically by frontend after Clerk authentication
@@ -61,13 +96,13 @@ async def sync_therapist(therapist: Dict[str, Any] = Depends(get_current_therapi
 
 
 @app.get("/api/auth/me", response_model=Therapist)
-async def get_current_user(therapist: Dict[str, Any] = Depends(get_current_therapist)):
+def get_current_user(therapist: Dict[str, Any] = Depends(get_current_therapist)):
     """Return current authenticated therapist info"""
     return therapist
 
 
 @app.patch("/api/therapist/practice-type", response_model=Therapist)
-async def update_practice_type(
+def update_practice_type(
     update_data: TherapistUpdate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -75,7 +110,8 @@ async def update_practice_type(
     Update the practice type for the current therapist
     Used during onboarding or when user changes their practice type
     """
-    with get_db() as conn:
+    # Therapist accounts live in the directory database
+    with get_db(DATABASE_URL) as conn:
         cursor = conn.cursor()
 
         # Update practice_type
@@ -92,35 +128,61 @@ async def update_practice_type(
         if not updated_therapist:
             raise HTTPException(status_code=404, detail="Therapist not found")
 
-        return dict(updated_therapist)
+    # Only once committed: a cache miss before then would reload and cache
+    # the old row for the full TTL
+    invalidate_therapist(therapist['clerk_user_id'])
+
+    return dict(updated_therapist)
 
 
 # Client Endpoints
-@app.get("/api/clients", response_model=List[Client])
-async def get_clients(
+def fetch_clients_page(conn, therapist_id: int, status: str = None, limit: int = PAGE_SIZE, cursor: str = None):
+    """One page of a therapist's clients ordered by name, and the next page's cursor"""
+    after = decode_cursor(cursor, 3)
+
+    query = "SELECT * FROM clients WHERE therapist_id = ?"
+    params = [therapist_id]
+    if status == 'active':
+        # As a literal, so the partial index on active clients applies
+        query += " AND status = 'active'"
+    elif status:
+        query += " AND status = ?"
+        params.append(status)
+    if after:
+        query += " AND (last_name, first_name, id) > (?, ?, ?)"
+        params.extend(after)
+    query += " ORDER BY last_name, first_name, id LIMIT ?"
+    params.append(limit + 1)
+
+    rows, next_cursor = fetch_page(
+        conn.execute(query, params), limit,
+        lambda row: (row['last_name'], row['first_name'], row['id'])
+    )
+    return [dict(row) for row in rows], next_cursor
+
+
+@app.get("/api/clients", response_model=List[Client], dependencies=[Depends(not_modified)])
+def get_clients(
+    response: Response,
     status: str = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
-    """Get all clients for the current therapist, optionally filtered by status"""
+    """
+    Get one page of the current therapist's clients, ordered by name and
+    optionally filtered by status. Pass the X-Next-Cursor header of a page
+    as `cursor` to get the next one.
+    """
     with get_db() as conn:
-        cursor = conn.cursor()
-        if status:
-            cursor.execute(
-                "SELECT * FROM clients WHERE therapist_id = ? AND status = ? ORDER BY last_name, first_name",
-                (therapist['id'], status)
-            )
-        else:
-            cursor.execute(
-                "SELECT * FROM clients WHERE therapist_id = ? ORDER BY last_name, first_name",
-                (therapist['id'],)
-            )
-
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        clients, next_cursor = fetch_clients_page(conn, therapist['id'], status, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return clients
 
 
 @app.get("/api/clients/{client_id}", response_model=Client)
-async def get_client(
+def get_client(
     client_id: int,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -140,7 +202,7 @@ async def get_client(
 
 
 @app.post("/api/clients", response_model=Client, status_code=201)
-async def create_client(
+def create_client(
     client: ClientCreate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -172,49 +234,43 @@ async def create_client(
 
 
 @app.put("/api/clients/{client_id}", response_model=Client)
-async def update_client(
+def update_client(
     client_id: int,
     client: ClientUpdate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Update an existing client (must belong to current therapist)"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Check if client exists and belongs to therapist
-        cursor.execute(
-            "SELECT * FROM clients WHERE id = ? AND therapist_id = ?",
-            (client_id, therapist['id'])
-        )
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Client not found")
-
-        # Build update query dynamically for provided fields
-        update_fields = []
-        values = []
+    # Build update query dynamically for provided fields
+    update_fields = []
+    values = []
 
-        for field, value in client.model_dump(exclude_unset=True).items():
-            if value is not None:
-                update_fields.append(f"{field} = ?")
-                values.append(value)
+    for field, value in client.model_dump(exclude_unset=True).items():
+        if value is not None:
+            update_fields.append(f"{field} = ?")
+            values.append(value)
 
+    with get_db() as conn:
         if update_fields:
             update_fields.append("updated_at = ?")
             values.append(datetime.now().isoformat())
-            values.append(client_id)
-
-            query = f"UPDATE clients SET {', '.join(update_fields)} WHERE id = ?"
-            cursor.execute(query, values)
+            row = update_returning(
+                conn, "clients", update_fields, values,
+                "id = ? AND therapist_id = ?", (client_id, therapist['id'])
+            )
+        else:
+            row = conn.execute(
+                "SELECT * FROM clients WHERE id = ? AND therapist_id = ?",
+                (client_id, therapist['id'])
+            ).fetchone()
 
-        # Return updated client
-        cursor.execute("SELECT * FROM clients WHERE id = ?", (client_id,))
-        row = cursor.fetchone()
+        if not row:
+            raise HTTPException(status_code=404, detail="Client not found")
 
         return dict(row)
 
 
 @app.delete("/api/clients/{client_id}", status_code=204)
-async def delete_client(
+def delete_client(
     client_id: int,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -239,113 +295,119 @@ async def delete_client(
         return None
 
 
-@app.get("/api/clients/{client_id}/session-prep")
-async def get_session_prep(
-    client_id: int,
-    therapist: Dict[str, Any] = Depends(get_current_therapist)
-):
+def build_session_prep(conn, therapist_id: int, client_id: int) -> Dict[str, Any]:
     """
-    Get pre-session preparation data for a client:
+    Pre-session preparation data for a client:
     - Last session summary
     - Open to-dos with session context
     - Client stats
     """
-    with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Verify client belongs to therapist
-        cursor.execute(
-            "SELECT * FROM clients WHERE id = ? AND therapist_id = ?",
-            (client_id, therapist['id'])
-        )
-        client = cursor.fetchone()
-        if not client:
-            raise HTTPException(status_code=404, detail="Client not found")
-
-        client_dict = dict(client)
-
-        # Get last session
-        cursor.execute("""
-            SELECT * FROM sessions
+    cursor = conn.cursor()
+
+    # Verify client belongs to therapist
+    cursor.execute(
+        "SELECT * FROM clients WHERE id = ? AND therapist_id = ?",
+        (client_id, therapist_id)
+    )
+    client = cursor.fetchone()
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    client_dict = dict(client)
+
+    # Get last session
+    cursor.execute("""
+        SELECT * FROM sessions
+        WHERE client_id = ? AND therapist_id = ? AND status = 'completed'
+        ORDER BY session_date DESC, session_time DESC
+        LIMIT 1
+    """, (client_id, therapist_id))
+    last_session_row = cursor.fetchone()
+    last_session = None
+    if last_session_row:
+        last_session = dict(last_session_row)
+        last_session.update(load_session_content(conn, last_session['id']))
+
+    # Open to-dos with session context. sessions_ago counts the
+    # completed sessions after each to-do's source session: one pass of
+    # a running count over the client's completed sessions and the
+    # to-dos' source dates, newest first (same-day timed sessions count)
+    cursor.execute("""
+        WITH timeline AS (
+            SELECT session_date AS day,
+                   CASE WHEN session_time > '00:00' THEN 0 ELSE 2 END AS slot,
+                   1 AS completed,
+                   NULL AS todo_id
+            FROM sessions
             WHERE client_id = ? AND therapist_id = ? AND status = 'completed'
-            ORDER BY session_date DESC, session_time DESC
-            LIMIT 1
-        """, (client_id, therapist['id']))
-        last_session_row = cursor.fetchone()
-        last_session = dict(last_session_row) if last_session_row else None
-
-        # Get open to-dos with session context
-        cursor.execute("""
-            SELECT t.*, s.session_date as source_session_date
+            UNION ALL
+            SELECT s.session_date, 1, 0, t.id
             FROM todos t
-            LEFT JOIN sessions s ON t.source_session_id = s.id
+            JOIN sessions s ON t.source_session_id = s.id
             WHERE t.client_id = ? AND t.therapist_id = ? AND t.status = 'open'
-            ORDER BY t.created_at DESC
-        """, (client_id, therapist['id']))
-        todos_rows = cursor.fetchall()
-        todos = []
-        for row in todos_rows:
-            todo_dict = dict(row)
-            # Calculate how many sessions ago this todo was created
-            if todo_dict.get('source_session_id'):
-                cursor.execute("""
-                    SELECT COUNT(*) FROM sessions
-                    WHERE client_id = ? AND therapist_id = ? AND status = 'completed'
-                    AND (session_date > ? OR (session_date = ? AND session_time > ?))
-                """, (
-                    client_id,
-                    therapist['id'],
-                    todo_dict['source_session_date'],
-                    todo_dict['source_session_date'],
-                    '00:00'  # Default time if not specified
-                ))
-                sessions_since = cursor.fetchone()[0]
-                todo_dict['sessions_ago'] = sessions_since
-            else:
-                todo_dict['sessions_ago'] = None
-            todos.append(todo_dict)
-
-        # Get client stats
-        # Total completed sessions
-        cursor.execute("""
-            SELECT COUNT(*) FROM sessions
-            WHERE client_id = ? AND therapist_id = ? AND status = 'completed'
-        """, (client_id, therapist['id']))
-        total_sessions = cursor.fetchone()[0]
-
-        # Days since first session (how long they've been a client)
-        cursor.execute("""
-            SELECT MIN(session_date) FROM sessions
-            WHERE client_id = ? AND therapist_id = ?
-        """, (client_id, therapist['id']))
-        first_session_date = cursor.fetchone()[0]
-        days_as_client = None
-        if first_session_date:
-            from datetime import date
-            first_date = date.fromisoformat(first_session_date)
-            days_as_client = (date.today() - first_date).days
-
-        # Last session date
-        last_session_date = last_session['session_date'] if last_session else None
-
-        return {
-            'client': client_dict,
-            'last_session': last_session,
-            'open_todos': todos,
-            'stats': {
-                'total_sessions': total_sessions,
-                'days_as_client': days_as_client,
-                'last_session_date': last_session_date
-            }
+        ),
+        counted AS (
+            SELECT todo_id,
+                   SUM(completed) OVER (ORDER BY day DESC, slot ROWS UNBOUNDED PRECEDING) AS sessions_ago
+            FROM timeline
+        )
+        SELECT t.*, s.session_date as source_session_date, counted.sessions_ago
+        FROM todos t
+        LEFT JOIN sessions s ON t.source_session_id = s.id
+        LEFT JOIN counted ON counted.todo_id = t.id
+        WHERE t.client_id = ? AND t.therapist_id = ? AND t.status = 'open'
+        ORDER BY t.created_at DESC
+    """, (client_id, therapist_id) * 3)
+    todos = [dict(row) for row in cursor.fetchall()]
+
+    # Client stats, kept current by triggers on sessions and todos
+    cursor.execute("SELECT * FROM client_stats WHERE client_id = ?", (client_id,))
+    stats = cursor.fetchone()
+    total_sessions = stats['completed_sessions'] if stats else 0
+    first_session_date = stats['first_session_date'] if stats else None
+    open_todo_count = stats['open_todos'] if stats else 0
+
+    # Days since first session (how long they've been a client)
+    days_as_client = None
+    if first_session_date:
+        from datetime import date
+        first_date = date.fromisoformat(first_session_date)
+        days_as_client = (date.today() - first_date).days
+
+    # Last session date
+    last_session_date = last_session['session_date'] if last_session else None
+
+    return {
+        'client': client_dict,
+        'last_session': last_session,
+        'open_todos': todos,
+        'stats': {
+            'total_sessions': total_sessions,
+            'days_as_client': days_as_client,
+            'last_session_date': last_session_date,
+            'open_todos': open_todo_count
         }
+    }
+
+
+@app.get("/api/clients/{client_id}/session-prep", dependencies=[Depends(not_modified)])
+def get_session_prep(
+    client_id: int,
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """Get pre-session preparation data for a client"""
+    with get_db() as conn:
+        return build_session_prep(conn, therapist['id'], client_id)
 
 
 # Helper function to parse session row
 def parse_session_row(row):
     """Parse a session row and deserialize JSON fields"""
     session_dict = dict(row)
-    # Parse JSON fields
+    # Parse JSON fields (only those the query selected)
     for field in ['life_domains', 'emotional_themes', 'interventions']:
+        if field not in session_dict:
+            continue
         if session_dict.get(field):
             try:
                 session_dict[field] = json.loads(session_dict[field])
@@ -356,6 +418,70 @@ def parse_session_row(row):
     return session_dict
 
 
+def attach_session_content(conn, session_dict):
+    """Fill in a parsed session's fields stored out of row in session_content"""
+    session_dict.update(load_session_content(conn, session_dict['id']))
+    return session_dict
+
+
+def save_ai_assisted_data(conn, payload):
+    """Write an autosaved ai_assisted_data blob (runs on the group-commit writer)"""
+    session_id, ai_assisted_data, updated_at = payload
+    save_session_content(conn, session_id, {'ai_assisted_data': ai_assisted_data})
+    conn.execute(
+        "UPDATE sessions SET updated_at = ? WHERE id = ?",
+        (updated_at, session_id)
+    )
+
+
+# Columns a `fields=` projection may pick, in table order
+SESSION_FIELDS = (
+    'id', 'client_id', 'session_date', 'session_time', 'duration_minutes', 'status',
+    'notes', 'summary', 'life_domains', 'emotional_themes', 'interventions',
+    'ai_assisted_data', 'overall_progress', 'session_summary', 'client_insights',
+    'homework_assigned', 'clinical_observations', 'risk_assessment',
+    'created_at', 'updated_at'
+)
+
+# Flags a `fields=` projection may pick, computed in SQL without inflating
+# the text they summarize (an empty field is stored as deflate(''))
+SESSION_FLAGS = {
+    'has_risk': "EXISTS (SELECT 1 FROM session_content WHERE session_id = s.id"
+                f" AND risk_assessment IS NOT NULL AND risk_assessment <> x'{deflate('').hex()}')",
+}
+
+# What list endpoints return without `fields=`: no transcripts, AI data,
+# free-text notes or structured JSON
+SESSION_SUMMARY_FIELDS = (
+    'id', 'client_id', 'session_date', 'session_time', 'duration_minutes', 'status',
+    'summary', 'overall_progress', 'session_summary'
+)
+
+
+def session_columns(fields: Optional[str]) -> str:
+    """
+    SQL column list for a comma-separated `fields=` projection of sessions
+
+    id, session_date and session_time are always included (they identify
+    the row and form the pagination key). Unknown names are a 400.
+    """
+    if fields:
+        requested = [name.strip() for name in fields.split(',') if name.strip()]
+        unknown = sorted(set(requested) - set(SESSION_FIELDS) - set(SESSION_FLAGS))
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        requested = SESSION_SUMMARY_FIELDS
+
+    selected = {'id', 'session_date', 'session_time', *requested}
+    return ", ".join([
+        # Large text lives compressed in session_content
+        f"(SELECT inflate({name}) FROM session_content WHERE session_id = s.id) AS {name}"
+        if name in CONTENT_FIELDS else f"s.{name}"
+        for name in SESSION_FIELDS if name in selected
+    ] + [f"{sql} AS {name}" for name, sql in SESSION_FLAGS.items() if name in selected])
+
+
 def parse_session_with_client_row(row):
     """Parse session row with client info embedded"""
     session_dict = parse_session_row(row)
@@ -366,66 +492,173 @@ def parse_session_with_client_row(row):
 
 
 # Session endpoints
-@app.get("/api/sessions", response_model=List[Session])
-async def get_sessions(
-    client_id: int = None,
-    therapist: Dict[str, Any] = Depends(get_current_therapist)
+def fetch_sessions_page(
+    conn, therapist_id: int, client_id: int = None, fields: str = None,
+    limit: int = PAGE_SIZE, cursor: str = None
 ):
-    """Get all sessions for current therapist's clients, optionally filtered by client_id"""
-    with get_db() as conn:
-        cursor = conn.cursor()
-        if client_id:
-            # Verify client belongs to therapist and get their sessions
-            cursor.execute("""
-                SELECT s.* FROM sessions s
-                JOIN clients c ON s.client_id = c.id
-                WHERE s.client_id = ? AND c.therapist_id = ?
-                ORDER BY s.session_date DESC
-            """, (client_id, therapist['id']))
+    """One page of a therapist's sessions, newest first, and the next page's cursor"""
+    after = decode_cursor(cursor, 3)
+
+    # Read in reverse off idx_sessions_therapist_keyset. NULL sorts lowest,
+    # so sessions without a time come after the timed ones of the same day.
+    query = """
+        SELECT {columns} FROM sessions s
+        WHERE s.therapist_id = ?
+    """
+    params = [therapist_id]
+    if client_id:
+        query += " AND s.client_id = ?"
+        params.append(client_id)
+    if after:
+        # The cursor carries '' for a NULL time. A row tuple comparison
+        # never matches NULL, so the time step is spelled out.
+        after_date, after_time, after_id = after
+        query += " AND s.session_date <= ? AND (s.session_date < ? OR s.session_date = ? AND "
+        params.extend([after_date, after_date, after_date])
+        if after_time:
+            query += "(s.session_time < ? OR s.session_time IS NULL OR s.session_time = ? AND s.id < ?))"
+            params.extend([after_time, after_time, after_id])
         else:
-            # Get all sessions for therapist's clients
-            cursor.execute("""
-                SELECT s.* FROM sessions s
-                JOIN clients c ON s.client_id = c.id
-                WHERE c.therapist_id = ?
-                ORDER BY s.session_date DESC
-            """, (therapist['id'],))
+            query += "s.session_time IS NULL AND s.id < ?)"
+            params.append(after_id)
+    query += """
+        ORDER BY s.session_date DESC, s.session_time DESC, s.id DESC
+        LIMIT ?
+    """
+    params.append(limit + 1)
 
-        rows = cursor.fetchall()
-        return [parse_session_row(row) for row in rows]
+    rows, next_cursor = fetch_page(
+        conn.execute(query.format(columns=session_columns(fields)), params), limit,
+        lambda row: (row['session_date'], row['session_time'] or '', row['id'])
+    )
+    return [parse_session_row(row) for row in rows], next_cursor
 
 
-@app.get("/api/sessions/today", response_model=List[SessionWithClient])
-async def get_today_sessions(therapist: Dict[str, Any] = Depends(get_current_therapist)):
-    """Get all sessions scheduled for today for current therapist's clients"""
+@app.get(
+    "/api/sessions", response_model=List[SessionFields], response_model_exclude_unset=True,
+    dependencies=[Depends(not_modified)]
+)
+def get_sessions(
+    response: Response,
+    client_id: int = None,
+    fields: str = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str = None,
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Get one page of sessions for the current therapist's clients, newest
+    first, optionally filtered by client_id. Pass the X-Next-Cursor header
+    of a page as `cursor` to get the next one.
+
+    Returns the summary fields unless `fields` lists the ones wanted; the
+    full session is available from /api/sessions/{session_id}.
+    """
+    with get_db() as conn:
+        sessions, next_cursor = fetch_sessions_page(conn, therapist['id'], client_id, fields, limit, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return sessions
+
+
+def fetch_today_sessions(conn, therapist_id: int, fields: str = None) -> List[Dict[str, Any]]:
+    """A therapist's sessions for today with client names, in time order"""
+    query = """
+        SELECT
+            {columns},
+            c.first_name,
+            c.last_name
+        FROM sessions s
+        JOIN clients c ON s.client_id = c.id
+        WHERE s.session_date = ? AND c.therapist_id = ?
+        ORDER BY
+            CASE WHEN s.session_time IS NULL THEN 1 ELSE 0 END,
+            s.session_time ASC,
+            s.created_at ASC
+    """
     today = datetime.now().date().isoformat()
+    rows = conn.execute(query.format(columns=session_columns(fields)), (today, therapist_id))
+    return [parse_session_with_client_row(row) for row in rows]
+
+
+def fetch_sessions_in_range(
+    conn, therapist_id: int, date_from: Optional[date], date_to: date, status: str = None
+) -> List[Dict[str, Any]]:
+    """
+    A therapist's sessions between two dates (inclusive) in calendar order;
+    without date_from, every session up to date_to
+    """
+    query = """
+        SELECT
+            s.id, s.client_id, s.session_date, s.session_time,
+            s.duration_minutes, s.status,
+            c.first_name, c.last_name
+        FROM sessions s
+        JOIN clients c ON s.client_id = c.id
+        WHERE s.therapist_id = ? AND s.session_date <= ?
+    """
+    params = [therapist_id, date_to.isoformat()]
+    if date_from:
+        query += " AND s.session_date >= ?"
+        params.append(date_from.isoformat())
+    if status:
+        query += " AND s.status = ?"
+        params.append(status)
+    query += " ORDER BY s.session_date, s.session_time, s.id"
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+@app.get(
+    "/api/sessions/today", response_model=List[SessionFieldsWithClient], response_model_exclude_unset=True,
+    dependencies=[Depends(not_modified)]
+)
+def get_today_sessions(
+    fields: str = None,
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Get all sessions scheduled for today for current therapist's clients
 
+    Returns the summary fields plus client name unless `fields` lists the
+    ones wanted.
+    """
     with get_db() as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT
-                s.*,
-                c.first_name,
-                c.last_name
-            FROM sessions s
-            JOIN clients c ON s.client_id = c.id
-            WHERE s.session_date = ? AND c.therapist_id = ?
-            ORDER BY
-                CASE WHEN s.session_time IS NULL THEN 1 ELSE 0 END,
-                s.session_time ASC,
-                s.created_at ASC
-        """, (today, therapist['id']))
+        return fetch_today_sessions(conn, therapist['id'], fields)
+
+
+@app.get(
+    "/api/sessions/range", response_model=List[SessionCalendarEntry],
+    dependencies=[Depends(not_modified)]
+)
+def get_sessions_in_range(
+    date_from: Optional[date] = Query(None, alias="from"),
+    date_to: date = Query(..., alias="to"),
+    status: str = None,
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Get the current therapist's sessions between two dates (inclusive,
+    YYYY-MM-DD) in calendar order, optionally filtered by status
 
-        rows = cursor.fetchall()
-        return [parse_session_with_client_row(row) for row in rows]
+    Without `from` the range starts at the earliest session, so
+    `?to=...&status=scheduled` includes appointments that are past due.
+    """
+    if date_from and date_from > date_to:
+        raise HTTPException(status_code=422, detail="'from' must not be after 'to'")
+
+    with get_db() as conn:
+        return fetch_sessions_in_range(conn, therapist['id'], date_from, date_to, status)
 
 
 @app.get("/api/sessions/{session_id}", response_model=Session)
-async def get_session(
+def get_session(
     session_id: int,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Get a specific session by ID (must belong to therapist's client)"""
+    # Land any queued autosaves first
+    writer.flush(therapist['id'])
+
     with get_db() as conn:
         cursor = conn.cursor()
         cursor.execute("""
@@ -438,11 +671,11 @@ async def get_session(
         if not row:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        return parse_session_row(row)
+        return attach_session_content(conn, parse_session_row(row))
 
 
 @app.post("/api/sessions", response_model=Session, status_code=201)
-async def create_session(
+def create_session(
     session: SessionCreate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -462,9 +695,8 @@ async def create_session(
             INSERT INTO sessions (
                 client_id, session_date, session_time, duration_minutes, status,
                 life_domains, emotional_themes, interventions,
-                overall_progress, session_summary, client_insights,
-                homework_assigned, clinical_observations, risk_assessment, therapist_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                overall_progress, session_summary, therapist_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             session.client_id,
             session.session_date,
@@ -476,45 +708,76 @@ async def create_session(
             json.dumps(session.interventions),
             session.overall_progress,
             session.session_summary,
-            session.client_insights,
-            session.homework_assigned,
-            session.clinical_observations,
-            session.risk_assessment,
             therapist['id']
         ))
 
         session_id = cursor.lastrowid
+        save_session_content(conn, session_id, {
+            field: getattr(session, field) for field in CONTENT_FIELDS
+            if getattr(session, field) is not None
+        })
         cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
         row = cursor.fetchone()
 
-        return parse_session_row(row)
+        return attach_session_content(conn, parse_session_row(row))
 
 
 @app.put("/api/sessions/{session_id}", response_model=Session)
-async def update_session(
+def update_session(
     session_id: int,
     session: SessionUpdate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Update an existing session (must belong to therapist's client)"""
-    with get_db() as conn:
-        cursor = conn.cursor()
+    changes = session.model_dump(exclude_unset=True)
+    is_autosave = set(changes) == {'ai_assisted_data'} and changes['ai_assisted_data'] is not None
 
-        # Check if session exists and belongs to therapist
-        cursor.execute("""
-            SELECT s.* FROM sessions s
-            JOIN clients c ON s.client_id = c.id
-            WHERE s.id = ? AND c.therapist_id = ?
-        """, (session_id, therapist['id']))
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Session not found")
+    if not is_autosave:
+        # Queued autosaves for this session must not land after this write
+        writer.flush(therapist['id'])
 
-        # Build update query dynamically for provided fields
+    with get_db() as conn:
+        if is_autosave:
+            existing = conn.execute(
+                "SELECT * FROM sessions WHERE id = ? AND therapist_id = ?",
+                (session_id, therapist['id'])
+            ).fetchone()
+            if not existing:
+                raise HTTPException(status_code=404, detail="Session not found")
+
+            # Group-committed on the writer thread; answer with the row as
+            # it will read once the write lands
+            updated_at = datetime.now().isoformat()
+            try:
+                writer.submit(
+                    ('session_ai_data', session_id),
+                    save_ai_assisted_data,
+                    (session_id, changes['ai_assisted_data'], updated_at),
+                    owner=therapist['id']
+                )
+            except WriteFailed:
+                raise HTTPException(
+                    status_code=503, detail="The previous autosave was not stored; save the whole document again"
+                )
+            session_dict = attach_session_content(conn, parse_session_row(existing))
+            session_dict['ai_assisted_data'] = changes['ai_assisted_data']
+            # Writes collapsed in the queue bump the version once
+            session_dict['ai_assisted_data_version'] += 1
+            session_dict['updated_at'] = updated_at
+            return session_dict
+
+        # Build update query dynamically for provided fields; large text
+        # goes to session_content instead
         update_fields = []
         values = []
+        content = {}
 
-        for field, value in session.model_dump(exclude_unset=True).items():
+        for field, value in changes.items():
             if value is not None:
+                if field in CONTENT_FIELDS:
+                    content[field] = value
+                    continue
+
                 # Serialize JSON fields
                 if field in ['life_domains', 'emotional_themes', 'interventions']:
                     value = json.dumps(value)
@@ -522,27 +785,168 @@ async def update_session(
                 update_fields.append(f"{field} = ?")
                 values.append(value)
 
-        if update_fields:
+        if update_fields or content:
             update_fields.append("updated_at = ?")
             values.append(datetime.now().isoformat())
-            values.append(session_id)
+            row = update_returning(
+                conn, "sessions", update_fields, values,
+                "id = ? AND therapist_id = ?", (session_id, therapist['id'])
+            )
+        else:
+            row = conn.execute(
+                "SELECT * FROM sessions WHERE id = ? AND therapist_id = ?",
+                (session_id, therapist['id'])
+            ).fetchone()
 
-            query = f"UPDATE sessions SET {', '.join(update_fields)} WHERE id = ?"
-            cursor.execute(query, values)
+        if not row:
+            raise HTTPException(status_code=404, detail="Session not found")
 
-        # Return updated session
-        cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
+        save_session_content(conn, session_id, content)
+        return attach_session_content(conn, parse_session_row(row))
 
-        return parse_session_row(row)
+
+def parse_version_header(value: Optional[str]) -> Optional[int]:
+    """Version number from an If-Match header ("3", W/"3" or 3); None for absent or *"""
+    if value is None or value.strip() == '*':
+        return None
+    tag = value.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    tag = tag.strip('"')
+    if not tag.isdigit():
+        raise HTTPException(status_code=400, detail="If-Match must be a version number")
+    return int(tag)
+
+
+@app.patch("/api/sessions/{session_id}/ai-data", response_model=AIDataPatchResult)
+def patch_ai_assisted_data(
+    session_id: int,
+    request: Request,
+    response: Response,
+    patch: Union[List[Any], Dict[str, Any]] = Body(...),
+    if_match: Optional[str] = Header(None),
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Apply a patch to a session's ai_assisted_data
+
+    The body is a JSON Patch (RFC 6902, application/json-patch+json) or a
+    merge patch (RFC 7396, application/merge-patch+json); with plain
+    application/json an array is read as JSON Patch and an object as a
+    merge patch. If-Match carries the ai_assisted_data_version the patch
+    was computed against; a stale version is rejected with 412. Returns
+    the new version (also as ETag), not the document.
+    """
+    content_type = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    if content_type == 'application/json-patch+json':
+        is_merge = False
+    elif content_type == 'application/merge-patch+json':
+        is_merge = True
+    else:
+        is_merge = isinstance(patch, dict)
+    if is_merge != isinstance(patch, dict):
+        raise HTTPException(
+            status_code=400,
+            detail="JSON Patch must be an array, merge patch must be an object"
+        )
+    expected_version = parse_version_header(if_match)
+
+    # Autosaves still queued for this session land (and bump the version) first
+    writer.flush(therapist['id'])
+
+    with get_db() as conn:
+        cursor = conn.cursor()
+
+        # Check if session exists and belongs to therapist
+        cursor.execute("""
+            SELECT s.id FROM sessions s
+            JOIN clients c ON s.client_id = c.id
+            WHERE s.id = ? AND c.therapist_id = ?
+        """, (session_id, therapist['id']))
+        if not cursor.fetchone():
+            raise HTTPException(status_code=404, detail="Session not found")
+
+        cursor.execute("INSERT OR IGNORE INTO session_content (session_id) VALUES (?)", (session_id,))
+        cursor.execute(
+            "SELECT ai_assisted_data_version FROM session_content WHERE session_id = ?",
+            (session_id,)
+        )
+        version = cursor.fetchone()[0]
+        if expected_version is not None and expected_version != version:
+            raise HTTPException(
+                status_code=412,
+                detail=f"ai_assisted_data is at version {version}, not {expected_version}"
+            )
+
+        if is_merge:
+            # Merge patches are exactly SQLite's json_patch()
+            try:
+                cursor.execute("""
+                    UPDATE session_content
+                    SET ai_assisted_data = deflate(json_patch(COALESCE(inflate(ai_assisted_data), '{}'), ?)),
+                        ai_assisted_data_version = ai_assisted_data_version + 1
+                    WHERE session_id = ? AND ai_assisted_data_version = ?
+                """, (json.dumps(patch), session_id, version))
+            except sqlite3.OperationalError:
+                raise HTTPException(status_code=409, detail="Stored ai_assisted_data is not valid JSON")
+            updated = cursor.rowcount
+            # Only a patch naming the transcript can change it (and the search index)
+            if updated and 'transcript' in patch:
+                cursor.execute(
+                    "SELECT inflate(ai_assisted_data) FROM session_content WHERE session_id = ?",
+                    (session_id,)
+                )
+                digest = transcript_digest(parse_ai_assisted_data(cursor.fetchone()[0]))
+                cursor.execute(
+                    "UPDATE session_content SET transcript_digest = ? WHERE session_id = ?",
+                    (digest, session_id)
+                )
+        else:
+            cursor.execute(
+                "SELECT ai_assisted_data FROM session_content WHERE session_id = ?",
+                (session_id,)
+            )
+            try:
+                document = json.loads(inflate(cursor.fetchone()[0]) or '{}')
+            except ValueError:
+                raise HTTPException(status_code=409, detail="Stored ai_assisted_data is not valid JSON")
+            try:
+                document = apply_json_patch(document, patch)
+            except JsonPatchTestFailed as e:
+                raise HTTPException(status_code=409, detail=str(e))
+            except JsonPatchError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+
+            cursor.execute("""
+                UPDATE session_content
+                SET ai_assisted_data = ?, ai_assisted_data_version = ai_assisted_data_version + 1,
+                    transcript_digest = ?
+                WHERE session_id = ? AND ai_assisted_data_version = ?
+            """, (deflate(json.dumps(document)), transcript_digest(document), session_id, version))
+            updated = cursor.rowcount
+
+        if not updated:
+            raise HTTPException(status_code=412, detail="ai_assisted_data changed concurrently")
+
+        cursor.execute(
+            "UPDATE sessions SET updated_at = ? WHERE id = ?",
+            (datetime.now().isoformat(), session_id)
+        )
+
+    response.headers['ETag'] = f'"{version + 1}"'
+    return {'ai_assisted_data_version': version + 1}
 
 
 @app.delete("/api/sessions/{session_id}", status_code=204)
-async def delete_session(
+def delete_session(
     session_id: int,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Delete a session (must belong to therapist's client)"""
+    # An autosave still queued for this session must land before the
+    # delete, not after it
+    writer.flush(therapist['id'])
+
     with get_db() as conn:
         cursor = conn.cursor()
 
@@ -561,7 +965,7 @@ async def delete_session(
 
 
 @app.post("/api/sessions/schedule", response_model=Session, status_code=201)
-async def schedule_session(
+def schedule_session(
     session: SessionCreate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -581,9 +985,8 @@ async def schedule_session(
             INSERT INTO sessions (
                 client_id, session_date, session_time, duration_minutes, status,
                 life_domains, emotional_themes, interventions,
-                overall_progress, session_summary, client_insights,
-                homework_assigned, clinical_observations, risk_assessment, therapist_id
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                overall_progress, session_summary, therapist_id
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
             session.client_id,
             session.session_date,
@@ -595,91 +998,86 @@ async def schedule_session(
             json.dumps(session.interventions),
             session.overall_progress,
             session.session_summary,
-            session.client_insights,
-            session.homework_assigned,
-            session.clinical_observations,
-            session.risk_assessment,
             therapist['id']
         ))
 
         session_id = cursor.lastrowid
+        save_session_content(conn, session_id, {
+            field: getattr(session, field) for field in CONTENT_FIELDS
+            if getattr(session, field) is not None
+        })
         cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
         row = cursor.fetchone()
 
-        return parse_session_row(row)
+        return attach_session_content(conn, parse_session_row(row))
 
 
 @app.patch("/api/sessions/{session_id}/cancel", response_model=Session)
-async def cancel_session(
+def cancel_session(
     session_id: int,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Mark a session as cancelled (must belong to therapist's client). Keeps record for history."""
     with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Check if session exists and belongs to therapist
-        cursor.execute("""
-            SELECT s.* FROM sessions s
-            JOIN clients c ON s.client_id = c.id
-            WHERE s.id = ? AND c.therapist_id = ?
-        """, (session_id, therapist['id']))
-        if not cursor.fetchone():
+        row = update_returning(
+            conn, "sessions", ["status = 'cancelled'", "updated_at = ?"], [datetime.now().isoformat()],
+            "id = ? AND therapist_id = ?", (session_id, therapist['id'])
+        )
+        if not row:
             raise HTTPException(status_code=404, detail="Session not found")
 
-        # Update status to cancelled
-        cursor.execute("""
-            UPDATE sessions
-            SET status = 'cancelled', updated_at = ?
-            WHERE id = ?
-        """, (datetime.now().isoformat(), session_id))
+        return attach_session_content(conn, parse_session_row(row))
 
-        # Return updated session
-        cursor.execute("SELECT * FROM sessions WHERE id = ?", (session_id,))
-        row = cursor.fetchone()
 
-        return parse_session_row(row)
+@app.get("/api/search", response_model=List[SessionSearchResult], dependencies=[Depends(not_modified)])
+def search(
+    q: str = Query(..., min_length=1, max_length=500),
+    limit: int = Query(20, ge=1, le=100),
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Full-text search over the current therapist's session summaries, notes,
+    clinical observations and transcripts, best match first
+
+    All words in `q` must match; end it with * to match the last word as a
+    prefix. Matches in the snippet are wrapped in <mark> tags.
+    """
+    with get_db() as conn:
+        return search_sessions(conn, therapist['id'], q, limit)
 
 
 # Todo Endpoints
-@app.get("/api/todos", response_model=List[Todo])
-async def get_todos(
+def fetch_todos(conn, therapist_id: int, client_id: int, status: str = None) -> List[Dict[str, Any]]:
+    """A client's todos, newest first; 404 unless the client belongs to the therapist"""
+    client = conn.execute(
+        "SELECT id FROM clients WHERE id = ? AND therapist_id = ?",
+        (client_id, therapist_id)
+    ).fetchone()
+    if not client:
+        raise HTTPException(status_code=404, detail="Client not found")
+
+    query = "SELECT * FROM todos WHERE client_id = ? AND therapist_id = ?"
+    params = [client_id, therapist_id]
+    if status:
+        query += " AND status = ?"
+        params.append(status)
+    query += " ORDER BY created_at DESC"
+    return [dict(row) for row in conn.execute(query, params)]
+
+
+@app.get("/api/todos", response_model=List[Todo], dependencies=[Depends(not_modified)])
+def get_todos(
     client_id: int,
     status: str = None,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Get todos for a specific client (must belong to current therapist)"""
     with get_db() as conn:
-        cursor = conn.cursor()
-
-        # Verify client belongs to therapist
-        cursor.execute(
-            "SELECT id FROM clients WHERE id = ? AND therapist_id = ?",
-            (client_id, therapist['id'])
-        )
-        if not cursor.fetchone():
-            raise HTTPException(status_code=404, detail="Client not found")
-
-        # Get todos
-        if status:
-            cursor.execute("""
-                SELECT * FROM todos
-                WHERE client_id = ? AND therapist_id = ? AND status = ?
-                ORDER BY created_at DESC
-            """, (client_id, therapist['id'], status))
-        else:
-            cursor.execute("""
-                SELECT * FROM todos
-                WHERE client_id = ? AND therapist_id = ?
-                ORDER BY created_at DESC
-            """, (client_id, therapist['id']))
-
-        rows = cursor.fetchall()
-        return [dict(row) for row in rows]
+        return fetch_todos(conn, therapist['id'], client_id, status)
 
 
 @app.post("/api/todos", response_model=Todo, status_code=201)
-async def create_todo(
+def create_todo(
     todo: TodoCreate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
@@ -717,60 +1115,137 @@ async def create_todo(
 
 
 @app.patch("/api/todos/{todo_id}", response_model=Todo)
-async def update_todo(
+def update_todo(
     todo_id: int,
     todo_update: TodoUpdate,
     therapist: Dict[str, Any] = Depends(get_current_therapist)
 ):
     """Update a todo (must belong to current therapist)"""
+    # Build update query dynamically
+    update_fields = []
+    update_values = []
+
+    if todo_update.text is not None:
+        update_fields.append("text = ?")
+        update_values.append(todo_update.text)
+
+    if todo_update.status is not None:
+        update_fields.append("status = ?")
+        update_values.append(todo_update.status)
+
+    if todo_update.completed_session_id is not None:
+        update_fields.append("completed_session_id = ?")
+        update_values.append(todo_update.completed_session_id)
+
     with get_db() as conn:
-        cursor = conn.cursor()
+        if update_fields:
+            update_fields.append("updated_at = ?")
+            update_values.append(datetime.now().isoformat())
+            row = update_returning(
+                conn, "todos", update_fields, update_values,
+                "id = ? AND therapist_id = ?", (todo_id, therapist['id'])
+            )
+        else:
+            # No fields to update, return existing todo
+            row = conn.execute(
+                "SELECT * FROM todos WHERE id = ? AND therapist_id = ?",
+                (todo_id, therapist['id'])
+            ).fetchone()
 
-        # Check if todo exists and belongs to therapist
-        cursor.execute(
-            "SELECT * FROM todos WHERE id = ? AND therapist_id = ?",
-            (todo_id, therapist['id'])
-        )
-        existing_todo = cursor.fetchone()
-        if not existing_todo:
+        if not row:
             raise HTTPException(status_code=404, detail="Todo not found")
 
-        # Build update query dynamically
-        update_fields = []
-        update_values = []
+        return dict(row)
 
-        if todo_update.text is not None:
-            update_fields.append("text = ?")
-            update_values.append(todo_update.text)
 
-        if todo_update.status is not None:
-            update_fields.append("status = ?")
-            update_values.append(todo_update.status)
+# Aggregate Endpoints
+# Each builds a whole screen's payload in one request and one read
+# transaction, so the pieces are consistent with each other.
+def parse_includes(include: Optional[str], allowed: tuple, default: tuple) -> set:
+    """Parse a comma-separated `include=`; 400 on unknown names"""
+    if include is None:
+        return set(default)
+    names = {name.strip() for name in include.split(',') if name.strip()}
+    unknown = names - set(allowed)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    return names
 
-        if todo_update.completed_session_id is not None:
-            update_fields.append("completed_session_id = ?")
-            update_values.append(todo_update.completed_session_id)
 
-        if not update_fields:
-            # No fields to update, return existing todo
-            return dict(existing_todo)
+@app.get(
+    "/api/dashboard/bootstrap", response_model=DashboardBootstrap, response_model_exclude_unset=True,
+    dependencies=[Depends(not_modified)]
+)
+def get_dashboard_bootstrap(
+    include: str = None,
+    fields: str = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    scheduled_days: int = Query(365, ge=1, le=3650),
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Get the therapist, the first page of clients, today's sessions and
+    the upcoming scheduled sessions in one request
+
+    `include` picks from clients, today and scheduled (default: clients,
+    today). `fields` applies to today's sessions as on /api/sessions/today;
+    scheduled sessions are the past-due ones plus the next `scheduled_days`
+    days.
+    """
+    includes = parse_includes(include, ('clients', 'today', 'scheduled'), ('clients', 'today'))
+    payload: Dict[str, Any] = {'therapist': therapist}
+
+    with get_db(snapshot=True) as conn:
+        if 'clients' in includes:
+            payload['clients'], payload['clients_next_cursor'] = fetch_clients_page(conn, therapist['id'], limit=limit)
+        if 'today' in includes:
+            payload['today_sessions'] = fetch_today_sessions(conn, therapist['id'], fields)
+        if 'scheduled' in includes:
+            payload['scheduled_sessions'] = fetch_sessions_in_range(
+                conn, therapist['id'], None, datetime.now().date() + timedelta(days=scheduled_days), 'scheduled'
+            )
+    return payload
 
-        # Add updated_at
-        update_fields.append("updated_at = ?")
-        update_values.append(datetime.now().isoformat())
 
-        # Add todo_id for WHERE clause
-        update_values.append(todo_id)
+@app.get(
+    "/api/clients/{client_id}/workspace", response_model=ClientWorkspace, response_model_exclude_unset=True,
+    dependencies=[Depends(not_modified)]
+)
+def get_client_workspace(
+    client_id: int,
+    include: str = None,
+    fields: str = None,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    todo_status: str = None,
+    therapist: Dict[str, Any] = Depends(get_current_therapist)
+):
+    """
+    Get a client with their sessions, todos and session prep in one request
 
-        # Execute update
-        query = f"UPDATE todos SET {', '.join(update_fields)} WHERE id = ?"
-        cursor.execute(query, update_values)
+    `include` picks from sessions, todos and prep (default: all three).
+    `fields` and `limit` apply to the sessions as on /api/sessions, and
+    `todo_status` filters the todos as `status` does on /api/todos.
+    """
+    includes = parse_includes(include, ('sessions', 'todos', 'prep'), ('sessions', 'todos', 'prep'))
 
-        # Return updated todo
-        cursor.execute("SELECT * FROM todos WHERE id = ?", (todo_id,))
-        row = cursor.fetchone()
+    with get_db(snapshot=True) as conn:
+        client = conn.execute(
+            "SELECT * FROM clients WHERE id = ? AND therapist_id = ?",
+            (client_id, therapist['id'])
+        ).fetchone()
+        if not client:
+            raise HTTPException(status_code=404, detail="Client not found")
 
-        return dict(row)
+        payload: Dict[str, Any] = {'client': dict(client)}
+        if 'sessions' in includes:
+            payload['sessions'], payload['sessions_next_cursor'] = fetch_sessions_page(
+                conn, therapist['id'], client_id, fields, limit
+            )
+        if 'todos' in includes:
+            payload['todos'] = fetch_todos(conn, therapist['id'], client_id, todo_status)
+        if 'prep' in includes:
+            payload['session_prep'] = build_session_prep(conn, therapist['id'], client_id)
+    return payload
 
 
 if __name__ == "__main__":
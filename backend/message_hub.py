@@ -0,0 +1,91 @@
+"""
+In-process fan-out of new messages to live streams
+
+GET /api/messages/stream subscribes the caller to their party key
+('therapist', id) and holds the connection open. Routes that insert
+messages publish the new rows to both parties once they are committed.
+
+Subscriptions live on the event loop: each is an asyncio.Queue read by the
+streaming response, so an idle stream costs a queue and a suspended
+coroutine, never a thread. publish() is called from route handlers on the
+threadpool and hands each event to the loop with call_soon_threadsafe().
+
+The hub only reaches streams served by the same worker process. A stream
+that misses events (a slow reader, a reconnect, another worker's write)
+catches up from the database with Last-Event-ID when it reconnects.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+Party = Tuple[str, int]
+
+# Events a stream may fall behind by before it is closed; the client then
+# reconnects and replays from the database
+MAX_QUEUED_EVENTS = 256
+
+
+class Subscription:
+    """One open stream's queue of events"""
+
+    def __init__(self, party: Party, loop: asyncio.AbstractEventLoop):
+        self.party = party
+        self.loop = loop
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.overflowed = False
+
+    def deliver(self, event: Dict[str, Any]) -> None:
+        # Runs on the subscription's loop
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= MAX_QUEUED_EVENTS:
+            self.overflowed = True
+            self.queue.put_nowait(None)  # Ends the stream
+            return
+        self.queue.put_nowait(event)
+
+    async def next_event(self, timeout: float) -> Optional[Dict[str, Any]]:
+        """The next event; None after `timeout` seconds without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class MessageHub:
+    def __init__(self):
+        self._subscriptions: Dict[Party, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, party: Party) -> Subscription:
+        """Start receiving a party's events (call from the event loop)"""
+        subscription = Subscription(party, asyncio.get_running_loop())
+        with self._lock:
+            self._subscriptions.setdefault(party, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.party)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.party]
+
+    def publish(self, party: Party, event: Dict[str, Any]) -> None:
+        """Send an event to every stream of a party (from any thread)"""
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(party, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The loop has shut down; the stream is gone with it
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+
+hub = MessageHub()
@@ -1,6 +1,7 @@
-import sqlite3
 from datetime import datetime
 
+from database import open_connection
+
 DATABASE_URL = "therapy.db"
 
 
@@ -9,7 +10,7 @@ def migrate_existing_data():
     Migrate existing clients/sessions to new multi-therapist schema
     Strategy: Create a "Legacy" therapist account for existing data
     """
-    conn = sqlite3.connect(DATABASE_URL)
+    conn = open_connection(DATABASE_URL)
     cursor = conn.cursor()
 
     print("Starting data migration...")
@@ -0,0 +1,222 @@
+"""
+Baseline schema
+
+Equivalent to what init_db() used to build with CREATE TABLE IF NOT EXISTS
+and PRAGMA table_info probing, so databases created before versioned
+migrations existed are adopted without changes.
+"""
+import sqlite3
+
+
+def _add_missing_columns(conn: sqlite3.Connection, table: str, columns: list) -> None:
+    existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    for name, definition in columns:
+        if name not in existing:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    # Create therapists table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS therapists (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            clerk_user_id TEXT NOT NULL UNIQUE,
+            email TEXT NOT NULL,
+            first_name TEXT,
+            last_name TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS clients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            date_of_birth TEXT NOT NULL,
+            phone TEXT,
+            email TEXT,
+            emergency_contact_name TEXT,
+            emergency_contact_phone TEXT,
+            status TEXT NOT NULL DEFAULT 'active',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            session_date TEXT NOT NULL,
+            duration_minutes INTEGER NOT NULL,
+
+            -- Structured data (stored as JSON)
+            life_domains TEXT,
+            emotional_themes TEXT,
+            interventions TEXT,
+
+            -- Progress and clinical notes
+            overall_progress TEXT,
+            session_summary TEXT,
+            client_insights TEXT,
+            homework_assigned TEXT,
+            clinical_observations TEXT,
+            risk_assessment TEXT,
+
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients (id)
+        )
+    """)
+
+    # Columns added to pre-existing databases by the old startup probing.
+    # Fresh databases get them here too, in the same order.
+    _add_missing_columns(conn, "sessions", [
+        ("session_time", "TEXT"),
+        ("status", "TEXT NOT NULL DEFAULT 'completed'"),
+    ])
+    _add_missing_columns(conn, "clients", [
+        ("therapist_id", "INTEGER REFERENCES therapists(id)"),
+    ])
+    _add_missing_columns(conn, "sessions", [
+        ("therapist_id", "INTEGER REFERENCES therapists(id)"),
+        ("notes", "TEXT"),
+        ("summary", "TEXT"),
+    ])
+    _add_missing_columns(conn, "therapists", [
+        ("practice_type", "TEXT"),
+    ])
+    _add_missing_columns(conn, "sessions", [
+        ("ai_assisted_data", "TEXT"),
+    ])
+
+    # Create todos table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER NOT NULL,
+            therapist_id INTEGER NOT NULL,
+            text TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'open',
+            source_session_id INTEGER,
+            completed_session_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients (id),
+            FOREIGN KEY (therapist_id) REFERENCES therapists (id),
+            FOREIGN KEY (source_session_id) REFERENCES sessions (id),
+            FOREIGN KEY (completed_session_id) REFERENCES sessions (id)
+        )
+    """)
+
+    # Create intake_responses table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS intake_responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER,
+            therapist_id INTEGER NOT NULL,
+            form_type TEXT NOT NULL,
+            responses TEXT NOT NULL,
+            status TEXT DEFAULT 'pending',
+            started_at TIMESTAMP,
+            completed_at TIMESTAMP,
+            reviewed_at TIMESTAMP,
+            link_token TEXT UNIQUE,
+            expires_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients (id),
+            FOREIGN KEY (therapist_id) REFERENCES therapists (id)
+        )
+    """)
+
+    # Create assessment_responses table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS assessment_responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            client_id INTEGER,
+            therapist_id INTEGER NOT NULL,
+            intake_response_id INTEGER,
+            assessment_id TEXT NOT NULL,
+            responses TEXT NOT NULL,
+            scores TEXT NOT NULL,
+            completed_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (client_id) REFERENCES clients (id),
+            FOREIGN KEY (therapist_id) REFERENCES therapists (id),
+            FOREIGN KEY (intake_response_id) REFERENCES intake_responses (id)
+        )
+    """)
+
+    # Create form_links table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS form_links (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            therapist_id INTEGER NOT NULL,
+            client_email TEXT NOT NULL,
+            client_name TEXT,
+            link_token TEXT UNIQUE NOT NULL,
+            form_type TEXT NOT NULL,
+            included_assessments TEXT,
+            status TEXT DEFAULT 'sent',
+            expires_at TIMESTAMP NOT NULL,
+            sent_at TIMESTAMP,
+            opened_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (therapist_id) REFERENCES therapists (id)
+        )
+    """)
+
+    # Create messages table (bidirectional correspondence)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_id INTEGER NOT NULL,
+            sender_type TEXT NOT NULL,
+            recipient_id INTEGER NOT NULL,
+            recipient_type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            attachments TEXT,
+            related_session_id INTEGER,
+            read BOOLEAN DEFAULT 0,
+            read_at TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (related_session_id) REFERENCES sessions (id)
+        )
+    """)
+
+    # Create homework_assignments table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS homework_assignments (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            therapist_id INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            session_id INTEGER,
+            title TEXT NOT NULL,
+            instructions TEXT NOT NULL,
+            attachments TEXT,
+            due_date DATE,
+            status TEXT DEFAULT 'assigned',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (therapist_id) REFERENCES therapists (id),
+            FOREIGN KEY (client_id) REFERENCES clients (id),
+            FOREIGN KEY (session_id) REFERENCES sessions (id)
+        )
+    """)
+
+    # Create homework_submissions table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS homework_submissions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            assignment_id INTEGER NOT NULL,
+            client_id INTEGER NOT NULL,
+            content TEXT NOT NULL,
+            attachments TEXT,
+            submitted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            therapist_feedback TEXT,
+            feedback_at TIMESTAMP,
+            FOREIGN KEY (assignment_id) REFERENCES homework_assignments (id),
+            FOREIGN KEY (client_id) REFERENCES clients (id)
+        )
+    """)
@@ -0,0 +1,51 @@
+"""
+Secondary indexes for the route queries
+
+Every statement in main.py, intake_routes.py and communication_routes.py
+should resolve to an index SEARCH; check_query_plans.py verifies this.
+"""
+import sqlite3
+
+INDEXES = (
+    # Client list, optionally filtered by status, ordered by name
+    "CREATE INDEX IF NOT EXISTS idx_clients_therapist_name"
+    " ON clients (therapist_id, last_name, first_name)",
+
+    # Per-client session history, last completed session, session-prep stats
+    "CREATE INDEX IF NOT EXISTS idx_sessions_client_status_date"
+    " ON sessions (client_id, status, session_date, session_time)",
+
+    # Today view
+    "CREATE INDEX IF NOT EXISTS idx_sessions_date"
+    " ON sessions (session_date, session_time)",
+
+    # Todo lists per client, plus the open todos shown in session prep
+    "CREATE INDEX IF NOT EXISTS idx_todos_client"
+    " ON todos (client_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_todos_open"
+    " ON todos (client_id, created_at) WHERE status = 'open'",
+
+    # Message threads: one index serves both sides of the OR in
+    # get_message_thread (rowid order is implied within each thread)
+    "CREATE INDEX IF NOT EXISTS idx_messages_thread"
+    " ON messages (sender_id, sender_type, recipient_id, recipient_type)",
+    "CREATE INDEX IF NOT EXISTS idx_messages_unread"
+    " ON messages (recipient_id, recipient_type) WHERE read = 0",
+
+    # Homework
+    "CREATE INDEX IF NOT EXISTS idx_homework_assignments_client"
+    " ON homework_assignments (client_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_homework_submissions_assignment"
+    " ON homework_submissions (assignment_id, submitted_at)",
+
+    # Intake review queue and assessments attached to an intake
+    "CREATE INDEX IF NOT EXISTS idx_intake_responses_therapist"
+    " ON intake_responses (therapist_id, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_assessment_responses_intake"
+    " ON assessment_responses (intake_response_id)",
+)
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    for statement in INDEXES:
+        conn.execute(statement)
@@ -0,0 +1,17 @@
+"""
+Directory of intake link tokens
+
+Public intake endpoints only know the link token. In sharded mode this
+table, kept in the directory database, maps each token to the therapist
+whose shard holds the form.
+"""
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS intake_link_routes (
+            link_token TEXT PRIMARY KEY,
+            therapist_id INTEGER NOT NULL
+        ) WITHOUT ROWID
+    """)
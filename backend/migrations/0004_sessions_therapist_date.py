@@ -0,0 +1,20 @@
+"""
+Calendar index on sessions
+
+Date-range queries for a therapist's calendar filter on sessions.therapist_id
+directly instead of joining through clients. Rows written before sessions had
+a therapist_id column are backfilled from their client first.
+"""
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        UPDATE sessions
+        SET therapist_id = (SELECT therapist_id FROM clients WHERE clients.id = sessions.client_id)
+        WHERE therapist_id IS NULL
+    """)
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_sessions_therapist_date"
+        " ON sessions (therapist_id, session_date, session_time)"
+    )
@@ -0,0 +1,68 @@
+"""
+Move large session text out of the sessions rows
+
+Creates session_content (see session_content.py) and moves the existing
+notes, AI-assisted data and clinical text into it, zlib-compressed, a chunk
+of sessions at a time so memory stays flat on large databases. The old
+columns are left in place but cleared.
+
+The space freed inside sessions is reused by later writes; run VACUUM
+once afterwards to shrink the database file itself.
+"""
+import sqlite3
+import zlib
+
+CONTENT_FIELDS = (
+    'notes', 'ai_assisted_data', 'client_insights',
+    'homework_assigned', 'clinical_observations', 'risk_assessment'
+)
+
+CHUNK_SIZE = 500
+
+
+def _deflate(text):
+    return None if text is None else zlib.compress(text.encode('utf-8'), 6)
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS session_content (
+            session_id INTEGER PRIMARY KEY REFERENCES sessions(id),
+            notes BLOB,
+            ai_assisted_data BLOB,
+            client_insights BLOB,
+            homework_assigned BLOB,
+            clinical_observations BLOB,
+            risk_assessment BLOB
+        )
+    """)
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS sessions_delete_content
+        AFTER DELETE ON sessions
+        BEGIN
+            DELETE FROM session_content WHERE session_id = old.id;
+        END
+    """)
+
+    columns = ", ".join(CONTENT_FIELDS)
+    cleared = ", ".join(f"{field} = NULL" for field in CONTENT_FIELDS)
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id, {columns} FROM sessions WHERE id > ? ORDER BY id LIMIT ?",
+            (last_id, CHUNK_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+
+        moved = [row for row in rows if any(value is not None for value in row[1:])]
+        conn.executemany(
+            f"INSERT OR REPLACE INTO session_content (session_id, {columns})"
+            f" VALUES (?, {', '.join('?' for _ in CONTENT_FIELDS)})",
+            [(row[0], *(_deflate(value) for value in row[1:])) for row in moved]
+        )
+        conn.executemany(
+            f"UPDATE sessions SET {cleared} WHERE id = ?",
+            [(row[0],) for row in moved]
+        )
@@ -0,0 +1,21 @@
+"""
+Version counter for ai_assisted_data
+
+Incremented on every write so PATCH /api/sessions/{id}/ai-data can reject
+a patch computed against a stale copy (If-Match).
+"""
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(session_content)")}
+    if "ai_assisted_data_version" not in existing:
+        conn.execute(
+            "ALTER TABLE session_content"
+            " ADD COLUMN ai_assisted_data_version INTEGER NOT NULL DEFAULT 0"
+        )
+    # Rows that already hold data start at version 1; 0 means never written
+    conn.execute(
+        "UPDATE session_content SET ai_assisted_data_version = 1"
+        " WHERE ai_assisted_data IS NOT NULL AND ai_assisted_data_version = 0"
+    )
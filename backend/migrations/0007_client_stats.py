@@ -0,0 +1,124 @@
+"""
+Per-client stats maintained by triggers
+
+client_stats holds what session prep shows for a client: completed
+session count, first session date (any status), last completed session date
+and open todo count. Triggers on sessions and todos keep it current as rows
+are written; counts are adjusted incrementally, and a date is only looked up
+again (one index probe) when the session holding it is removed or changed.
+"""
+import sqlite3
+
+# Take a session row out of its client's stats; {row} is old or new
+REMOVE_SESSION = """
+    UPDATE client_stats SET
+        completed_sessions = completed_sessions - ({row}.status = 'completed'),
+        first_session_date = CASE
+            WHEN {row}.session_date = first_session_date
+            THEN (SELECT MIN(session_date) FROM sessions WHERE client_id = {row}.client_id)
+            ELSE first_session_date END,
+        last_session_date = CASE
+            WHEN {row}.status = 'completed' AND {row}.session_date = last_session_date
+            THEN (SELECT MAX(session_date) FROM sessions
+                  WHERE client_id = {row}.client_id AND status = 'completed')
+            ELSE last_session_date END
+    WHERE client_id = {row}.client_id;
+"""
+
+ADD_SESSION = """
+    INSERT INTO client_stats (client_id, completed_sessions, first_session_date, last_session_date)
+    VALUES (
+        {row}.client_id,
+        {row}.status = 'completed',
+        {row}.session_date,
+        CASE WHEN {row}.status = 'completed' THEN {row}.session_date END
+    )
+    ON CONFLICT (client_id) DO UPDATE SET
+        completed_sessions = completed_sessions + excluded.completed_sessions,
+        first_session_date = COALESCE(MIN(first_session_date, excluded.first_session_date),
+                                      excluded.first_session_date),
+        last_session_date = COALESCE(MAX(last_session_date, excluded.last_session_date),
+                                     last_session_date, excluded.last_session_date);
+"""
+
+ADJUST_OPEN_TODOS = """
+    INSERT INTO client_stats (client_id, open_todos) VALUES ({row}.client_id, {delta})
+    ON CONFLICT (client_id) DO UPDATE SET open_todos = open_todos + excluded.open_todos;
+"""
+
+TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS client_stats_session_insert
+    AFTER INSERT ON sessions
+    BEGIN
+        {ADD_SESSION.format(row='new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS client_stats_session_delete
+    AFTER DELETE ON sessions
+    BEGIN
+        {REMOVE_SESSION.format(row='old')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS client_stats_session_update
+    AFTER UPDATE OF client_id, session_date, status ON sessions
+    BEGIN
+        {REMOVE_SESSION.format(row='old')}
+        {ADD_SESSION.format(row='new')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS client_stats_todo_insert
+    AFTER INSERT ON todos WHEN new.status = 'open'
+    BEGIN
+        {ADJUST_OPEN_TODOS.format(row='new', delta=1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS client_stats_todo_delete
+    AFTER DELETE ON todos WHEN old.status = 'open'
+    BEGIN
+        {ADJUST_OPEN_TODOS.format(row='old', delta=-1)}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS client_stats_todo_update
+    AFTER UPDATE OF client_id, status ON todos
+    WHEN (old.status = 'open') OR (new.status = 'open')
+    BEGIN
+        UPDATE client_stats SET open_todos = open_todos - 1
+        WHERE client_id = old.client_id AND old.status = 'open';
+        {ADJUST_OPEN_TODOS.format(row='new', delta="(new.status = 'open')")}
+    END
+    """,
+)
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS client_stats (
+            client_id INTEGER PRIMARY KEY REFERENCES clients(id),
+            completed_sessions INTEGER NOT NULL DEFAULT 0,
+            first_session_date TEXT,
+            last_session_date TEXT,
+            open_todos INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+    # Backfill from the existing rows
+    conn.execute("""
+        INSERT OR REPLACE INTO client_stats (
+            client_id, completed_sessions, first_session_date, last_session_date, open_todos
+        )
+        SELECT
+            c.id,
+            (SELECT COUNT(*) FROM sessions WHERE client_id = c.id AND status = 'completed'),
+            (SELECT MIN(session_date) FROM sessions WHERE client_id = c.id),
+            (SELECT MAX(session_date) FROM sessions WHERE client_id = c.id AND status = 'completed'),
+            (SELECT COUNT(*) FROM todos WHERE client_id = c.id AND status = 'open')
+        FROM clients c
+    """)
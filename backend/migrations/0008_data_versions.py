@@ -0,0 +1,52 @@
+"""
+Per-therapist data version
+
+data_versions holds one counter per therapist, bumped by triggers whenever
+a row a therapist's list endpoints read is inserted, updated or deleted.
+List responses carry it in their ETag, so an unchanged list is answered
+with 304 Not Modified after one primary-key read. A therapist without a
+row is at version 0.
+
+Rows never move between therapists, so updates only bump the owner of the
+new row.
+"""
+import sqlite3
+
+# Table -> expression giving the owning therapist of {row}
+OWNERS = {
+    'clients': "{row}.therapist_id",
+    'sessions': "COALESCE({row}.therapist_id,"
+                " (SELECT therapist_id FROM clients WHERE id = {row}.client_id))",
+    'session_content': "(SELECT therapist_id FROM sessions WHERE id = {row}.session_id)",
+    'todos': "{row}.therapist_id",
+    'messages': "CASE WHEN {row}.sender_type = 'therapist' THEN {row}.sender_id"
+                " WHEN {row}.recipient_type = 'therapist' THEN {row}.recipient_id END",
+    'homework_assignments': "{row}.therapist_id",
+    'homework_submissions': "(SELECT therapist_id FROM homework_assignments WHERE id = {row}.assignment_id)",
+}
+
+# The owner can be unknown (e.g. content removed after its session), and a
+# NULL therapist_id would make SQLite pick a fresh rowid
+BUMP = """
+    INSERT INTO data_versions (therapist_id, version)
+    SELECT owner, 1 FROM (SELECT {owner} AS owner) WHERE owner IS NOT NULL
+    ON CONFLICT (therapist_id) DO UPDATE SET version = version + 1;
+"""
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS data_versions (
+            therapist_id INTEGER PRIMARY KEY,
+            version INTEGER NOT NULL
+        )
+    """)
+    for table, owner in OWNERS.items():
+        for event, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+            conn.execute(f"""
+                CREATE TRIGGER IF NOT EXISTS data_version_{table}_{event}
+                AFTER {event.upper()} ON {table}
+                BEGIN
+                    {BUMP.format(owner=owner.format(row=row))}
+                END
+            """)
@@ -0,0 +1,107 @@
+"""
+Full-text index over session text
+
+session_search is an FTS5 table with one row per session (rowid = session
+id) holding the session summary, notes, clinical observations and the
+transcript from the AI-assisted data, plus the owning therapist id as a
+column that searches are always filtered on. Triggers on sessions and
+session_content rebuild a session's row whenever one of those fields
+changes.
+
+The content fields are stored compressed, so the triggers call inflate():
+every connection that writes sessions or session_content must register it,
+as database.open_connection() does. This migration registers its own copy
+to backfill the index.
+"""
+import sqlite3
+import zlib
+
+# Transcript from the AI-assisted data JSON of a session_content row
+TRANSCRIPT = (
+    "json_extract(CASE WHEN json_valid(inflate({row}.ai_assisted_data))"
+    " THEN inflate({row}.ai_assisted_data) END, '$.transcript')"
+)
+
+INDEX_SESSIONS = f"""
+    INSERT INTO session_search (
+        rowid, therapist, session_summary, notes, clinical_observations, transcript
+    )
+    SELECT
+        s.id, s.therapist_id, s.session_summary,
+        inflate(c.notes), inflate(c.clinical_observations),
+        {TRANSCRIPT.format(row='c')}
+    FROM sessions s
+    LEFT JOIN session_content c ON c.session_id = s.id
+"""
+
+# Rebuild the index row of one session from the current table contents
+REINDEX = (
+    "DELETE FROM session_search WHERE rowid = {id};"
+    + INDEX_SESSIONS
+    + "    WHERE s.id = {id};"
+)
+
+TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS session_search_session_insert
+    AFTER INSERT ON sessions
+    BEGIN
+        {REINDEX.format(id='new.id')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS session_search_session_update
+    AFTER UPDATE OF session_summary, therapist_id ON sessions
+    BEGIN
+        {REINDEX.format(id='new.id')}
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS session_search_session_delete
+    AFTER DELETE ON sessions
+    BEGIN
+        DELETE FROM session_search WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS session_search_content_insert
+    AFTER INSERT ON session_content
+    BEGIN
+        {REINDEX.format(id='new.session_id')}
+    END
+    """,
+    # Most autosaves rewrite the AI-assisted data without touching the
+    # transcript; those leave the index alone
+    f"""
+    CREATE TRIGGER IF NOT EXISTS session_search_content_update
+    AFTER UPDATE ON session_content
+    WHEN old.notes IS NOT new.notes
+        OR old.clinical_observations IS NOT new.clinical_observations
+        OR (old.ai_assisted_data IS NOT new.ai_assisted_data
+            AND {TRANSCRIPT.format(row='old')} IS NOT {TRANSCRIPT.format(row='new')})
+    BEGIN
+        {REINDEX.format(id='new.session_id')}
+    END
+    """,
+)
+
+
+def _inflate(blob):
+    return None if blob is None else zlib.decompress(blob).decode('utf-8')
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.create_function("inflate", 1, _inflate, deterministic=True)
+
+    conn.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS session_search USING fts5(
+            therapist, session_summary, notes, clinical_observations, transcript,
+            tokenize = 'porter unicode61 remove_diacritics 2'
+        )
+    """)
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+    conn.execute("DELETE FROM session_search")
+    conn.execute(INDEX_SESSIONS)
+    conn.execute("INSERT INTO session_search (session_search) VALUES ('optimize')")
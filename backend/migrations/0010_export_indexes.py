@@ -0,0 +1,20 @@
+"""
+Indexes for the data export
+
+GET /api/export reads every row a therapist owns. Most tables are reached
+through the therapist's clients; these cover the two that are not: the
+messages a therapist received, and assessments filed without an intake.
+"""
+import sqlite3
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_messages_recipient"
+    " ON messages (recipient_id, recipient_type)",
+    "CREATE INDEX IF NOT EXISTS idx_assessment_responses_therapist"
+    " ON assessment_responses (therapist_id)",
+)
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    for statement in INDEXES:
+        conn.execute(statement)
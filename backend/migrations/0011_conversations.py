@@ -0,0 +1,144 @@
+"""
+Conversations and unread counters maintained by triggers
+
+conversations holds one row per therapist and other party they have
+exchanged messages with: the last message's id, time, sender and a
+preview, how many messages the therapist has not read (unread_count) and
+how many of theirs the other party has not read (other_party_unread).
+A message between two therapists appears in both therapists' inboxes.
+
+inbox_unread holds each therapist's total unread count for the badge.
+
+Triggers on messages keep both current: an insert updates the last
+message and counts, and a change of `read` (or deleting an unread
+message) adjusts the counts. Deleting a message leaves the preview as is.
+"""
+import sqlite3
+
+PREVIEW_LENGTH = 140
+
+# A new message as the last of a conversation, from the side of the
+# therapist in {me}; {unread} names the counter the message adds to
+ADD_MESSAGE = f"""
+    INSERT INTO conversations (
+        therapist_id, other_party_id, other_party_type,
+        last_message_id, last_message_at, last_message_preview, last_sender_type, {{unread}}
+    )
+    SELECT
+        new.{{me}}_id, new.{{other}}_id, new.{{other}}_type,
+        new.id, new.created_at, substr(new.content, 1, {PREVIEW_LENGTH}), new.sender_type, new.read = 0
+    WHERE new.{{me}}_type = 'therapist'
+    ON CONFLICT (therapist_id, other_party_id, other_party_type) DO UPDATE SET
+        last_message_id = excluded.last_message_id,
+        last_message_at = excluded.last_message_at,
+        last_message_preview = excluded.last_message_preview,
+        last_sender_type = excluded.last_sender_type,
+        {{unread}} = {{unread}} + excluded.{{unread}};
+"""
+
+ADJUST_INBOX_UNREAD = """
+    INSERT INTO inbox_unread (therapist_id, unread_count)
+    SELECT {row}.recipient_id, {delta} WHERE {row}.recipient_type = 'therapist'
+    ON CONFLICT (therapist_id) DO UPDATE SET unread_count = unread_count + excluded.unread_count;
+"""
+
+# Count a message in or out of the unread counters; {row} is old or new
+ADJUST_UNREAD = """
+    UPDATE conversations SET unread_count = unread_count + {delta}
+    WHERE therapist_id = {row}.recipient_id AND other_party_id = {row}.sender_id
+    AND other_party_type = {row}.sender_type AND {row}.recipient_type = 'therapist';
+    UPDATE conversations SET other_party_unread = other_party_unread + {delta}
+    WHERE therapist_id = {row}.sender_id AND other_party_id = {row}.recipient_id
+    AND other_party_type = {row}.recipient_type AND {row}.sender_type = 'therapist';
+""" + ADJUST_INBOX_UNREAD
+
+TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS conversations_message_insert
+    AFTER INSERT ON messages
+    BEGIN
+        {ADD_MESSAGE.format(me='sender', other='recipient', unread='other_party_unread')}
+        {ADD_MESSAGE.format(me='recipient', other='sender', unread='unread_count')}
+        {ADJUST_INBOX_UNREAD.format(row='new', delta='new.read = 0')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS conversations_message_read
+    AFTER UPDATE OF read ON messages
+    WHEN (old.read = 0) IS NOT (new.read = 0)
+    BEGIN
+        {ADJUST_UNREAD.format(row='new', delta='(new.read = 0) - (old.read = 0)')}
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS conversations_message_delete
+    AFTER DELETE ON messages WHEN old.read = 0
+    BEGIN
+        {ADJUST_UNREAD.format(row='old', delta=-1)}
+    END
+    """,
+)
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            therapist_id INTEGER NOT NULL,
+            other_party_id INTEGER NOT NULL,
+            other_party_type TEXT NOT NULL,
+            last_message_id INTEGER NOT NULL,
+            last_message_at TIMESTAMP,
+            last_message_preview TEXT,
+            last_sender_type TEXT,
+            unread_count INTEGER NOT NULL DEFAULT 0,
+            other_party_unread INTEGER NOT NULL DEFAULT 0,
+            UNIQUE (therapist_id, other_party_id, other_party_type)
+        )
+    """)
+    # Inbox: a therapist's conversations, most recent message first
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_conversations_inbox"
+        " ON conversations (therapist_id, last_message_id)"
+    )
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS inbox_unread (
+            therapist_id INTEGER PRIMARY KEY,
+            unread_count INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    for trigger in TRIGGERS:
+        conn.execute(trigger)
+
+    # Backfill from the existing messages, each seen from its therapist side(s)
+    conn.execute("DELETE FROM conversations")
+    conn.execute("""
+        INSERT INTO conversations (
+            therapist_id, other_party_id, other_party_type,
+            last_message_id, unread_count, other_party_unread
+        )
+        SELECT therapist_id, other_party_id, other_party_type,
+               MAX(id), SUM(unread), SUM(other_party_unread)
+        FROM (
+            SELECT sender_id AS therapist_id, recipient_id AS other_party_id,
+                   recipient_type AS other_party_type, id,
+                   0 AS unread, read = 0 AS other_party_unread
+            FROM messages WHERE sender_type = 'therapist'
+            UNION ALL
+            SELECT recipient_id, sender_id, sender_type, id, read = 0, 0
+            FROM messages WHERE recipient_type = 'therapist'
+        )
+        GROUP BY therapist_id, other_party_id, other_party_type
+    """)
+    conn.execute(f"""
+        UPDATE conversations SET
+            last_message_at = (SELECT created_at FROM messages WHERE id = last_message_id),
+            last_message_preview = (SELECT substr(content, 1, {PREVIEW_LENGTH})
+                                    FROM messages WHERE id = last_message_id),
+            last_sender_type = (SELECT sender_type FROM messages WHERE id = last_message_id)
+    """)
+    conn.execute("DELETE FROM inbox_unread")
+    conn.execute("""
+        INSERT INTO inbox_unread (therapist_id, unread_count)
+        SELECT therapist_id, SUM(unread_count) FROM conversations GROUP BY therapist_id
+    """)
@@ -0,0 +1,68 @@
+"""
+Shared bodies for broadcast messages
+
+A broadcast sends one content and attachments list to many recipients.
+It is stored once in message_bodies; each recipient's messages row points
+to it with body_id and leaves its own content empty. Readers take the
+content and attachments from the body when body_id is set.
+
+The conversations insert trigger (0011) is recreated to take the
+preview from the body.
+"""
+import sqlite3
+
+PREVIEW_LENGTH = 140
+
+CONTENT = "COALESCE((SELECT content FROM message_bodies WHERE id = new.body_id), new.content)"
+
+# As in 0011, with the preview read through CONTENT
+ADD_MESSAGE = f"""
+    INSERT INTO conversations (
+        therapist_id, other_party_id, other_party_type,
+        last_message_id, last_message_at, last_message_preview, last_sender_type, {{unread}}
+    )
+    SELECT
+        new.{{me}}_id, new.{{other}}_id, new.{{other}}_type,
+        new.id, new.created_at, substr({CONTENT}, 1, {PREVIEW_LENGTH}), new.sender_type, new.read = 0
+    WHERE new.{{me}}_type = 'therapist'
+    ON CONFLICT (therapist_id, other_party_id, other_party_type) DO UPDATE SET
+        last_message_id = excluded.last_message_id,
+        last_message_at = excluded.last_message_at,
+        last_message_preview = excluded.last_message_preview,
+        last_sender_type = excluded.last_sender_type,
+        {{unread}} = {{unread}} + excluded.{{unread}};
+"""
+
+INSERT_TRIGGER = f"""
+    CREATE TRIGGER conversations_message_insert
+    AFTER INSERT ON messages
+    BEGIN
+        {ADD_MESSAGE.format(me='sender', other='recipient', unread='other_party_unread')}
+        {ADD_MESSAGE.format(me='recipient', other='sender', unread='unread_count')}
+        INSERT INTO inbox_unread (therapist_id, unread_count)
+        SELECT new.recipient_id, new.read = 0 WHERE new.recipient_type = 'therapist'
+        ON CONFLICT (therapist_id) DO UPDATE SET unread_count = unread_count + excluded.unread_count;
+    END
+"""
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS message_bodies (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            attachments TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+    if "body_id" not in existing:
+        conn.execute("ALTER TABLE messages ADD COLUMN body_id INTEGER REFERENCES message_bodies (id)")
+    # The messages of one broadcast
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_body"
+        " ON messages (body_id) WHERE body_id IS NOT NULL"
+    )
+
+    conn.execute("DROP TRIGGER IF EXISTS conversations_message_insert")
+    conn.execute(INSERT_TRIGGER)
@@ -0,0 +1,23 @@
+"""
+Session list indexes in pagination order
+
+/api/sessions pages sessions by (session_date, session_time, id), newest
+first, for a therapist or for one client. These indexes hold exactly that
+key after the filter column, so each page is a reverse range read with no
+sort step. The therapist one replaces the 0004 calendar index, whose
+columns it starts with.
+"""
+import sqlite3
+
+INDEXES = (
+    "CREATE INDEX IF NOT EXISTS idx_sessions_therapist_keyset"
+    " ON sessions (therapist_id, session_date, session_time, id)",
+    "CREATE INDEX IF NOT EXISTS idx_sessions_client_keyset"
+    " ON sessions (client_id, session_date, session_time, id)",
+)
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    for statement in INDEXES:
+        conn.execute(statement)
+    conn.execute("DROP INDEX IF EXISTS idx_sessions_therapist_date")
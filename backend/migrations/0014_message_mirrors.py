@@ -0,0 +1,16 @@
+"""
+Copies of messages between therapists on different shards
+
+With sharding, each therapist reads messages from their own shard. A
+message between two therapists whose shards differ is stored in both:
+the sender's copy and the recipient's copy each carry the other's id in
+mirror_id, so marking one read can mark the other. NULL for every other
+message.
+"""
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(messages)")}
+    if "mirror_id" not in existing:
+        conn.execute("ALTER TABLE messages ADD COLUMN mirror_id INTEGER")
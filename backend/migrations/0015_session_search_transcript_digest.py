@@ -0,0 +1,53 @@
+"""
+Reindex a session's transcript only when it changes
+
+The session_search trigger from 0009 ran on every write to session_content
+and, to tell whether the transcript had changed, inflated and parsed the
+old and the new ai_assisted_data: twice the document on every autosave.
+
+Writers now store a digest of the transcript in
+session_content.transcript_digest (session_content.transcript_digest()),
+and the trigger compares that, the notes and the clinical observations,
+all without inflating anything. Rows written before this migration have
+no digest, so the first write that carries a transcript reindexes them
+once.
+
+Rebuilding the index row still calls inflate(); see 0009.
+"""
+import sqlite3
+
+TRANSCRIPT = (
+    "json_extract(CASE WHEN json_valid(inflate(c.ai_assisted_data))"
+    " THEN inflate(c.ai_assisted_data) END, '$.transcript')"
+)
+
+REINDEX = f"""
+    DELETE FROM session_search WHERE rowid = new.session_id;
+    INSERT INTO session_search (
+        rowid, therapist, session_summary, notes, clinical_observations, transcript
+    )
+    SELECT
+        s.id, s.therapist_id, s.session_summary,
+        inflate(c.notes), inflate(c.clinical_observations), {TRANSCRIPT}
+    FROM sessions s
+    LEFT JOIN session_content c ON c.session_id = s.id
+    WHERE s.id = new.session_id;
+"""
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(session_content)")}
+    if "transcript_digest" not in existing:
+        conn.execute("ALTER TABLE session_content ADD COLUMN transcript_digest TEXT")
+
+    conn.execute("DROP TRIGGER IF EXISTS session_search_content_update")
+    conn.execute(f"""
+        CREATE TRIGGER session_search_content_update
+        AFTER UPDATE OF notes, clinical_observations, transcript_digest ON session_content
+        WHEN old.notes IS NOT new.notes
+            OR old.clinical_observations IS NOT new.clinical_observations
+            OR old.transcript_digest IS NOT new.transcript_digest
+        BEGIN
+            {REINDEX}
+        END
+    """)
@@ -0,0 +1,34 @@
+"""
+Bump the data version of every therapist a message belongs to
+
+0008 bumped only one owner per message: the sender if a therapist, else
+the recipient. A message between two therapists therefore left the
+recipient's version alone, and their inbox and unread count kept
+answering 304 after it arrived or was marked read. The message triggers
+now bump the sender and the recipient, whichever of them are therapists.
+"""
+import sqlite3
+
+# Therapists among the parties of {row}; UNION keeps a message to oneself
+# to a single bump
+BUMP_PARTIES = """
+    INSERT INTO data_versions (therapist_id, version)
+    SELECT owner, 1 FROM (
+        SELECT {row}.sender_id AS owner WHERE {row}.sender_type = 'therapist'
+        UNION
+        SELECT {row}.recipient_id WHERE {row}.recipient_type = 'therapist'
+    ) WHERE owner IS NOT NULL
+    ON CONFLICT (therapist_id) DO UPDATE SET version = version + 1;
+"""
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    for event, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+        conn.execute(f"DROP TRIGGER IF EXISTS data_version_messages_{event}")
+        conn.execute(f"""
+            CREATE TRIGGER data_version_messages_{event}
+            AFTER {event.upper()} ON messages
+            BEGIN
+                {BUMP_PARTIES.format(row=row)}
+            END
+        """)
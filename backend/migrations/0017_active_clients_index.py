@@ -0,0 +1,18 @@
+"""
+Partial index for a therapist's active clients
+
+/api/clients?status=active pages through the clients still in care. Read
+through idx_clients_therapist_name, every former client on the way is
+looked up in the table only to be skipped; this index holds the active
+ones alone, already in page order. SQLite only picks a partial index when
+the query spells out its condition, so fetch_clients_page() writes
+status = 'active' as a literal.
+"""
+import sqlite3
+
+
+def upgrade(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_clients_therapist_active"
+        " ON clients (therapist_id, last_name, first_name) WHERE status = 'active'"
+    )
@@ -0,0 +1,125 @@
+"""
+Versioned schema migrations
+
+Each migration is a file in this directory named NNNN_description.py that
+defines upgrade(conn). Migrations are applied in version order, recorded in
+the schema_migrations table together with a checksum of the file, and the
+latest applied version is mirrored into PRAGMA user_version so an
+up-to-date database costs a single query at startup.
+"""
+import hashlib
+import importlib.util
+import re
+import sqlite3
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+MIGRATIONS_DIR = Path(__file__).parent
+MIGRATION_FILE_PATTERN = re.compile(r"^(\d{4})_(\w+)\.py$")
+
+# How long a worker waits for another worker's migration to finish
+LOCK_TIMEOUT_SECONDS = 60
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    path: Path
+    checksum: str
+
+    def upgrade(self, conn: sqlite3.Connection) -> None:
+        spec = importlib.util.spec_from_file_location(f"migrations.m{self.path.stem}", self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(conn)
+
+
+def discover_migrations() -> List[Migration]:
+    """Return every migration file in version order"""
+    migrations = []
+    for path in MIGRATIONS_DIR.iterdir():
+        match = MIGRATION_FILE_PATTERN.match(path.name)
+        if not match:
+            continue
+        migrations.append(Migration(
+            version=int(match.group(1)),
+            name=match.group(2),
+            path=path,
+            checksum=hashlib.sha256(path.read_bytes()).hexdigest()
+        ))
+
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError("Duplicate migration version numbers")
+    return migrations
+
+
+def _verify_applied(conn: sqlite3.Connection, migrations: List[Migration]) -> int:
+    """Check recorded checksums and return the highest applied version"""
+    known = {m.version: m for m in migrations}
+    applied = conn.execute("SELECT version, name, checksum FROM schema_migrations").fetchall()
+
+    current = 0
+    for version, name, checksum in applied:
+        migration = known.get(version)
+        if migration is None:
+            raise RuntimeError(f"Database has migration {version:04d}_{name} which is not on disk")
+        if migration.checksum != checksum:
+            raise RuntimeError(f"Migration {version:04d}_{name} was modified after being applied")
+        current = max(current, version)
+    return current
+
+
+def run_migrations(database: str) -> List[Migration]:
+    """
+    Apply pending migrations to a database file
+
+    Safe to call from several workers at once: the slow path runs under
+    BEGIN IMMEDIATE, so one worker migrates while the others wait on the
+    write lock and then find nothing left to do.
+
+    Returns:
+        The migrations applied by this call (empty when already up to date)
+    """
+    migrations = discover_migrations()
+    latest = migrations[-1].version if migrations else 0
+
+    conn = sqlite3.connect(database, timeout=LOCK_TIMEOUT_SECONDS, isolation_level=None)
+    try:
+        # Fast path: nothing to do
+        (current,) = conn.execute("PRAGMA user_version").fetchone()
+        if current == latest:
+            return []
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    checksum TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            current = _verify_applied(conn, migrations)
+
+            pending = [m for m in migrations if m.version > current]
+            for migration in pending:
+                migration.upgrade(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (?, ?, ?)",
+                    (migration.version, migration.name, migration.checksum)
+                )
+                print(f"Applied migration {migration.version:04d}_{migration.name}")
+
+            conn.execute(f"PRAGMA user_version = {latest}")
+            conn.execute("COMMIT")
+            return pending
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    finally:
+        conn.close()
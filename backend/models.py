@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Any, Dict, List, Optional
 from datetime import date, datetime
 
 
@@ -116,6 +116,7 @@ class Session(SessionBase):
     id: int
     created_at: str
     updated_at: str
+    ai_assisted_data_version: int = 0  # send as If-Match when patching ai_assisted_data
 
     class Config:
         from_attributes = True
@@ -127,6 +128,71 @@ class SessionWithClient(Session):
     last_name: str
 
 
+class SessionFields(BaseModel):
+    """
+    Sparse session for list endpoints: only the fields picked with `fields=`
+    (or the endpoint's default summary projection) are present, so routes
+    using it set response_model_exclude_unset=True
+    """
+    id: int
+    client_id: Optional[int] = None
+    session_date: Optional[str] = None
+    session_time: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    status: Optional[str] = None
+    notes: Optional[str] = None
+    summary: Optional[str] = None
+    life_domains: Optional[dict] = None
+    emotional_themes: Optional[dict] = None
+    interventions: Optional[list] = None
+    ai_assisted_data: Optional[str] = None
+    overall_progress: Optional[str] = None
+    session_summary: Optional[str] = None
+    client_insights: Optional[str] = None
+    homework_assigned: Optional[str] = None
+    clinical_observations: Optional[str] = None
+    risk_assessment: Optional[str] = None
+    has_risk: Optional[bool] = None  # risk_assessment is filled in, without the text
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class SessionFieldsWithClient(SessionFields):
+    """Sparse session with embedded client info for Today view"""
+    first_name: str
+    last_name: str
+
+
+class AIDataPatchResult(BaseModel):
+    """Outcome of PATCH /api/sessions/{id}/ai-data; the document itself is not echoed"""
+    ai_assisted_data_version: int
+
+
+class SessionCalendarEntry(BaseModel):
+    """Compact session for week/month calendar views (no notes or clinical data)"""
+    id: int
+    client_id: int
+    first_name: str
+    last_name: str
+    session_date: str
+    session_time: Optional[str] = None
+    duration_minutes: int
+    status: str
+
+
+class SessionSearchResult(BaseModel):
+    """A session matching a full-text search, with a highlighted snippet"""
+    session_id: int
+    client_id: int
+    first_name: str
+    last_name: str
+    session_date: str
+    status: str
+    field: str  # session_summary, notes, clinical_observations or transcript
+    snippet: Optional[str] = None
+    rank: float  # BM25; lower is better
+
+
 # Todo Models
 class TodoBase(BaseModel):
     client_id: int
@@ -266,6 +332,14 @@ class MessageCreate(BaseModel):
     related_session_id: Optional[int] = None
 
 
+class MessageBroadcast(BaseModel):
+    recipient_ids: List[int]
+    recipient_type: str = 'client'
+    content: str
+    attachments: Optional[list] = []
+    related_session_id: Optional[int] = None
+
+
 class MessageUpdate(BaseModel):
     read: Optional[bool] = None
     read_at: Optional[str] = None
@@ -348,3 +422,22 @@ class HomeworkSubmission(HomeworkSubmissionBase):
 class HomeworkAssignmentWithSubmission(HomeworkAssignment):
     """Homework assignment with embedded submission if exists"""
     submission: Optional[HomeworkSubmission] = None
+
+
+# Aggregate Models
+class DashboardBootstrap(BaseModel):
+    """Everything the dashboard needs for first paint; absent keys were not included"""
+    therapist: Therapist
+    clients: Optional[List[Client]] = None
+    clients_next_cursor: Optional[str] = None
+    today_sessions: Optional[List[SessionFieldsWithClient]] = None
+    scheduled_sessions: Optional[List[SessionCalendarEntry]] = None
+
+
+class ClientWorkspace(BaseModel):
+    """A client with their sessions, todos and session prep; absent keys were not included"""
+    client: Client
+    sessions: Optional[List[SessionFields]] = None
+    sessions_next_cursor: Optional[str] = None
+    todos: Optional[List[Todo]] = None
+    session_prep: Optional[Dict[str, Any]] = None
@@ -0,0 +1,57 @@
+"""
+Keyset (cursor) pagination helpers
+
+A page is requested with `limit` and the opaque `cursor` returned by the
+previous page. The cursor encodes the sort key of the last row sent, so the
+next page is a plain index range read (`WHERE (key...) > (?...) LIMIT n`)
+rather than an OFFSET that re-reads every earlier row. The cursor for the
+next page travels in the X-Next-Cursor response header so list endpoints
+keep returning a plain JSON array; aggregate endpoints put it in the body
+next to the page.
+"""
+import base64
+import json
+import os
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+
+PAGE_SIZE = int(os.getenv("PAGE_SIZE", "100"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "500"))
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+# For lists paged by explicit ids: whether more rows lie in the direction read
+HAS_MORE_HEADER = "X-Has-More"
+
+
+def encode_cursor(key: Sequence[Any]) -> str:
+    raw = json.dumps(list(key), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], length: int) -> Optional[list]:
+    """Sort key stored in a cursor, or None for the first page; 400 if malformed"""
+    if not cursor:
+        return None
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, list) or len(key) != length:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
+
+
+def fetch_page(cursor, limit: int, sort_key) -> Tuple[list, Optional[str]]:
+    """
+    Fetch one page from an executed query
+
+    The query must select limit + 1 rows; the extra row only tells us
+    whether there is a next page. sort_key(row) gives the row's cursor key.
+    Returns the rows and the cursor for the next page (None on the last);
+    routes send the cursor as the X-Next-Cursor header.
+    """
+    rows = cursor.fetchmany(limit + 1)
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(sort_key(rows[-1]))
+    return rows, None
@@ -0,0 +1,105 @@
+"""
+Out-of-row storage for large session text
+
+Transcripts, AI-assisted data, notes and the long clinical fields live in
+session_content, one zlib-compressed BLOB per field, keyed by session id.
+The sessions rows stay small, so the list, calendar and stats queries that
+walk them touch far fewer pages; the content is only read when a full
+session is requested.
+
+SQL can read and write the text with the inflate() and deflate()
+functions every pooled connection registers. ai_assisted_data carries a
+version number, bumped on every write, for optimistic concurrency, and a
+digest of the transcript inside it, so the search index is only rebuilt
+when an autosave changes the transcript.
+"""
+import hashlib
+import json
+import sqlite3
+import zlib
+from typing import Any, Dict, Optional
+
+# Session fields stored in session_content rather than in sessions
+CONTENT_FIELDS = (
+    'notes', 'ai_assisted_data', 'client_insights',
+    'homework_assigned', 'clinical_observations', 'risk_assessment'
+)
+
+COMPRESSION_LEVEL = 6
+
+
+def deflate(text: Optional[str]) -> Optional[bytes]:
+    if text is None:
+        return None
+    return zlib.compress(text.encode('utf-8'), COMPRESSION_LEVEL)
+
+
+def inflate(blob: Optional[bytes]) -> Optional[str]:
+    if blob is None:
+        return None
+    return zlib.decompress(blob).decode('utf-8')
+
+
+def transcript_digest(document: Any) -> Optional[str]:
+    """
+    Digest of the transcript in a parsed ai_assisted_data document, None
+    when it has none; stored in session_content.transcript_digest
+    """
+    if not isinstance(document, dict) or document.get('transcript') is None:
+        return None
+    transcript = json.dumps(document['transcript'], sort_keys=True)
+    return hashlib.sha1(transcript.encode('utf-8')).hexdigest()
+
+
+def parse_ai_assisted_data(text: Optional[str]) -> Any:
+    """The ai_assisted_data document, None when unset or not valid JSON"""
+    if text is None:
+        return None
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def save_session_content(conn: sqlite3.Connection, session_id: int, values: Dict[str, Optional[str]]) -> None:
+    """
+    Write the given content fields of a session; fields not given are left
+    alone
+
+    Nothing is written once the session is gone, so a queued autosave that
+    lands after the session was deleted cannot leave its text behind.
+    """
+    if not values:
+        return
+    unknown = set(values) - set(CONTENT_FIELDS)
+    if unknown:
+        raise ValueError(f"Not session content fields: {', '.join(sorted(unknown))}")
+
+    columns = ["session_id", *values]
+    params = [session_id, *(deflate(value) for value in values.values())]
+    updates = [f"{field} = excluded.{field}" for field in values]
+    if 'ai_assisted_data' in values:
+        columns += ["ai_assisted_data_version", "transcript_digest"]
+        params += [1, transcript_digest(parse_ai_assisted_data(values['ai_assisted_data']))]
+        updates += [
+            "ai_assisted_data_version = ai_assisted_data_version + 1",
+            "transcript_digest = excluded.transcript_digest",
+        ]
+    conn.execute(
+        f"INSERT INTO session_content ({', '.join(columns)}) SELECT {', '.join('?' for _ in columns)}"
+        " WHERE EXISTS (SELECT 1 FROM sessions WHERE id = ?)"
+        f" ON CONFLICT (session_id) DO UPDATE SET {', '.join(updates)}",
+        [*params, session_id]
+    )
+
+
+def load_session_content(conn: sqlite3.Connection, session_id: int) -> Dict[str, Any]:
+    """All content fields of a session (None where unset) plus ai_assisted_data_version"""
+    row = conn.execute(
+        "SELECT * FROM session_content WHERE session_id = ?", (session_id,)
+    ).fetchone()
+    if row is None:
+        return {**{field: None for field in CONTENT_FIELDS}, 'ai_assisted_data_version': 0}
+    content = {field: inflate(row[field]) for field in CONTENT_FIELDS}
+    content['ai_assisted_data_version'] = row['ai_assisted_data_version']
+    return content
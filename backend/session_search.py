@@ -0,0 +1,103 @@
+"""
+Full-text search over session text
+
+The session_search FTS5 table (migration 0009) indexes each session's
+summary, notes, clinical observations and transcript, kept current by
+triggers (migrations 0009 and 0015). The text is stored compressed, so the
+triggers call inflate(): a connection that writes sessions or
+session_content without database.open_connection() registering it fails
+with "no such function: inflate".
+
+Searches run as a single MATCH that also requires the therapist column to
+hold the caller's id, so scoping is part of the index lookup rather than a
+filter over every therapist's hits.
+"""
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+
+# Indexed columns searched, with their BM25 weights (a hit in the summary
+# counts for more than one in a long transcript)
+SEARCH_COLUMNS = {
+    'session_summary': 4.0,
+    'notes': 2.0,
+    'clinical_observations': 2.0,
+    'transcript': 1.0,
+}
+
+SNIPPET_TOKENS = 16
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+
+MAX_TERMS = 16
+
+# Words as the unicode61 tokenizer sees them
+TERM_PATTERN = re.compile(r"\w+")
+
+
+def build_match_query(q: str, therapist_id: int) -> Optional[str]:
+    """
+    FTS5 query for the words in q (all must match), scoped to a therapist
+
+    The words are quoted, so FTS5 operators typed by the user are searched
+    for as text. A trailing * on the last word makes it a prefix search.
+    Returns None when q has no words.
+    """
+    terms = TERM_PATTERN.findall(q)[:MAX_TERMS]
+    if not terms:
+        return None
+    phrases = [f'"{term}"' for term in terms]
+    if q.rstrip().endswith('*'):
+        phrases[-1] += '*'
+    columns = ' '.join(SEARCH_COLUMNS)
+    return f'therapist : "{therapist_id}" AND {{{columns}}} : ({" ".join(phrases)})'
+
+
+def search_sessions(conn: sqlite3.Connection, therapist_id: int, q: str, limit: int) -> List[Dict[str, Any]]:
+    """
+    A therapist's sessions matching q, best match first
+
+    Each hit carries the client's name and a snippet of the field that
+    matched best, with the matches wrapped in <mark> tags. The rest of the
+    snippet is the stored text as is and must be escaped before rendering.
+    """
+    match = build_match_query(q, therapist_id)
+    if match is None:
+        raise HTTPException(status_code=400, detail="Search query has no words")
+
+    # Column 0 is the therapist id; it never contributes to the rank.
+    # Ordering by the rank column lets FTS5 score every hit and keep the
+    # best ones itself, so the snippets are only built for the rows returned.
+    weights = ', '.join(['0.0', *(str(weight) for weight in SEARCH_COLUMNS.values())])
+    snippets = ', '.join(
+        f"snippet(session_search, {index}, '{HIGHLIGHT_START}', '{HIGHLIGHT_END}', '…', {SNIPPET_TOKENS})"
+        f" AS {column}_snippet"
+        for index, column in enumerate(SEARCH_COLUMNS, start=1)
+    )
+    rows = conn.execute(f"""
+        SELECT
+            s.id AS session_id, s.client_id, s.session_date, s.status,
+            c.first_name, c.last_name,
+            rank,
+            {snippets}
+        FROM session_search
+        JOIN sessions s ON s.id = session_search.rowid
+        JOIN clients c ON c.id = s.client_id
+        WHERE session_search MATCH ? AND rank MATCH ?
+        ORDER BY rank
+        LIMIT ?
+    """, (match, f"bm25({weights})", limit))
+
+    results = []
+    for row in rows:
+        hit = {key: row[key] for key in ('session_id', 'client_id', 'session_date', 'status',
+                                         'first_name', 'last_name', 'rank')}
+        # snippet() returns the column's opening text when it has no match;
+        # show the field with the most highlighted terms
+        field = max(SEARCH_COLUMNS, key=lambda column: (row[f'{column}_snippet'] or '').count(HIGHLIGHT_START))
+        hit['field'] = field
+        hit['snippet'] = row[f'{field}_snippet']
+        results.append(hit)
+    return results
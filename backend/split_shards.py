@@ -0,0 +1,147 @@
+"""
+Split a single-file database into shards
+
+One-time step for turning sharding on for a deployment whose data so far
+lives in therapy.db alone. Stop the app, then run with DB_SHARD_COUNT set
+to the count the app will use:
+
+    DB_SHARD_COUNT=8 python split_shards.py
+
+Each therapist's rows are copied, with their ids, into shard
+therapist_id % DB_SHARD_COUNT, and then removed from therapy.db, which
+stays the directory: therapist accounts and intake link routes. A message
+between two therapists on different shards is copied into both. The
+shards' triggers rebuild conversations, counters, client statistics and
+the search index as the rows arrive.
+
+Refuses to run if a shard already holds data.
+"""
+import sys
+
+from database import DATABASE_URL, SHARD_COUNT, SHARD_FILE_PATTERN, init_db, open_connection
+
+OF_SHARD = "therapist_id % :count = :shard"
+MESSAGE_OF_SHARD = (
+    "(sender_type = 'therapist' AND sender_id % :count = :shard)"
+    " OR (recipient_type = 'therapist' AND recipient_id % :count = :shard)"
+)
+
+# Tables holding therapists' data, parents first, with the rows of one shard
+SHARDED_TABLES = (
+    ("clients", OF_SHARD),
+    ("sessions", OF_SHARD),
+    ("session_content", f"session_id IN (SELECT id FROM main.sessions WHERE {OF_SHARD})"),
+    ("todos", OF_SHARD),
+    ("form_links", OF_SHARD),
+    ("intake_responses", OF_SHARD),
+    ("assessment_responses", OF_SHARD),
+    ("homework_assignments", OF_SHARD),
+    ("homework_submissions",
+     f"assignment_id IN (SELECT id FROM main.homework_assignments WHERE {OF_SHARD})"),
+    ("message_bodies", f"id IN (SELECT body_id FROM main.messages WHERE {MESSAGE_OF_SHARD})"),
+    ("messages", MESSAGE_OF_SHARD),
+)
+
+# Kept by triggers; cleared from the directory once its rows are gone
+DERIVED_TABLES = ("conversations", "inbox_unread", "client_stats", "data_versions")
+
+
+def columns(conn, schema: str, table: str) -> list:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")]
+
+
+def copy_shard(conn, shard: int) -> dict:
+    """Copy one shard's rows from the directory into its attached file; returns counts per table"""
+    params = {"count": SHARD_COUNT, "shard": shard}
+    copied = {}
+    for table, where in SHARDED_TABLES:
+        shared = [name for name in columns(conn, "main", table) if name in columns(conn, "shard", table)]
+        column_list = ", ".join(shared)
+        copied[table] = conn.execute(
+            f"INSERT INTO shard.{table} ({column_list})"
+            f" SELECT {column_list} FROM main.{table} WHERE {where} ORDER BY rowid",
+            params
+        ).rowcount
+
+    # Both copies of a message between shards keep its id
+    conn.execute(
+        "UPDATE shard.messages SET mirror_id = id"
+        " WHERE sender_type = 'therapist' AND recipient_type = 'therapist'"
+        " AND sender_id % :count != recipient_id % :count",
+        params
+    )
+
+    # New ids must not reuse one the directory handed out to another shard's row
+    conn.execute("""
+        UPDATE shard.sqlite_sequence SET seq = MAX(seq, COALESCE(
+            (SELECT old.seq FROM main.sqlite_sequence old WHERE old.name = sqlite_sequence.name), 0
+        ))
+    """)
+    # Continue past the old data versions, so no ETag a browser holds matches
+    conn.execute("""
+        UPDATE shard.data_versions SET version = version + COALESCE(
+            (SELECT old.version FROM main.data_versions old WHERE old.therapist_id = data_versions.therapist_id), 0
+        )
+    """)
+    return copied
+
+
+def split_into_shards():
+    if not SHARD_COUNT:
+        print("ERROR: Set DB_SHARD_COUNT to the number of shards to split into.")
+        return 1
+
+    init_db()  # Creates the shard files and reserves their id ranges
+    conn = open_connection(DATABASE_URL)
+    conn.isolation_level = None  # Transactions below are explicit
+
+    unowned = conn.execute(
+        "SELECT (SELECT COUNT(*) FROM clients WHERE therapist_id IS NULL)"
+        " + (SELECT COUNT(*) FROM sessions WHERE therapist_id IS NULL)"
+    ).fetchone()[0]
+    if unowned:
+        print(f"ERROR: {unowned} clients/sessions have no therapist. Run migrate.py first.")
+        conn.close()
+        return 1
+
+    shard_files = [SHARD_FILE_PATTERN.format(shard) for shard in range(SHARD_COUNT)]
+    for shard_file in shard_files:
+        conn.execute("ATTACH DATABASE ? AS shard", (shard_file,))
+        used = sum(conn.execute(f"SELECT COUNT(*) FROM shard.{table}").fetchone()[0] for table, _ in SHARDED_TABLES)
+        conn.execute("DETACH DATABASE shard")
+        if used:
+            print(f"ERROR: {shard_file} already holds {used} rows. Nothing was changed.")
+            conn.close()
+            return 1
+
+    print(f"Splitting {DATABASE_URL} into {SHARD_COUNT} shards...")
+    for shard, shard_file in enumerate(shard_files):
+        conn.execute("ATTACH DATABASE ? AS shard", (shard_file,))
+        conn.execute("BEGIN")
+        copied = copy_shard(conn, shard)
+        conn.execute("COMMIT")
+        conn.execute("DETACH DATABASE shard")
+        print(f"✓ {shard_file}: {copied['clients']} clients, {copied['sessions']} sessions,"
+              f" {copied['messages']} messages")
+
+    # Public intake links find their shard through the directory
+    conn.execute("BEGIN")
+    conn.execute(
+        "INSERT OR IGNORE INTO intake_link_routes (link_token, therapist_id)"
+        " SELECT link_token, therapist_id FROM form_links WHERE link_token IS NOT NULL"
+    )
+    for table, _ in reversed(SHARDED_TABLES):
+        conn.execute(f"DELETE FROM {table}")
+    for table in DERIVED_TABLES:
+        conn.execute(f"DELETE FROM {table}")
+    conn.execute("COMMIT")
+    conn.execute("VACUUM")
+    conn.close()
+
+    print(f"\n✅ {DATABASE_URL} now only holds therapist accounts and intake link routes.")
+    print(f"   Start the app with DB_SHARD_COUNT={SHARD_COUNT}.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(split_into_shards())
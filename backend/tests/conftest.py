@@ -0,0 +1,108 @@
+"""
+Shared fixtures: the app on a fresh database, and signed bearer tokens
+
+Tokens are real RS256 JWTs signed with a key generated for the test run
+and published to the app under KID, so requests go through the same
+verification as in production.
+"""
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.testclient import TestClient
+from jwt.algorithms import RSAAlgorithm
+
+KID = "test-key"
+
+
+@pytest.fixture(scope="session")
+def signing_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="session")
+def public_jwk(signing_key):
+    return {**json.loads(RSAAlgorithm.to_jwk(signing_key.public_key())), "kid": KID}
+
+
+@pytest.fixture
+def make_token(signing_key):
+    def make(sub: str, kid: str = KID, expires_in: int = 3600) -> str:
+        now = int(time.time())
+        return jwt.encode({"sub": sub, "iat": now, "exp": now + expires_in}, signing_key,
+                          algorithm="RS256", headers={"kid": kid})
+    return make
+
+
+@pytest.fixture
+def shard_count():
+    """DB_SHARD_COUNT the app runs with; override in a module to test sharding"""
+    return 0
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch, public_jwk, shard_count):
+    """TestClient for the app, started on an empty database in tmp_path"""
+    import auth
+    import database
+    import intake_routes
+    import main
+    from jwks import jwks_manager
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(database, "SHARD_COUNT", shard_count)
+    monkeypatch.setattr(intake_routes, "SHARD_COUNT", shard_count)
+    monkeypatch.delenv("CLERK_JWKS_URL", raising=False)
+    monkeypatch.delenv("CLERK_FRONTEND_API", raising=False)
+    monkeypatch.setattr(jwks_manager, "_keys", {KID: RSAAlgorithm.from_jwk(public_jwk)})
+    auth.therapist_cache.clear()
+    auth.verified_tokens.clear()
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def therapist_headers(make_token):
+    """Headers authenticating as the therapist with the given Clerk user id"""
+    def headers(clerk_user_id: str) -> dict:
+        return {"Authorization": f"Bearer {make_token(clerk_user_id)}"}
+    return headers
+
+
+@pytest.fixture
+def auth_headers(therapist_headers):
+    return therapist_headers("user_1")
+
+
+@pytest.fixture
+def therapist_id(client):
+    """Database id of the therapist behind a set of headers (created on first use)"""
+    def get(headers: dict) -> int:
+        return client.post("/api/auth/sync", headers=headers).json()["id"]
+    return get
+
+
+@pytest.fixture
+def new_client(client):
+    """Create a client record through the API and return it"""
+    def create(headers: dict, **fields) -> dict:
+        body = {"first_name": "Ada", "last_name": "Client", "date_of_birth": "1990-01-01", **fields}
+        response = client.post("/api/clients", json=body, headers=headers)
+        assert response.status_code in (200, 201), response.text
+        return response.json()
+    return create
+
+
+@pytest.fixture
+def new_session(client):
+    """Create a session through the API and return it"""
+    def create(headers: dict, client_id: int, **fields) -> dict:
+        body = {"client_id": client_id, "session_date": "2024-01-01", "session_time": "10:00",
+                "duration_minutes": 50, **fields}
+        response = client.post("/api/sessions", json=body, headers=headers)
+        assert response.status_code in (200, 201), response.text
+        return response.json()
+    return create
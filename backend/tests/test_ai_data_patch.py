@@ -0,0 +1,129 @@
+"""
+PATCH /api/sessions/{id}/ai-data: JSON Patch and merge patch autosaves
+"""
+import json
+
+import pytest
+
+pytestmark = pytest.mark.integration
+
+JSON_PATCH = "application/json-patch+json"
+MERGE_PATCH = "application/merge-patch+json"
+
+
+@pytest.fixture
+def session_id(auth_headers, new_client, new_session):
+    ai_data = json.dumps({"emotions": ["calm"], "transcript": [{"speaker": "client", "text": "Hi"}]})
+    return new_session(auth_headers, new_client(auth_headers)["id"], ai_assisted_data=ai_data)["id"]
+
+
+@pytest.fixture
+def patch(client, auth_headers, session_id):
+    def send(body, content_type="application/json", if_match=None, target=None):
+        headers = {**auth_headers, "Content-Type": content_type}
+        if if_match is not None:
+            headers["If-Match"] = if_match
+        return client.patch(f"/api/sessions/{target or session_id}/ai-data",
+                            content=json.dumps(body), headers=headers)
+    return send
+
+
+@pytest.fixture
+def document(client, auth_headers, session_id):
+    def load():
+        session = client.get(f"/api/sessions/{session_id}", headers=auth_headers).json()
+        return json.loads(session["ai_assisted_data"]), session["ai_assisted_data_version"]
+    return load
+
+
+def test_json_patch_is_applied_and_the_version_returned(patch, document):
+    _, version = document()
+
+    response = patch([{"op": "add", "path": "/emotions/-", "value": "hopeful"},
+                      {"op": "add", "path": "/transcript/-", "value": {"speaker": "therapist", "text": "Hello"}}],
+                     JSON_PATCH, if_match=f'"{version}"')
+
+    assert response.status_code == 200
+    assert response.json() == {"ai_assisted_data_version": version + 1}
+    assert response.headers["ETag"] == f'"{version + 1}"'
+    data, new_version = document()
+    assert data["emotions"] == ["calm", "hopeful"]
+    assert [line["text"] for line in data["transcript"]] == ["Hi", "Hello"]
+    assert new_version == version + 1
+
+
+def test_merge_patch_is_applied(patch, document):
+    response = patch({"emotions": None, "summary": "Calmer"}, MERGE_PATCH)
+
+    assert response.status_code == 200
+    data, _ = document()
+    assert data == {"transcript": [{"speaker": "client", "text": "Hi"}], "summary": "Calmer"}
+
+
+def test_plain_json_array_is_json_patch_and_object_is_merge_patch(patch, document):
+    assert patch([{"op": "replace", "path": "/emotions", "value": []}]).status_code == 200
+    assert patch({"mood": "steady"}).status_code == 200
+
+    data, _ = document()
+    assert (data["emotions"], data["mood"]) == ([], "steady")
+
+
+@pytest.mark.parametrize("body, content_type", [({"a": 1}, JSON_PATCH), ([], MERGE_PATCH)])
+def test_body_must_match_the_declared_patch_type(patch, body, content_type):
+    assert patch(body, content_type).status_code == 400
+
+
+def test_stale_if_match_is_rejected_and_changes_nothing(patch, document):
+    before = document()
+
+    response = patch({"mood": "lost update"}, if_match=f'"{before[1] + 5}"')
+
+    assert response.status_code == 412
+    assert document() == before
+
+
+@pytest.mark.parametrize("if_match", ["*", 'W/"{version}"', "{version}"])
+def test_if_match_forms(patch, document, if_match):
+    _, version = document()
+
+    assert patch({"mood": "ok"}, if_match=if_match.format(version=version)).status_code == 200
+
+
+def test_malformed_if_match_is_a_400(patch):
+    assert patch({"mood": "ok"}, if_match='"v3"').status_code == 400
+
+
+def test_failed_test_op_is_a_409_and_changes_nothing(patch, document):
+    before = document()
+
+    response = patch([{"op": "remove", "path": "/emotions"},
+                      {"op": "test", "path": "/transcript/0/text", "value": "Bye"}], JSON_PATCH)
+
+    assert response.status_code == 409
+    assert document() == before
+
+
+def test_invalid_operation_is_a_422(patch):
+    assert patch([{"op": "remove", "path": "/missing"}], JSON_PATCH).status_code == 422
+
+
+def test_stored_document_that_is_not_json_is_a_409(client, auth_headers, session_id, patch):
+    client.put(f"/api/sessions/{session_id}", headers=auth_headers, json={"ai_assisted_data": "not json"})
+
+    assert patch([{"op": "add", "path": "/a", "value": 1}], JSON_PATCH).status_code == 409
+    assert patch({"a": 1}, MERGE_PATCH).status_code == 409
+
+
+def test_session_without_ai_data_starts_from_an_empty_document(auth_headers, new_client, new_session, patch):
+    bare = new_session(auth_headers, new_client(auth_headers)["id"])["id"]
+
+    response = patch([{"op": "add", "path": "/mood", "value": "new"}], JSON_PATCH, if_match='"0"', target=bare)
+
+    assert response.json() == {"ai_assisted_data_version": 1}
+
+
+def test_another_therapists_session_is_not_found(client, therapist_headers, session_id):
+    response = client.patch(f"/api/sessions/{session_id}/ai-data", json={"a": 1},
+                            headers=therapist_headers("user_2"))
+
+    assert response.status_code == 404
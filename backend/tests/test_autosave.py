@@ -0,0 +1,104 @@
+"""Autosaves through the group-commit writer (write_queue.py)"""
+import json
+import sqlite3
+
+import pytest
+
+import main
+from write_queue import writer
+
+pytestmark = pytest.mark.integration
+
+
+def autosave(client, headers, session_id, document):
+    return client.put(f"/api/sessions/{session_id}", headers=headers,
+                      json={"ai_assisted_data": json.dumps(document)})
+
+
+def test_autosave_is_visible_to_the_next_read(client, auth_headers, new_client, new_session):
+    session = new_session(auth_headers, new_client(auth_headers)["id"])
+    response = autosave(client, auth_headers, session["id"], {"transcript": "hello"})
+    assert response.status_code == 200
+    assert json.loads(response.json()["ai_assisted_data"]) == {"transcript": "hello"}
+
+    stored = client.get(f"/api/sessions/{session['id']}", headers=auth_headers).json()
+    assert json.loads(stored["ai_assisted_data"]) == {"transcript": "hello"}
+
+
+def test_autosaves_in_one_window_collapse(client, auth_headers, new_client, new_session, monkeypatch):
+    session = new_session(auth_headers, new_client(auth_headers)["id"])
+    monkeypatch.setattr(writer, "window", 5)  # nothing commits until a flush
+    for n in range(5):
+        assert autosave(client, auth_headers, session["id"], {"n": n}).status_code == 200
+
+    stored = client.get(f"/api/sessions/{session['id']}", headers=auth_headers).json()
+    assert json.loads(stored["ai_assisted_data"]) == {"n": 4}
+    assert stored["ai_assisted_data_version"] == 1
+
+
+def test_delete_right_after_autosave_leaves_no_content(client, auth_headers, new_client, new_session, monkeypatch):
+    session = new_session(auth_headers, new_client(auth_headers)["id"], notes="private")
+    monkeypatch.setattr(writer, "window", 5)
+    assert autosave(client, auth_headers, session["id"], {"transcript": "private"}).status_code == 200
+
+    assert client.delete(f"/api/sessions/{session['id']}", headers=auth_headers).status_code == 204
+    writer.flush()
+
+    conn = sqlite3.connect(main.DATABASE_URL)
+    assert conn.execute("SELECT COUNT(*) FROM session_content").fetchone()[0] == 0
+    conn.close()
+
+
+def test_queued_write_for_a_deleted_session_is_dropped(client, auth_headers, new_client, new_session):
+    session = new_session(auth_headers, new_client(auth_headers)["id"])
+    assert client.delete(f"/api/sessions/{session['id']}", headers=auth_headers).status_code == 204
+
+    # As if the autosave had been queued just before the delete committed
+    writer.submit(("session_ai_data", session["id"]), main.save_ai_assisted_data,
+                  (session["id"], json.dumps({"transcript": "late"}), "2024-01-01T00:00:00"),
+                  database=main.DATABASE_URL)
+    writer.flush()
+
+    conn = sqlite3.connect(main.DATABASE_URL)
+    assert conn.execute("SELECT COUNT(*) FROM session_content").fetchone()[0] == 0
+    conn.close()
+
+
+def test_failed_autosave_is_reported_on_the_next_one(client, auth_headers, new_client, new_session, monkeypatch):
+    session = new_session(auth_headers, new_client(auth_headers)["id"])
+
+    def fail(conn, payload):
+        raise sqlite3.OperationalError("disk I/O error")
+
+    writer.submit(("session_ai_data", session["id"]), fail, None, database=main.DATABASE_URL)
+    writer.flush()
+
+    assert autosave(client, auth_headers, session["id"], {"n": 1}).status_code == 503
+    assert autosave(client, auth_headers, session["id"], {"n": 2}).status_code == 200
+
+
+def stored_ai_data(session_id):
+    conn = sqlite3.connect(main.DATABASE_URL)
+    conn.create_function("inflate", 1, main.inflate)
+    row = conn.execute("SELECT inflate(ai_assisted_data) FROM session_content WHERE session_id = ?",
+                       (session_id,)).fetchone()
+    conn.close()
+    return json.loads(row[0]) if row and row[0] else None
+
+
+def test_reads_only_flush_the_readers_own_writes(client, auth_headers, therapist_headers, new_client,
+                                                 new_session, monkeypatch):
+    other = therapist_headers("user_2")
+    session = new_session(auth_headers, new_client(auth_headers)["id"])
+    new_client(other)
+    monkeypatch.setattr(writer, "window", 5)
+    assert autosave(client, auth_headers, session["id"], {"n": 1}).status_code == 200
+
+    # Another therapist's reads leave the group open
+    assert client.get("/api/clients", headers=other).status_code == 200
+    assert client.get("/api/messages/unread-count", headers=other).status_code == 200
+    assert stored_ai_data(session["id"]) is None
+
+    # The writer's own read lands it
+    assert client.get("/api/clients", headers=auth_headers).status_code == 200
+    assert stored_ai_data(session["id"]) == {"n": 1}
@@ -0,0 +1,95 @@
+"""
+Single-request dashboard bootstrap and client workspace
+"""
+from datetime import date, timedelta
+
+import pytest
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def practice(client, auth_headers, new_client, new_session):
+    """Two clients with past, today's and upcoming sessions, and a todo"""
+    today = date.today()
+    ada = new_client(auth_headers, first_name="Ada", last_name="Lovelace")
+    new_client(auth_headers, first_name="Bo", last_name="Cole")
+    past = new_session(auth_headers, ada["id"], session_date=(today - timedelta(days=7)).isoformat())
+    new_session(auth_headers, ada["id"], session_date=today.isoformat(), session_time="09:00", status="scheduled")
+    new_session(auth_headers, ada["id"], session_date=(today + timedelta(days=7)).isoformat(), status="scheduled")
+    client.post("/api/todos", headers=auth_headers,
+                json={"client_id": ada["id"], "text": "Journal", "source_session_id": past["id"]})
+    return ada
+
+
+def test_bootstrap_matches_the_separate_endpoints(client, auth_headers, practice):
+    to = (date.today() + timedelta(days=365)).isoformat()
+
+    bootstrap = client.get("/api/dashboard/bootstrap?include=clients,today,scheduled", headers=auth_headers).json()
+
+    assert bootstrap["therapist"] == client.get("/api/auth/me", headers=auth_headers).json()
+    assert bootstrap["clients"] == client.get("/api/clients", headers=auth_headers).json()
+    assert bootstrap["today_sessions"] == client.get("/api/sessions/today", headers=auth_headers).json()
+    assert bootstrap["scheduled_sessions"] == client.get(
+        f"/api/sessions/range?to={to}&status=scheduled", headers=auth_headers
+    ).json()
+    assert len(bootstrap["scheduled_sessions"]) == 2
+
+
+def test_bootstrap_sends_only_what_is_included(client, auth_headers, practice):
+    default = client.get("/api/dashboard/bootstrap", headers=auth_headers).json()
+    assert set(default) == {"therapist", "clients", "clients_next_cursor", "today_sessions"}
+
+    only_today = client.get("/api/dashboard/bootstrap?include=today&fields=status", headers=auth_headers).json()
+    assert set(only_today) == {"therapist", "today_sessions"}
+    assert set(only_today["today_sessions"][0]) == {
+        "id", "session_date", "session_time", "status", "first_name", "last_name"
+    }
+
+
+def test_bootstrap_pages_the_clients(client, auth_headers, practice):
+    page = client.get("/api/dashboard/bootstrap?include=clients&limit=1", headers=auth_headers).json()
+
+    assert [c["last_name"] for c in page["clients"]] == ["Cole"]
+    rest = client.get(f"/api/clients?cursor={page['clients_next_cursor']}", headers=auth_headers).json()
+    assert [c["last_name"] for c in rest] == ["Lovelace"]
+
+
+def test_workspace_matches_the_separate_endpoints(client, auth_headers, practice):
+    client_id = practice["id"]
+
+    workspace = client.get(f"/api/clients/{client_id}/workspace", headers=auth_headers).json()
+
+    assert workspace["client"] == client.get(f"/api/clients/{client_id}", headers=auth_headers).json()
+    assert workspace["sessions"] == client.get(f"/api/sessions?client_id={client_id}", headers=auth_headers).json()
+    assert workspace["todos"] == client.get(f"/api/todos?client_id={client_id}", headers=auth_headers).json()
+    assert workspace["session_prep"] == client.get(
+        f"/api/clients/{client_id}/session-prep", headers=auth_headers
+    ).json()
+    assert len(workspace["sessions"]) == 3 and len(workspace["todos"]) == 1
+
+
+def test_workspace_include_picks_the_parts(client, auth_headers, practice):
+    workspace = client.get(f"/api/clients/{practice['id']}/workspace?include=todos", headers=auth_headers).json()
+
+    assert set(workspace) == {"client", "todos"}
+
+
+@pytest.mark.parametrize("path", ["/api/dashboard/bootstrap?include=clients,everything",
+                                  "/api/clients/{id}/workspace?include=sessions,bills"])
+def test_unknown_include_is_a_400(client, auth_headers, practice, path):
+    assert client.get(path.format(id=practice["id"]), headers=auth_headers).status_code == 400
+
+
+def test_workspace_of_another_therapists_client_is_not_found(client, therapist_headers, practice):
+    response = client.get(f"/api/clients/{practice['id']}/workspace", headers=therapist_headers("user_2"))
+
+    assert response.status_code == 404
+
+
+def test_unchanged_bootstrap_is_not_modified(client, auth_headers, practice):
+    first = client.get("/api/dashboard/bootstrap", headers=auth_headers)
+
+    again = client.get("/api/dashboard/bootstrap", headers={**auth_headers, "If-None-Match": first.headers["ETag"]})
+
+    assert again.status_code == 304
@@ -0,0 +1,106 @@
+"""
+One message broadcast to many clients, stored once in message_bodies
+"""
+import sqlite3
+
+import pytest
+
+import communication_routes
+from database import DATABASE_URL
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def clients(auth_headers, new_client):
+    return [new_client(auth_headers, first_name=name)["id"] for name in ("Ada", "Bo", "Cy")]
+
+
+def broadcast(client, headers, recipient_ids, **fields):
+    return client.post("/api/messages/broadcast", headers=headers, json={
+        "recipient_ids": recipient_ids, "content": "Office closed Monday", **fields
+    })
+
+
+def count(query: str) -> int:
+    conn = sqlite3.connect(DATABASE_URL)
+    try:
+        return conn.execute(query).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_every_recipient_gets_the_message(client, auth_headers, therapist_id, clients):
+    attachments = [{"url": "/api/uploads/hours.pdf", "type": "file"}]
+
+    response = broadcast(client, auth_headers, clients + [clients[0]], attachments=attachments)
+
+    assert response.status_code == 200
+    created = response.json()
+    assert [message["recipient_id"] for message in created] == clients
+    for message in created:
+        assert (message["sender_id"], message["recipient_type"]) == (therapist_id(auth_headers), "client")
+        assert (message["content"], message["attachments"]) == ("Office closed Monday", attachments)
+
+
+def test_the_content_is_stored_once(client, auth_headers, clients):
+    broadcast(client, auth_headers, clients)
+
+    assert count("SELECT COUNT(*) FROM message_bodies") == 1
+    assert count("SELECT COUNT(*) FROM messages WHERE body_id IS NOT NULL AND content = ''") == 3
+
+
+def test_threads_and_inbox_show_the_broadcast(client, auth_headers, clients):
+    broadcast(client, auth_headers, clients)
+
+    for client_id in clients:
+        thread = client.get(f"/api/messages/thread/{client_id}?other_party_type=client", headers=auth_headers).json()
+        assert [message["content"] for message in thread] == ["Office closed Monday"]
+    inbox = client.get("/api/messages/inbox", headers=auth_headers).json()
+    assert [row["last_message_preview"] for row in inbox] == ["Office closed Monday"] * 3
+
+
+def test_another_therapists_client_fails_the_whole_broadcast(
+        client, auth_headers, therapist_headers, new_client, clients):
+    foreign = new_client(therapist_headers("user_2"))["id"]
+
+    response = broadcast(client, auth_headers, clients + [foreign])
+
+    assert response.status_code == 404
+    assert str(foreign) in response.json()["detail"]
+    assert count("SELECT COUNT(*) FROM messages") == 0
+
+
+def test_a_failed_insert_leaves_nothing_behind(client, auth_headers, clients):
+    conn = sqlite3.connect(DATABASE_URL)
+    conn.execute(
+        f"CREATE TRIGGER fail_insert_messages BEFORE INSERT ON messages WHEN NEW.recipient_id = {clients[2]}"
+        " BEGIN SELECT RAISE(ABORT, 'injected failure'); END"
+    )
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(sqlite3.IntegrityError):
+        broadcast(client, auth_headers, clients)
+
+    assert count("SELECT COUNT(*) FROM messages") == 0
+    assert count("SELECT COUNT(*) FROM message_bodies") == 0
+
+
+def test_no_recipients_is_a_400(client, auth_headers):
+    assert broadcast(client, auth_headers, []).status_code == 400
+
+
+def test_therapist_recipients_are_a_400(client, auth_headers, therapist_id, therapist_headers):
+    colleague = therapist_id(therapist_headers("user_2"))
+
+    assert broadcast(client, auth_headers, [colleague], recipient_type="therapist").status_code == 400
+
+
+def test_too_many_recipients_is_a_400(client, auth_headers, clients, monkeypatch):
+    monkeypatch.setattr(communication_routes, "MAX_BROADCAST_RECIPIENTS", 2)
+
+    response = broadcast(client, auth_headers, clients)
+
+    assert response.status_code == 400
+    assert count("SELECT COUNT(*) FROM messages") == 0
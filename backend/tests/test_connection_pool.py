@@ -0,0 +1,112 @@
+"""
+Pooled SQLite connections behind get_db()
+"""
+import threading
+
+import pytest
+
+import database
+from database import ConnectionPool, PoolExhausted, get_db, request_scope
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = str(tmp_path / "pool.db")
+    conn = database.open_connection(path)
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.commit()
+    conn.close()
+    yield path
+    database.close_pools()
+
+
+def test_connections_open_in_wal_mode_with_the_pragmas(db_file):
+    conn = database.open_connection(db_file)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 5000
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+        assert conn.execute("SELECT inflate(deflate('text'))").fetchone()[0] == "text"
+    finally:
+        conn.close()
+
+
+def test_released_connections_are_reused(db_file):
+    pool = ConnectionPool(db_file, size=2)
+
+    first = pool.acquire()
+    pool.release(first)
+
+    assert pool.acquire() is first
+    assert pool._opened == 1
+
+
+def test_acquire_times_out_when_every_connection_is_out(db_file):
+    pool = ConnectionPool(db_file, size=2, timeout=0.05)
+    held = [pool.acquire(), pool.acquire()]
+
+    with pytest.raises(PoolExhausted):
+        pool.acquire()
+
+    pool.release(held[0])
+    assert pool.acquire() is held[0]
+
+
+def test_a_waiting_acquire_gets_the_next_released_connection(db_file):
+    pool = ConnectionPool(db_file, size=1, timeout=5)
+    held = pool.acquire()
+    got = []
+
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    pool.release(held)
+    waiter.join(5)
+
+    assert got == [held]
+
+
+def test_release_rolls_back_an_unfinished_transaction(db_file):
+    pool = ConnectionPool(db_file, size=1)
+    conn = pool.acquire()
+    conn.execute("INSERT INTO items (name) VALUES ('half-written')")
+    pool.release(conn)
+
+    conn = pool.acquire()
+    assert not conn.in_transaction
+    assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 0
+
+
+def test_get_db_commits_or_rolls_back_the_block(db_file):
+    with get_db(db_file) as conn:
+        conn.execute("INSERT INTO items (name) VALUES ('kept')")
+
+    with pytest.raises(RuntimeError):
+        with get_db(db_file) as conn:
+            conn.execute("INSERT INTO items (name) VALUES ('dropped')")
+            raise RuntimeError("fail")
+
+    with get_db(db_file) as conn:
+        assert [row["name"] for row in conn.execute("SELECT name FROM items")] == ["kept"]
+
+
+def test_nested_get_db_in_a_request_shares_one_connection(db_file):
+    pool = database.get_pool(db_file)
+    with request_scope():
+        with get_db(db_file) as outer:
+            with get_db(db_file) as inner:
+                assert inner is outer
+                assert pool._idle.qsize() == 0
+        # Back in the pool once the outer block exits
+        assert pool._idle.qsize() == 1
+
+
+@pytest.mark.integration
+def test_requests_stay_within_the_pool_size(client, auth_headers, therapist_id, new_client):
+    therapist_id(auth_headers)
+    for _ in range(20):
+        new_client(auth_headers)
+        assert client.get("/api/clients", headers=auth_headers).status_code == 200
+
+    assert database.get_pool(database.DATABASE_URL)._opened <= database.POOL_SIZE
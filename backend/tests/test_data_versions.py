@@ -0,0 +1,73 @@
+"""ETags and 304 Not Modified on the list endpoints (data_versions triggers)"""
+import pytest
+
+pytestmark = pytest.mark.integration
+
+
+def get_etag(client, url, headers):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.headers["etag"]
+
+
+def is_current(client, url, headers, etag) -> bool:
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code in (200, 304)
+    return response.status_code == 304
+
+
+def test_unchanged_list_is_not_modified(client, auth_headers, new_client):
+    new_client(auth_headers)
+    etag = get_etag(client, "/api/clients", auth_headers)
+    response = client.get("/api/clients", headers={**auth_headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+
+def test_write_changes_the_etag(client, auth_headers, new_client, new_session):
+    record = new_client(auth_headers)
+    etag = get_etag(client, "/api/clients", auth_headers)
+
+    new_session(auth_headers, record["id"])
+    assert not is_current(client, "/api/clients", auth_headers, etag)
+
+
+def test_other_therapists_writes_leave_the_etag(client, auth_headers, therapist_headers, new_client):
+    new_client(auth_headers)
+    etag = get_etag(client, "/api/clients", auth_headers)
+
+    new_client(therapist_headers("user_2"))
+    assert is_current(client, "/api/clients", auth_headers, etag)
+
+
+@pytest.mark.parametrize("url", ["/api/messages/unread-count", "/api/messages/inbox"])
+def test_message_between_therapists_changes_both_etags(client, therapist_headers, therapist_id, url):
+    sender, recipient = therapist_headers("user_1"), therapist_headers("user_2")
+    recipient_id = therapist_id(recipient)
+    sender_etag = get_etag(client, url, sender)
+    recipient_etag = get_etag(client, url, recipient)
+
+    response = client.post("/api/messages", headers=sender, json={
+        "recipient_id": recipient_id, "recipient_type": "therapist", "content": "Can you cover Friday?"
+    })
+    assert response.status_code == 200
+    assert not is_current(client, url, sender, sender_etag)
+    assert not is_current(client, url, recipient, recipient_etag)
+    assert client.get("/api/messages/unread-count", headers=recipient).json()["unread_count"] == 1
+
+
+def test_marking_a_therapist_message_read_changes_the_recipients_etag(client, therapist_headers, therapist_id):
+    sender, recipient = therapist_headers("user_1"), therapist_headers("user_2")
+    sender_id, recipient_id = therapist_id(sender), therapist_id(recipient)
+    message = client.post("/api/messages", headers=sender, json={
+        "recipient_id": recipient_id, "recipient_type": "therapist", "content": "Can you cover Friday?"
+    }).json()
+    recipient_etag = get_etag(client, "/api/messages/unread-count", recipient)
+    sender_etag = get_etag(client, f"/api/messages/thread/{recipient_id}?other_party_type=therapist", sender)
+
+    assert client.patch(f"/api/messages/{message['id']}/read", headers=recipient).status_code == 200
+    assert not is_current(client, "/api/messages/unread-count", recipient, recipient_etag)
+    assert not is_current(client, f"/api/messages/thread/{recipient_id}?other_party_type=therapist",
+                          sender, sender_etag)
+    assert client.get("/api/messages/unread-count", headers=recipient).json()["unread_count"] == 0
@@ -0,0 +1,97 @@
+"""
+Streaming export: /api/export as NDJSON and as a zip with the uploads
+"""
+import io
+import json
+import threading
+import zipfile
+from collections import Counter
+from pathlib import Path
+
+import pytest
+
+import database
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def practice(client, auth_headers, therapist_headers, therapist_id, new_client, new_session):
+    """A client with a session, a todo and messages both ways, plus another therapist's data"""
+    Path("uploads").mkdir(exist_ok=True)
+    ada = new_client(auth_headers, first_name="Ada")
+    session = new_session(auth_headers, ada["id"], notes="Slept better", interventions=["CBT"],
+                          ai_assisted_data=json.dumps({"transcript": "Hello"}))
+    client.post("/api/todos", headers=auth_headers, json={"client_id": ada["id"], "text": "Journal"})
+    upload = client.post("/api/upload", headers=auth_headers,
+                         files={"file": ("scan.png", b"\x89PNG" + b"x" * 1000, "image/png")}).json()
+    client.post("/api/messages", headers=auth_headers, json={
+        "recipient_id": ada["id"], "recipient_type": "client", "content": "See attached",
+        "attachments": [upload, {"url": "/api/uploads/../main.py", "type": "file"}]
+    })
+    colleague = therapist_headers("user_2")
+    new_client(colleague, first_name="Grace")
+    client.post("/api/messages", headers=colleague, json={
+        "recipient_id": therapist_id(auth_headers), "recipient_type": "therapist", "content": "Referral"
+    })
+    return {"client": ada, "session": session, "upload": upload}
+
+
+def records(body: bytes) -> list:
+    return [json.loads(line) for line in body.decode().splitlines()]
+
+
+def test_export_streams_every_record_as_ndjson(client, auth_headers, practice):
+    response = client.get("/api/export", headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.headers["content-disposition"].endswith('.ndjson"')
+    lines = records(response.content)
+    assert [line["type"] for line in lines[:2]] == ["export", "therapist"]
+    assert Counter(line["type"] for line in lines[2:]) == {"client": 1, "session": 1, "todo": 1, "message": 2}
+    assert [line["data"]["first_name"] for line in lines if line["type"] == "client"] == ["Ada"]
+
+
+def test_session_content_is_inflated_and_json_columns_parsed(client, auth_headers, practice):
+    lines = records(client.get("/api/export", headers=auth_headers).content)
+
+    session = next(line["data"] for line in lines if line["type"] == "session")
+    assert session["notes"] == "Slept better"
+    assert json.loads(session["ai_assisted_data"]) == {"transcript": "Hello"}
+    assert session["interventions"] == ["CBT"]
+    message = next(line["data"] for line in lines if line["type"] == "message" and line["data"]["attachments"])
+    assert message["attachments"][0]["url"] == practice["upload"]["url"]
+
+
+def test_queued_autosave_is_in_the_export(client, auth_headers, practice):
+    session_id = practice["session"]["id"]
+    client.put(f"/api/sessions/{session_id}", headers=auth_headers,
+               json={"ai_assisted_data": json.dumps({"transcript": "Latest"})})
+
+    lines = records(client.get("/api/export", headers=auth_headers).content)
+
+    session = next(line["data"] for line in lines if line["type"] == "session")
+    assert json.loads(session["ai_assisted_data"]) == {"transcript": "Latest"}
+
+
+def test_zip_export_packs_the_referenced_uploads(client, auth_headers, practice):
+    response = client.get("/api/export?attachments=true", headers=auth_headers)
+
+    assert response.headers["content-type"] == "application/zip"
+    archive = zipfile.ZipFile(io.BytesIO(response.content))
+    assert archive.testzip() is None
+    name = practice["upload"]["url"].rsplit("/", 1)[1]
+    # The URL pointing outside the upload directory is not followed
+    assert archive.namelist() == ["export.ndjson", f"attachments/{name}"]
+    assert archive.read(f"attachments/{name}") == b"\x89PNG" + b"x" * 1000
+    assert len(records(archive.read("export.ndjson"))) == 7
+
+
+def test_export_is_refused_when_the_streaming_connections_are_taken(client, auth_headers, practice, monkeypatch):
+    monkeypatch.setattr(database, "_streaming_slots", threading.BoundedSemaphore(1))
+    database._streaming_slots.acquire()
+
+    response = client.get("/api/export", headers=auth_headers)
+
+    assert response.status_code == 503
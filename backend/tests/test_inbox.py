@@ -0,0 +1,81 @@
+"""
+Inbox and unread counters kept by the conversations triggers
+"""
+import pytest
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def send(client):
+    def post(headers: dict, recipient_id: int, recipient_type: str, content: str) -> dict:
+        response = client.post("/api/messages", headers=headers, json={
+            "recipient_id": recipient_id, "recipient_type": recipient_type, "content": content
+        })
+        assert response.status_code == 200, response.text
+        return response.json()
+    return post
+
+
+@pytest.fixture
+def inbox(client):
+    def get(headers: dict, **params) -> dict:
+        response = client.get("/api/messages/inbox", headers=headers, params=params)
+        assert response.status_code == 200, response.text
+        return {(row["other_party_type"], row["other_party_id"]): row for row in response.json()}
+    return get
+
+
+def test_a_sent_message_becomes_the_conversation_preview(auth_headers, new_client, send, inbox):
+    ada = new_client(auth_headers, first_name="Ada", last_name="Lovelace")["id"]
+    send(auth_headers, ada, "client", "First")
+    last = send(auth_headers, ada, "client", "x" * 200)
+
+    row = inbox(auth_headers)[("client", ada)]
+
+    assert (row["first_name"], row["last_name"]) == ("Ada", "Lovelace")
+    assert (row["last_message_id"], row["last_message_at"]) == (last["id"], last["created_at"])
+    assert row["last_message_preview"] == "x" * 140
+    assert row["last_sender_type"] == "therapist"
+    assert (row["unread_count"], row["other_party_unread"]) == (0, 2)
+
+
+def test_received_messages_count_as_unread_on_both_sides(
+        client, auth_headers, therapist_headers, therapist_id, send, inbox):
+    colleague = therapist_headers("user_2")
+    me, them = therapist_id(auth_headers), therapist_id(colleague)
+    first = send(colleague, me, "therapist", "Referral")
+    send(colleague, me, "therapist", "Follow-up")
+
+    assert inbox(auth_headers)[("therapist", them)]["unread_count"] == 2
+    assert inbox(colleague)[("therapist", me)]["other_party_unread"] == 2
+    assert client.get("/api/messages/unread-count", headers=auth_headers).json() == {"unread_count": 2}
+
+    client.patch(f"/api/messages/{first['id']}/read", headers=auth_headers)
+
+    assert inbox(auth_headers)[("therapist", them)]["unread_count"] == 1
+    assert inbox(colleague)[("therapist", me)]["other_party_unread"] == 1
+    assert client.get("/api/messages/unread-count", headers=auth_headers).json() == {"unread_count": 1}
+
+
+def test_inbox_is_most_recent_first_and_paged(client, auth_headers, new_client, send):
+    ids = [new_client(auth_headers)["id"] for _ in range(3)]
+    for client_id in (ids[1], ids[0], ids[2], ids[1]):
+        send(auth_headers, client_id, "client", "Hello")
+
+    seen, cursor = [], None
+    while True:
+        response = client.get("/api/messages/inbox", headers=auth_headers,
+                              params={"limit": 2, **({"cursor": cursor} if cursor else {})})
+        seen.append([row["other_party_id"] for row in response.json()])
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == [[ids[1], ids[2]], [ids[0]]]
+
+
+def test_inbox_is_scoped_to_the_therapist(auth_headers, therapist_headers, new_client, send, inbox):
+    send(auth_headers, new_client(auth_headers)["id"], "client", "Hello")
+
+    assert inbox(therapist_headers("user_2")) == {}
@@ -0,0 +1,137 @@
+"""Tests for json_patch.apply_json_patch and the merge patches applied in SQL"""
+import json
+import sqlite3
+
+import pytest
+
+from json_patch import JsonPatchError, JsonPatchTestFailed, apply_json_patch
+
+
+def test_add_with_dash_appends_to_array():
+    doc = {"transcript": {"segments": ["a", "b"]}}
+    patched = apply_json_patch(doc, [{"op": "add", "path": "/transcript/segments/-", "value": "c"}])
+    assert patched == {"transcript": {"segments": ["a", "b", "c"]}}
+    assert doc == {"transcript": {"segments": ["a", "b"]}}  # input left alone
+
+
+def test_dash_only_names_a_new_element():
+    doc = {"items": [1, 2]}
+    with pytest.raises(JsonPatchError):
+        apply_json_patch(doc, [{"op": "remove", "path": "/items/-"}])
+    with pytest.raises(JsonPatchError):
+        apply_json_patch(doc, [{"op": "replace", "path": "/items/-", "value": 3}])
+
+
+def test_add_inserts_before_index():
+    patched = apply_json_patch({"items": [1, 3]}, [{"op": "add", "path": "/items/1", "value": 2}])
+    assert patched == {"items": [1, 2, 3]}
+
+
+@pytest.mark.parametrize("index", ["01", "-1", "x", "3"])
+def test_invalid_array_index(index):
+    with pytest.raises(JsonPatchError):
+        apply_json_patch({"items": [1, 2]}, [{"op": "replace", "path": f"/items/{index}", "value": 0}])
+
+
+def test_pointer_escapes():
+    doc = {"a/b": 1, "m~n": 2, "~1": 3}
+    patched = apply_json_patch(doc, [
+        {"op": "replace", "path": "/a~1b", "value": 10},
+        {"op": "replace", "path": "/m~0n", "value": 20},
+        # ~01 is ~ followed by 1, not /
+        {"op": "replace", "path": "/~01", "value": 30},
+    ])
+    assert patched == {"a/b": 10, "m~n": 20, "~1": 30}
+
+
+def test_pointer_must_start_with_slash():
+    with pytest.raises(JsonPatchError):
+        apply_json_patch({"a": 1}, [{"op": "remove", "path": "a"}])
+
+
+def test_move_into_own_child_is_rejected():
+    doc = {"a": {"b": {}}}
+    with pytest.raises(JsonPatchError, match="children"):
+        apply_json_patch(doc, [{"op": "move", "from": "/a", "path": "/a/b/c"}])
+
+
+def test_move_to_sibling_with_common_prefix():
+    # /ab is not a child of /a
+    patched = apply_json_patch({"a": 1}, [{"op": "move", "from": "/a", "path": "/ab"}])
+    assert patched == {"ab": 1}
+
+
+def test_move_within_array():
+    patched = apply_json_patch({"items": [1, 2, 3]}, [{"op": "move", "from": "/items/0", "path": "/items/-"}])
+    assert patched == {"items": [2, 3, 1]}
+
+
+def test_copy_is_independent_of_source():
+    patched = apply_json_patch({"a": {"x": 1}}, [
+        {"op": "copy", "from": "/a", "path": "/b"},
+        {"op": "replace", "path": "/b/x", "value": 2},
+    ])
+    assert patched == {"a": {"x": 1}, "b": {"x": 2}}
+
+
+def test_test_passes_and_fails():
+    doc = {"status": "draft"}
+    assert apply_json_patch(doc, [{"op": "test", "path": "/status", "value": "draft"}]) == doc
+    with pytest.raises(JsonPatchTestFailed):
+        apply_json_patch(doc, [{"op": "test", "path": "/status", "value": "final"}])
+
+
+def test_test_on_missing_path_is_an_error_not_a_mismatch():
+    with pytest.raises(JsonPatchError) as raised:
+        apply_json_patch({"a": 1}, [{"op": "test", "path": "/b", "value": None}])
+    assert not isinstance(raised.value, JsonPatchTestFailed)
+
+
+def test_failed_operation_discards_earlier_ones():
+    doc = {"a": 1}
+    with pytest.raises(JsonPatchTestFailed):
+        apply_json_patch(doc, [
+            {"op": "replace", "path": "/a", "value": 2},
+            {"op": "test", "path": "/a", "value": 1},
+        ])
+    assert doc == {"a": 1}
+
+
+def test_replace_missing_path_is_an_error():
+    with pytest.raises(JsonPatchError):
+        apply_json_patch({}, [{"op": "replace", "path": "/a", "value": 1}])
+
+
+def test_replace_whole_document():
+    assert apply_json_patch({"a": 1}, [{"op": "replace", "path": "", "value": [1]}]) == [1]
+
+
+@pytest.mark.parametrize("operations", [
+    {"op": "add", "path": "/a", "value": 1},
+    [{"path": "/a"}],
+    [{"op": "add", "path": "/a"}],
+    [{"op": "move", "path": "/a"}],
+    [{"op": "frobnicate", "path": "/a"}],
+])
+def test_malformed_patch(operations):
+    with pytest.raises(JsonPatchError):
+        apply_json_patch({"a": 1}, operations)
+
+
+def merge_patch(target, patch):
+    """The merge patch as PATCH /api/sessions/{id}/ai-data applies it, with SQLite's json_patch()"""
+    conn = sqlite3.connect(":memory:")
+    try:
+        return json.loads(conn.execute("SELECT json_patch(?, ?)", (json.dumps(target), json.dumps(patch))).fetchone()[0])
+    finally:
+        conn.close()
+
+
+def test_merge_patch_merges_objects_and_removes_nulls():
+    target = {"transcript": "t", "analysis": {"mood": "low", "themes": ["work"]}}
+    patch = {"transcript": None, "analysis": {"mood": "better"}, "draft": True}
+    assert merge_patch(target, patch) == {"analysis": {"mood": "better", "themes": ["work"]}, "draft": True}
+
+
+def test_merge_patch_replaces_arrays_whole():
+    assert merge_patch({"themes": ["a", "b"]}, {"themes": ["c"]}) == {"themes": ["c"]}
@@ -0,0 +1,203 @@
+"""
+JWKS key management against a stand-in JWKS endpoint
+
+A local HTTP server publishes the key set, so fetching, rotation, the
+refetch rate limit and endpoint failures run through requests as they
+would against Clerk.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+import pytest
+import requests
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+import jwks
+from jwks import JWKSManager
+
+pytestmark = pytest.mark.auth
+
+
+class StandInJWKS:
+    """JWKS endpoint serving whatever keys (or error status) a test sets"""
+
+    def __init__(self):
+        self.keys = []
+        self.status = 200
+        self.fetches = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stand_in.fetches += 1
+                body = json.dumps({"keys": stand_in.keys}).encode()
+                self.send_response(stand_in.status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/.well-known/jwks.json"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def publish(self, *jwks_):
+        self.keys = list(jwks_)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def endpoint():
+    stand_in = StandInJWKS()
+    yield stand_in
+    stand_in.close()
+
+
+@pytest.fixture(scope="module")
+def rotated_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def jwk_for(private_key, kid: str) -> dict:
+    return {**json.loads(RSAAlgorithm.to_jwk(private_key.public_key())), "kid": kid}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Monotonic time the manager sees, advanced by hand"""
+    now = [1000.0]
+    monkeypatch.setattr(jwks.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_refresh_loads_the_published_rsa_keys(endpoint, public_jwk):
+    endpoint.publish(public_jwk, {"kid": "ec-key", "kty": "EC"}, {"kty": "RSA"})
+    manager = JWKSManager(url=lambda: endpoint.url)
+
+    manager.refresh()
+
+    assert manager.get_key("test-key") is not None
+    assert manager.get_key("ec-key") is None
+    assert endpoint.fetches == 1
+
+
+def test_background_refresh_picks_up_a_rotation(endpoint, public_jwk, rotated_key):
+    endpoint.publish(public_jwk)
+    # A refetch on demand would also find the key; only the refresher may
+    manager = JWKSManager(url=lambda: endpoint.url, refresh_interval=0.05, min_refetch_interval=3600)
+    manager.start()
+    try:
+        endpoint.publish(jwk_for(rotated_key, "rotated"))
+        deadline = time.monotonic() + 5
+        while manager.get_key("rotated") is None and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        manager.stop()
+
+    assert manager.get_key("rotated") is not None
+    # Replaced wholesale: a key Clerk stopped publishing is gone
+    assert manager.get_key("test-key") is None
+
+
+def test_unknown_kid_refetches_and_finds_a_rotated_key(endpoint, public_jwk, rotated_key, clock):
+    endpoint.publish(public_jwk)
+    manager = JWKSManager(url=lambda: endpoint.url)
+    manager.refresh()
+    endpoint.publish(public_jwk, jwk_for(rotated_key, "rotated"))
+
+    clock[0] += 30
+    assert manager.get_key("rotated") is not None
+    assert endpoint.fetches == 2
+
+
+def test_unknown_kids_refetch_at_most_once_per_30_seconds(endpoint, public_jwk, clock):
+    endpoint.publish(public_jwk)
+    manager = JWKSManager(url=lambda: endpoint.url)
+    assert manager.min_refetch_interval == 30
+    manager.refresh()
+
+    for kid in ("forged-1", "forged-2", "forged-3"):
+        assert manager.get_key(kid) is None
+    assert endpoint.fetches == 1
+
+    clock[0] += 29.9
+    assert manager.get_key("forged-4") is None
+    assert endpoint.fetches == 1
+
+    clock[0] += 0.1
+    assert manager.get_key("forged-5") is None
+    assert manager.get_key("forged-6") is None
+    assert endpoint.fetches == 2
+
+
+def test_failing_endpoint_keeps_the_previous_keys(endpoint, public_jwk, clock):
+    endpoint.publish(public_jwk)
+    manager = JWKSManager(url=lambda: endpoint.url)
+    manager.refresh()
+
+    endpoint.status = 500
+    with pytest.raises(requests.HTTPError):
+        manager.refresh()
+
+    assert manager.get_key("test-key") is not None
+    # The failed attempt still counts against the refetch interval
+    clock[0] += 10
+    assert manager.get_key("unknown") is None
+    assert endpoint.fetches == 2
+
+
+def test_app_accepts_a_token_signed_with_a_rotated_key(
+        client, endpoint, monkeypatch, rotated_key):
+    from jwks import jwks_manager
+
+    endpoint.publish(jwk_for(rotated_key, "rotated"))
+    monkeypatch.setenv("CLERK_JWKS_URL", endpoint.url)
+    monkeypatch.setattr(jwks_manager, "min_refetch_interval", 0)
+    now = int(time.time())
+    token = jwt.encode({"sub": "user_1", "iat": now, "exp": now + 3600}, rotated_key,
+                       algorithm="RS256", headers={"kid": "rotated"})
+
+    response = client.post("/api/auth/sync", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert endpoint.fetches == 1
+
+
+def test_app_rejects_an_unknown_kid(client, endpoint, monkeypatch, make_token, public_jwk):
+    from jwks import jwks_manager
+
+    endpoint.publish(public_jwk)
+    monkeypatch.setenv("CLERK_JWKS_URL", endpoint.url)
+    monkeypatch.setattr(jwks_manager, "min_refetch_interval", 0)
+
+    response = client.post("/api/auth/sync", headers={"Authorization": f"Bearer {make_token('user_1', kid='nope')}"})
+
+    assert response.status_code == 401
+    assert endpoint.fetches == 1
+
+
+def test_app_keeps_verifying_known_keys_while_the_endpoint_fails(
+        client, endpoint, monkeypatch, make_token, auth_headers):
+    from jwks import jwks_manager
+
+    endpoint.status = 503
+    monkeypatch.setenv("CLERK_JWKS_URL", endpoint.url)
+    monkeypatch.setattr(jwks_manager, "min_refetch_interval", 0)
+
+    unknown = client.post("/api/auth/sync", headers={"Authorization": f"Bearer {make_token('user_2', kid='nope')}"})
+    known = client.post("/api/auth/sync", headers=auth_headers)
+
+    assert unknown.status_code == 401
+    assert endpoint.fetches == 1
+    assert known.status_code == 200
@@ -0,0 +1,95 @@
+"""
+Marking a whole thread read up to a message id
+"""
+import pytest
+
+from database import shard_for_therapist
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def received(client, auth_headers, therapist_headers, therapist_id):
+    """
+    Three messages from a colleague and one reply; returns the colleague and
+    the ids of the received messages as the recipient sees them (on another
+    shard they are not the ids the sender got back)
+    """
+    colleague = therapist_headers("user_2")
+    me, them = therapist_id(auth_headers), therapist_id(colleague)
+    for content in ("m0", "m1", "m2"):
+        client.post("/api/messages", headers=colleague, json={
+            "recipient_id": me, "recipient_type": "therapist", "content": content
+        })
+    client.post("/api/messages", headers=auth_headers, json={
+        "recipient_id": them, "recipient_type": "therapist", "content": "reply"
+    })
+    thread = client.get(f"/api/messages/thread/{them}?other_party_type=therapist", headers=auth_headers).json()
+    return colleague, them, [message["id"] for message in thread if message["sender_id"] == them]
+
+
+def mark_read(client, headers, other_party_id, up_to_id):
+    return client.post(f"/api/messages/thread/{other_party_id}/read", headers=headers,
+                       params={"up_to_id": up_to_id, "other_party_type": "therapist"})
+
+
+def read_flags(client, headers, other_party_id):
+    messages = client.get(f"/api/messages/thread/{other_party_id}?other_party_type=therapist", headers=headers).json()
+    return {message["content"]: message["read"] for message in messages}
+
+
+def test_marks_received_messages_up_to_the_id(client, auth_headers, received):
+    colleague, them, ids = received
+
+    response = mark_read(client, auth_headers, them, ids[1])
+
+    assert response.status_code == 200
+    assert response.json() == {"marked_read": 2, "unread_count": 1}
+    assert read_flags(client, auth_headers, them) == {"m0": True, "m1": True, "m2": False, "reply": False}
+    assert client.get("/api/messages/unread-count", headers=auth_headers).json() == {"unread_count": 1}
+
+
+def test_counters_follow_on_both_sides(client, auth_headers, received):
+    colleague, them, ids = received
+
+    mark_read(client, auth_headers, them, ids[2])
+
+    mine = client.get("/api/messages/inbox", headers=auth_headers).json()[0]
+    theirs = client.get("/api/messages/inbox", headers=colleague).json()[0]
+    assert (mine["unread_count"], mine["other_party_unread"]) == (0, 1)
+    assert (theirs["unread_count"], theirs["other_party_unread"]) == (1, 0)
+
+
+def test_marking_again_changes_nothing(client, auth_headers, received):
+    _, them, ids = received
+    mark_read(client, auth_headers, them, ids[2])
+
+    assert mark_read(client, auth_headers, them, ids[2]).json() == {"marked_read": 0, "unread_count": 0}
+
+
+def test_other_threads_stay_unread(client, auth_headers, therapist_headers, therapist_id, received):
+    _, them, ids = received
+    client.post("/api/messages", headers=therapist_headers("user_3"), json={
+        "recipient_id": therapist_id(auth_headers), "recipient_type": "therapist", "content": "elsewhere"
+    })
+
+    assert mark_read(client, auth_headers, them, ids[2]).json() == {"marked_read": 3, "unread_count": 1}
+
+
+def test_up_to_id_is_required(client, auth_headers, received):
+    _, them, _ = received
+
+    assert client.post(f"/api/messages/thread/{them}/read", headers=auth_headers).status_code == 422
+    assert mark_read(client, auth_headers, them, 0).status_code == 422
+
+
+@pytest.mark.parametrize("shard_count", [2])
+def test_senders_copies_on_another_shard_are_marked_read(client, auth_headers, therapist_id, received):
+    colleague, them, ids = received
+    assert shard_for_therapist(therapist_id(auth_headers)) != shard_for_therapist(them)
+
+    mark_read(client, auth_headers, them, ids[1])
+
+    me = therapist_id(auth_headers)
+    assert read_flags(client, colleague, me) == {"m0": True, "m1": True, "m2": False, "reply": False}
+    assert client.get("/api/messages/inbox", headers=colleague).json()[0]["other_party_unread"] == 1
@@ -0,0 +1,140 @@
+"""
+Server-sent message events: the stream body and the hub behind it
+
+The stream never ends on its own, so the body generator is driven directly
+on an event loop while messages are sent through the app from a thread.
+"""
+import asyncio
+import json
+
+import pytest
+
+import communication_routes
+import message_hub
+from communication_routes import message_events
+from message_hub import hub
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def setup(client, auth_headers, therapist_id, new_client):
+    """The therapist's id, two clients and a send(client_id, text) helper returning the new id"""
+    def send(client_id: int, content: str) -> int:
+        response = client.post("/api/messages", headers=auth_headers, json={
+            "recipient_id": client_id, "recipient_type": "client", "content": content
+        })
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return therapist_id(auth_headers), new_client(auth_headers)["id"], new_client(auth_headers)["id"], send
+
+
+def parse(chunk: str) -> dict:
+    fields = dict(line.split(": ", 1) for line in chunk.strip().splitlines() if not line.startswith(":"))
+    return {"id": int(fields["id"]), "event": fields["event"], "data": json.loads(fields["data"])}
+
+
+def run(coroutine):
+    return asyncio.run(asyncio.wait_for(coroutine, 10))
+
+
+def test_new_messages_are_pushed_to_the_stream(setup):
+    therapist, ada, _, send = setup
+
+    async def scenario():
+        events = message_events(therapist, None, None, "client")
+        assert await events.__anext__() == f"retry: {communication_routes.STREAM_RETRY_MS}\n\n"
+        sent = await asyncio.to_thread(send, ada, "Hello")
+        event = parse(await events.__anext__())
+        await events.aclose()
+        return sent, event
+
+    sent, event = run(scenario())
+
+    assert (event["id"], event["event"], event["data"]["content"]) == (sent, "message", "Hello")
+    assert hub.subscriber_count() == 0
+
+
+def test_reconnect_replays_what_was_missed(setup):
+    therapist, ada, _, send = setup
+    ids = [send(ada, f"m{index}") for index in range(3)]
+
+    async def scenario():
+        events = message_events(therapist, ids[0], None, "client")
+        await events.__anext__()
+        replayed = [parse(await events.__anext__()) for _ in range(2)]
+        await events.aclose()
+        return replayed
+
+    assert [(event["id"], event["data"]["content"]) for event in run(scenario())] == [(ids[1], "m1"), (ids[2], "m2")]
+
+
+def test_a_long_gap_asks_for_a_resync(setup, monkeypatch):
+    therapist, ada, _, send = setup
+    monkeypatch.setattr(communication_routes, "STREAM_REPLAY_LIMIT", 1)
+    first = send(ada, "m0")
+    send(ada, "m1")
+    send(ada, "m2")
+
+    async def scenario():
+        events = message_events(therapist, first, None, "client")
+        await events.__anext__()
+        chunk = await events.__anext__()
+        await events.aclose()
+        return chunk
+
+    assert run(scenario()) == "event: resync\ndata: {}\n\n"
+
+
+def test_a_thread_stream_only_gets_that_thread(setup):
+    therapist, ada, bo, send = setup
+
+    async def scenario():
+        events = message_events(therapist, None, ada, "client")
+        await events.__anext__()
+        await asyncio.to_thread(send, bo, "For Bo")
+        await asyncio.to_thread(send, ada, "For Ada")
+        event = parse(await events.__anext__())
+        await events.aclose()
+        return event
+
+    assert run(scenario())["data"]["content"] == "For Ada"
+
+
+def test_an_idle_stream_sends_heartbeats(setup, monkeypatch):
+    therapist, *_ = setup
+    monkeypatch.setattr(communication_routes, "STREAM_HEARTBEAT_SECONDS", 0.05)
+
+    async def scenario():
+        events = message_events(therapist, None, None, "client")
+        await events.__anext__()
+        chunk = await events.__anext__()
+        await events.aclose()
+        return chunk
+
+    assert run(scenario()) == ": heartbeat\n\n"
+
+
+def test_a_stream_that_falls_behind_is_closed(setup, monkeypatch):
+    therapist, ada, _, send = setup
+    monkeypatch.setattr(message_hub, "MAX_QUEUED_EVENTS", 2)
+
+    async def scenario():
+        events = message_events(therapist, None, None, "client")
+        await events.__anext__()
+        for index in range(3):
+            # Sent without the stream reading in between
+            await asyncio.to_thread(send, ada, f"m{index}")
+        await asyncio.sleep(0.05)
+        return [chunk async for chunk in events]
+
+    chunks = run(scenario())
+
+    assert [parse(chunk)["data"]["content"] for chunk in chunks] == ["m0", "m1"]
+    assert hub.subscriber_count() == 0
+
+
+def test_invalid_last_event_id_is_a_400(client, auth_headers):
+    response = client.get("/api/messages/stream", headers={**auth_headers, "Last-Event-ID": "abc"})
+
+    assert response.status_code == 400
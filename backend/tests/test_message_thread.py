@@ -0,0 +1,81 @@
+"""
+Message threads paged with after_id/before_id cursors
+"""
+import pytest
+
+from pagination import MAX_PAGE_SIZE
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def thread(client, auth_headers, therapist_headers, therapist_id):
+    """Five messages between two therapists, alternating sender; returns the ids, oldest first"""
+    colleague = therapist_headers("user_2")
+    me, them = therapist_id(auth_headers), therapist_id(colleague)
+    ids = []
+    for index in range(5):
+        headers, recipient = (auth_headers, them) if index % 2 == 0 else (colleague, me)
+        response = client.post("/api/messages", headers=headers, json={
+            "recipient_id": recipient, "recipient_type": "therapist", "content": f"m{index}"
+        })
+        ids.append(response.json()["id"])
+    return them, ids
+
+
+@pytest.fixture
+def page(client, auth_headers, thread):
+    def get(**params):
+        response = client.get(f"/api/messages/thread/{thread[0]}", headers=auth_headers,
+                              params={"other_party_type": "therapist", **params})
+        assert response.status_code == 200, response.text
+        return [message["id"] for message in response.json()], response.headers["X-Has-More"]
+    return get
+
+
+def test_thread_has_both_directions_oldest_first(page, thread):
+    assert page() == (thread[1], "false")
+
+
+def test_default_page_is_the_latest_messages(page, thread):
+    ids = thread[1]
+
+    assert page(limit=2) == (ids[3:], "true")
+    assert page(limit=5) == (ids, "false")
+
+
+def test_before_id_pages_back_through_history(page, thread):
+    ids = thread[1]
+
+    assert page(before_id=ids[3], limit=2) == (ids[1:3], "true")
+    assert page(before_id=ids[1], limit=2) == (ids[:1], "false")
+
+
+def test_after_id_catches_up_from_the_oldest(page, thread):
+    ids = thread[1]
+
+    assert page(after_id=ids[0], limit=2) == (ids[1:3], "true")
+    assert page(after_id=ids[2], limit=2) == (ids[3:], "false")
+    assert page(after_id=ids[4]) == ([], "false")
+
+
+def test_both_cursors_bound_the_range(page, thread):
+    ids = thread[1]
+
+    assert page(after_id=ids[0], before_id=ids[4]) == (ids[1:4], "false")
+
+
+def test_other_threads_are_not_included(client, auth_headers, new_client, page, thread):
+    client.post("/api/messages", headers=auth_headers, json={
+        "recipient_id": new_client(auth_headers)["id"], "recipient_type": "client", "content": "elsewhere"
+    })
+
+    assert page() == (thread[1], "false")
+
+
+@pytest.mark.parametrize("params", [{"limit": 0}, {"limit": MAX_PAGE_SIZE + 1}, {"before_id": 0}, {"after_id": -1}])
+def test_out_of_range_paging_is_a_422(client, auth_headers, thread, params):
+    response = client.get(f"/api/messages/thread/{thread[0]}", headers=auth_headers,
+                          params={"other_party_type": "therapist", **params})
+
+    assert response.status_code == 422
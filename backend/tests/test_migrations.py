@@ -0,0 +1,123 @@
+"""
+Versioned, checksummed schema migrations
+"""
+import sqlite3
+import threading
+
+import pytest
+
+import migrations
+from migrations import discover_migrations, run_migrations
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def migrations_dir(tmp_path, monkeypatch):
+    """An empty migrations directory the engine reads instead of the real one"""
+    directory = tmp_path / "migrations"
+    directory.mkdir()
+    monkeypatch.setattr(migrations, "MIGRATIONS_DIR", directory)
+
+    def write(filename: str, body: str):
+        (directory / filename).write_text(f"def upgrade(conn):\n    {body}\n")
+    return write
+
+
+@pytest.fixture
+def db(tmp_path):
+    return str(tmp_path / "app.db")
+
+
+def query(database: str, sql: str):
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_pending_migrations_apply_in_version_order(migrations_dir, db):
+    migrations_dir("0002_add_column.py", 'conn.execute("ALTER TABLE items ADD COLUMN name TEXT")')
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")')
+    migrations_dir("notes.txt", "")
+
+    applied = run_migrations(db)
+
+    assert [m.version for m in applied] == [1, 2]
+    assert query(db, "SELECT version, name FROM schema_migrations ORDER BY version") == [
+        (1, "create"), (2, "add_column")
+    ]
+    assert query(db, "PRAGMA user_version") == [(2,)]
+    assert [row[1] for row in query(db, "PRAGMA table_info(items)")] == ["id", "name"]
+
+
+def test_an_up_to_date_database_applies_nothing(migrations_dir, db):
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")')
+    run_migrations(db)
+
+    assert run_migrations(db) == []
+
+    migrations_dir("0002_more.py", 'conn.execute("CREATE TABLE more (id INTEGER PRIMARY KEY)")')
+    assert [m.version for m in run_migrations(db)] == [2]
+
+
+def test_a_failing_migration_leaves_the_database_untouched(migrations_dir, db):
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")')
+    migrations_dir("0002_broken.py", 'conn.execute("ALTER TABLE missing ADD COLUMN x TEXT")')
+
+    with pytest.raises(sqlite3.OperationalError):
+        run_migrations(db)
+
+    assert query(db, "SELECT name FROM sqlite_master WHERE name IN ('items', 'schema_migrations')") == []
+    assert query(db, "PRAGMA user_version") == [(0,)]
+
+
+def test_a_migration_edited_after_it_was_applied_is_refused(migrations_dir, db):
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")')
+    run_migrations(db)
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, x TEXT)")')
+    migrations_dir("0002_more.py", 'conn.execute("CREATE TABLE more (id INTEGER PRIMARY KEY)")')
+
+    with pytest.raises(RuntimeError, match="modified after being applied"):
+        run_migrations(db)
+
+
+def test_an_applied_migration_missing_from_disk_is_refused(migrations_dir, db, tmp_path):
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")')
+    migrations_dir("0002_more.py", 'conn.execute("CREATE TABLE more (id INTEGER PRIMARY KEY)")')
+    run_migrations(db)
+    (tmp_path / "migrations" / "0002_more.py").unlink()
+    migrations_dir("0003_other.py", 'conn.execute("CREATE TABLE other (id INTEGER PRIMARY KEY)")')
+    # The files now end at 0003 while the database records 0002
+    with pytest.raises(RuntimeError, match="not on disk"):
+        run_migrations(db)
+
+
+def test_duplicate_versions_are_refused(migrations_dir):
+    migrations_dir("0001_one.py", "pass")
+    migrations_dir("0001_two.py", "pass")
+
+    with pytest.raises(RuntimeError, match="Duplicate"):
+        discover_migrations()
+
+
+def test_concurrent_workers_apply_each_migration_once(migrations_dir, db):
+    migrations_dir("0001_create.py", 'conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY)")')
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(run_migrations(db))) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert sorted(len(applied) for applied in results) == [0, 0, 0, 1]
+    assert query(db, "SELECT COUNT(*) FROM schema_migrations") == [(1,)]
+
+
+def test_the_shipped_migrations_build_a_fresh_database(db):
+    shipped = discover_migrations()
+
+    assert [m.version for m in run_migrations(db)] == [m.version for m in shipped]
+    assert query(db, "PRAGMA user_version") == [(shipped[-1].version,)]
+    assert run_migrations(db) == []
@@ -0,0 +1,94 @@
+"""
+Keyset pagination of /api/clients and /api/sessions
+"""
+import base64
+
+import pytest
+
+from pagination import MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, encode_cursor
+
+pytestmark = pytest.mark.integration
+
+
+def walk(client, headers, path: str, limit: int) -> list:
+    """Every page of a list, following X-Next-Cursor; returns the pages"""
+    pages = []
+    separator = "&" if "?" in path else "?"
+    response = client.get(f"{path}{separator}limit={limit}", headers=headers)
+    while True:
+        assert response.status_code == 200, response.text
+        pages.append(response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return pages
+        response = client.get(f"{path}{separator}limit={limit}&cursor={cursor}", headers=headers)
+
+
+def test_clients_page_by_name_then_id(client, auth_headers, new_client):
+    for first, last in (("Cleo", "Baker"), ("Ada", "Baker"), ("Ada", "Baker"), ("Zoe", "Adams"), ("Bo", "Cole")):
+        new_client(auth_headers, first_name=first, last_name=last)
+
+    pages = walk(client, auth_headers, "/api/clients", 2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    rows = [row for page in pages for row in page]
+    assert [(row["last_name"], row["first_name"]) for row in rows] == [
+        ("Adams", "Zoe"), ("Baker", "Ada"), ("Baker", "Ada"), ("Baker", "Cleo"), ("Cole", "Bo")
+    ]
+    # Equal names are split across pages by id, without repeats
+    assert rows[1]["id"] < rows[2]["id"]
+
+
+def test_clients_status_filter_pages_through_its_own_rows(client, auth_headers, new_client):
+    for index in range(5):
+        new_client(auth_headers, last_name=f"Client{index}", status="active" if index % 2 else "inactive")
+
+    for status, expected in (("active", ["Client1", "Client3"]), ("inactive", ["Client0", "Client2", "Client4"])):
+        pages = walk(client, auth_headers, f"/api/clients?status={status}", 1)
+        assert [row["last_name"] for page in pages for row in page] == expected
+
+
+def test_a_row_added_before_the_cursor_does_not_shift_later_pages(client, auth_headers, new_client):
+    for name in ("B", "C", "D"):
+        new_client(auth_headers, last_name=name)
+    first = client.get("/api/clients?limit=2", headers=auth_headers)
+
+    new_client(auth_headers, last_name="A")
+    second = client.get(f"/api/clients?limit=2&cursor={first.headers[NEXT_CURSOR_HEADER]}", headers=auth_headers)
+
+    assert [row["last_name"] for row in second.json()] == ["D"]
+
+
+def test_sessions_page_newest_first_and_by_client(client, auth_headers, new_client, new_session):
+    ada, bo = new_client(auth_headers)["id"], new_client(auth_headers)["id"]
+    for day, time, client_id in (("2024-01-02", "09:00", ada), ("2024-01-02", "10:00", bo),
+                                 ("2024-01-01", "10:00", ada), ("2024-01-03", "08:00", ada)):
+        new_session(auth_headers, client_id, session_date=day, session_time=time)
+
+    rows = [row for page in walk(client, auth_headers, "/api/sessions", 3) for row in page]
+    assert [(row["session_date"], row["session_time"]) for row in rows] == [
+        ("2024-01-03", "08:00"), ("2024-01-02", "10:00"), ("2024-01-02", "09:00"), ("2024-01-01", "10:00")
+    ]
+
+    pages = walk(client, auth_headers, f"/api/sessions?client_id={ada}", 1)
+    assert [row["session_date"] for page in pages for row in page] == ["2024-01-03", "2024-01-02", "2024-01-01"]
+
+
+def test_other_therapists_rows_never_appear(client, auth_headers, therapist_headers, new_client):
+    new_client(auth_headers, last_name="Mine")
+    new_client(therapist_headers("user_2"), last_name="Theirs")
+
+    assert [row["last_name"] for row in client.get("/api/clients", headers=auth_headers).json()] == ["Mine"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-base64!", encode_cursor(["only one key"]), base64.urlsafe_b64encode(b'{"a": 1}').decode()
+])
+def test_malformed_cursor_is_a_400(client, auth_headers, cursor):
+    assert client.get(f"/api/clients?cursor={cursor}", headers=auth_headers).status_code == 400
+    assert client.get(f"/api/sessions?cursor={cursor}", headers=auth_headers).status_code == 400
+
+
+@pytest.mark.parametrize("limit", [0, MAX_PAGE_SIZE + 1])
+def test_limit_out_of_bounds_is_rejected(client, auth_headers, limit):
+    assert client.get(f"/api/clients?limit={limit}", headers=auth_headers).status_code == 422
@@ -0,0 +1,60 @@
+"""
+Every route query is served by an index
+
+The checks of check_query_plans.py, on a freshly migrated database: the
+SQL literals in the route modules, and every statement the routes ran
+while serving a tour of the endpoints. Run the script itself with
+--seed-sessions to see the queries timed on a filled database.
+"""
+import pytest
+
+import check_query_plans as plans
+from database import DATABASE_URL, open_connection
+from migrations import run_migrations
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def scratch(tmp_path, monkeypatch):
+    """Connection to a migrated database in the working directory the app will use"""
+    import auth
+
+    monkeypatch.chdir(tmp_path)
+    auth.therapist_cache.clear()
+    auth.verified_tokens.clear()
+    run_migrations(DATABASE_URL)
+    conn = open_connection(DATABASE_URL)  # registers the SQL functions routes use
+    yield conn
+    conn.close()
+
+
+def scanning(conn, statements) -> list:
+    """(where, sql, scans) for each statement whose plan scans a large table"""
+    found = []
+    for where, sql, params in statements:
+        scans = plans.plan_scans(conn, sql, params)
+        if scans:
+            found.append((where, sql, scans))
+    return found
+
+
+@pytest.mark.parametrize("module", plans.ROUTE_MODULES)
+def test_literal_statements_use_indexes(scratch, module):
+    statements = [
+        (f"{module}:{lineno}", sql, [1] * sql.count("?"))
+        for lineno, sql in plans.collect_statements(plans.BACKEND_DIR / module)
+    ]
+    assert scanning(scratch, statements) == []
+
+
+def test_statements_run_by_the_routes_use_indexes(scratch):
+    trace, failures = plans.trace_routes()
+
+    assert failures == []
+    statements = [
+        (f"{module}:{lineno}", sql, [])
+        for (module, lineno, _), sql in sorted(trace.statements.items())
+    ]
+    assert len(statements) > 100
+    assert scanning(scratch, statements) == []
@@ -0,0 +1,123 @@
+"""
+Full-text search over session text: /api/search and the triggers keeping
+the session_search index current
+"""
+import json
+import sqlite3
+
+import pytest
+
+from database import DATABASE_URL
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def sessions(auth_headers, new_client, new_session):
+    client_id = new_client(auth_headers, first_name="Ada", last_name="Lovelace")["id"]
+    first = new_session(
+        auth_headers, client_id, session_date="2024-03-01",
+        session_summary="Discussed insomnia and work stress", notes="Client reports sleeping badly",
+        ai_assisted_data=json.dumps({"transcript": "Client: the panic attacks are rarer"})
+    )
+    second = new_session(
+        auth_headers, client_id, session_date="2024-03-08",
+        clinical_observations="Flat affect, panic mentioned once", ai_assisted_data="not json"
+    )
+    return first["id"], second["id"]
+
+
+@pytest.fixture
+def search(client, auth_headers):
+    def hits(q: str, headers=None):
+        response = client.get("/api/search", params={"q": q}, headers=headers or auth_headers)
+        assert response.status_code == 200, response.text
+        return [(hit["session_id"], hit["field"]) for hit in response.json()]
+    return hits
+
+
+def test_every_indexed_field_is_searched(search, sessions):
+    first, second = sessions
+
+    assert search("insomnia") == [(first, "session_summary")]
+    assert search("badly") == [(first, "notes")]
+    assert search("affect") == [(second, "clinical_observations")]
+    assert search("attacks") == [(first, "transcript")]
+
+
+def test_hits_carry_the_client_and_a_highlighted_snippet(client, auth_headers, sessions):
+    hit = client.get("/api/search?q=insomnia", headers=auth_headers).json()[0]
+
+    assert (hit["first_name"], hit["last_name"], hit["session_date"]) == ("Ada", "Lovelace", "2024-03-01")
+    assert "<mark>insomnia</mark>" in hit["snippet"]
+
+
+def test_all_words_must_match_and_a_trailing_star_is_a_prefix(search, sessions):
+    first, _ = sessions
+
+    assert search("work insomnia") == [(first, "session_summary")]
+    assert search("work affect") == []
+    assert search("insom*") == [(first, "session_summary")]
+
+
+def test_a_clinical_observations_hit_outranks_a_transcript_hit(search, sessions):
+    first, second = sessions
+
+    assert [session_id for session_id, _ in search("panic")] == [second, first]
+
+
+def test_fts_operators_are_searched_as_text(search, sessions):
+    assert search('panic OR "x" NEAR( -') == []
+
+
+def test_query_without_words_is_a_400(client, auth_headers):
+    assert client.get("/api/search?q=!!!", headers=auth_headers).status_code == 400
+
+
+def test_the_index_follows_updates_autosaves_and_deletes(client, auth_headers, search, sessions):
+    first, second = sessions
+
+    client.put(f"/api/sessions/{first}", headers=auth_headers, json={"notes": "Now sleeping well"})
+    assert search("badly") == []
+    assert search("well") == [(first, "notes")]
+
+    client.put(f"/api/sessions/{first}", headers=auth_headers,
+               json={"ai_assisted_data": json.dumps({"transcript": "nightmares discussed"})})
+    assert search("nightmares") == [(first, "transcript")]
+    assert search("attacks") == []
+
+    client.patch(f"/api/sessions/{first}/ai-data", headers=auth_headers,
+                 json={"transcript": "calmer nights"})
+    assert search("calmer") == [(first, "transcript")]
+
+    client.delete(f"/api/sessions/{second}", headers=auth_headers)
+    assert search("affect") == []
+
+
+def test_an_autosave_that_keeps_the_transcript_keeps_its_digest(client, auth_headers, sessions):
+    first, _ = sessions
+
+    def digest():
+        client.get(f"/api/sessions/{first}", headers=auth_headers)  # lands queued autosaves
+        conn = sqlite3.connect(DATABASE_URL)
+        try:
+            return conn.execute(
+                "SELECT transcript_digest FROM session_content WHERE session_id = ?", (first,)
+            ).fetchone()[0]
+        finally:
+            conn.close()
+
+    before = digest()
+    assert before is not None
+    client.put(f"/api/sessions/{first}", headers=auth_headers, json={"ai_assisted_data": json.dumps(
+        {"transcript": "Client: the panic attacks are rarer", "emotions": ["calm"]}
+    )})
+    assert digest() == before
+
+    client.put(f"/api/sessions/{first}", headers=auth_headers,
+               json={"ai_assisted_data": json.dumps({"transcript": "new words"})})
+    assert digest() != before
+
+
+def test_search_is_scoped_to_the_therapist(search, therapist_headers, sessions):
+    assert search("panic", headers=therapist_headers("user_2")) == []
@@ -0,0 +1,100 @@
+"""
+Compressed, out-of-row storage of session text in session_content
+"""
+import json
+import sqlite3
+import zlib
+
+import pytest
+
+from database import DATABASE_URL
+from migrations import discover_migrations
+from session_content import CONTENT_FIELDS, save_session_content
+
+TRANSCRIPT = "Therapist: How was your week?\nClient: Better than the last one. " * 200
+
+
+def stored(session_id: int) -> dict:
+    conn = sqlite3.connect(DATABASE_URL)
+    conn.row_factory = sqlite3.Row
+    try:
+        session = conn.execute("SELECT * FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        content = conn.execute("SELECT * FROM session_content WHERE session_id = ?", (session_id,)).fetchone()
+        return {"session": dict(session) if session else None, "content": dict(content) if content else None}
+    finally:
+        conn.close()
+
+
+@pytest.mark.integration
+def test_session_text_is_stored_compressed_out_of_row(client, auth_headers, new_client, new_session):
+    ai_data = json.dumps({"transcript": TRANSCRIPT})
+    session = new_session(auth_headers, new_client(auth_headers)["id"],
+                          notes="Slept better", ai_assisted_data=ai_data, risk_assessment="None noted")
+
+    rows = stored(session["id"])
+
+    assert all(rows["session"][field] is None for field in CONTENT_FIELDS)
+    assert zlib.decompress(rows["content"]["notes"]).decode() == "Slept better"
+    assert zlib.decompress(rows["content"]["ai_assisted_data"]).decode() == ai_data
+    assert len(rows["content"]["ai_assisted_data"]) < len(ai_data) / 10
+
+    full = client.get(f"/api/sessions/{session['id']}", headers=auth_headers).json()
+    assert (full["notes"], full["ai_assisted_data"], full["risk_assessment"]) == (
+        "Slept better", ai_data, "None noted"
+    )
+
+
+@pytest.mark.integration
+def test_update_rewrites_only_the_fields_given(client, auth_headers, new_client, new_session):
+    session = new_session(auth_headers, new_client(auth_headers)["id"],
+                          notes="First draft", client_insights="Insight")
+
+    response = client.put(f"/api/sessions/{session['id']}", headers=auth_headers,
+                          json={"notes": "Second draft", "status": "completed"})
+
+    assert response.status_code == 200
+    assert (response.json()["notes"], response.json()["client_insights"]) == ("Second draft", "Insight")
+    full = client.get(f"/api/sessions/{session['id']}", headers=auth_headers).json()
+    assert (full["notes"], full["client_insights"]) == ("Second draft", "Insight")
+
+
+@pytest.mark.integration
+def test_deleting_a_session_deletes_its_content(client, auth_headers, new_client, new_session):
+    session = new_session(auth_headers, new_client(auth_headers)["id"], notes="To be removed")
+
+    assert client.delete(f"/api/sessions/{session['id']}", headers=auth_headers).status_code == 204
+
+    assert stored(session["id"]) == {"session": None, "content": None}
+
+
+@pytest.mark.unit
+def test_only_content_fields_can_be_saved():
+    conn = sqlite3.connect(":memory:")
+    with pytest.raises(ValueError, match="summary"):
+        save_session_content(conn, 1, {"notes": "ok", "summary": "lives in sessions"})
+
+
+@pytest.mark.unit
+def test_migration_moves_existing_text_into_session_content(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+    migrations = {m.version: m for m in discover_migrations()}
+    for version in range(1, 5):
+        migrations[version].upgrade(conn)
+    conn.execute("INSERT INTO clients (id, first_name, last_name, date_of_birth) VALUES (1, 'Ada', 'L', '1990-01-01')")
+    conn.execute(
+        "INSERT INTO sessions (id, client_id, session_date, duration_minutes, notes, ai_assisted_data)"
+        " VALUES (1, 1, '2024-01-01', 50, 'Legacy notes', ?)", (TRANSCRIPT,)
+    )
+    conn.execute("INSERT INTO sessions (id, client_id, session_date, duration_minutes) VALUES (2, 1, '2024-01-02', 50)")
+
+    migrations[5].upgrade(conn)
+
+    assert conn.execute("SELECT notes, ai_assisted_data FROM sessions WHERE id = 1").fetchone() == (None, None)
+    notes, ai_data = conn.execute(
+        "SELECT notes, ai_assisted_data FROM session_content WHERE session_id = 1"
+    ).fetchone()
+    assert zlib.decompress(notes).decode() == "Legacy notes"
+    assert zlib.decompress(ai_data).decode() == TRANSCRIPT
+    # Sessions without text get no content row
+    assert conn.execute("SELECT COUNT(*) FROM session_content").fetchone() == (1,)
+    conn.close()
@@ -0,0 +1,52 @@
+"""Sparse fieldsets (`fields=`) on the session list endpoints"""
+import pytest
+
+pytestmark = pytest.mark.integration
+
+
+def test_default_projection_leaves_out_clinical_text(client, auth_headers, new_client, new_session):
+    record = new_client(auth_headers)
+    new_session(auth_headers, record["id"], notes="private", risk_assessment="passive ideation")
+
+    session = client.get(f"/api/sessions?client_id={record['id']}", headers=auth_headers).json()[0]
+    assert {"id", "session_date", "status"} <= set(session)
+    assert not {"notes", "risk_assessment", "ai_assisted_data"} & set(session)
+
+
+def test_fields_picks_columns_and_keeps_the_key(client, auth_headers, new_client, new_session):
+    record = new_client(auth_headers)
+    new_session(auth_headers, record["id"], notes="private")
+
+    session = client.get("/api/sessions?fields=status,notes", headers=auth_headers).json()[0]
+    assert set(session) == {"id", "session_date", "session_time", "status", "notes"}
+    assert session["notes"] == "private"
+
+
+def test_unknown_field_is_rejected(client, auth_headers):
+    response = client.get("/api/sessions?fields=status,password", headers=auth_headers)
+    assert response.status_code == 400
+    assert "password" in response.json()["detail"]
+
+
+@pytest.mark.parametrize("risk, flagged", [("passive ideation", True), ("", False), (None, False)])
+def test_has_risk_flags_a_risk_assessment_without_sending_it(client, auth_headers, new_client, new_session,
+                                                             risk, flagged):
+    record = new_client(auth_headers)
+    fields = {} if risk is None else {"risk_assessment": risk}
+    new_session(auth_headers, record["id"], **fields)
+
+    session = client.get(f"/api/sessions?client_id={record['id']}&fields=status,has_risk",
+                         headers=auth_headers).json()[0]
+    assert session["has_risk"] is flagged
+    assert "risk_assessment" not in session
+
+
+def test_today_accepts_fields(client, auth_headers, new_client, new_session):
+    from datetime import date
+    record = new_client(auth_headers)
+    new_session(auth_headers, record["id"], session_date=date.today().isoformat())
+
+    sessions = client.get("/api/sessions/today?fields=status,has_risk", headers=auth_headers).json()
+    assert [set(session) for session in sessions] == [
+        {"id", "session_date", "session_time", "status", "has_risk", "first_name", "last_name"}
+    ]
@@ -0,0 +1,121 @@
+"""
+Session prep and the per-client stats its triggers keep
+"""
+import sqlite3
+
+import pytest
+
+import database
+from database import DATABASE_URL
+
+pytestmark = pytest.mark.integration
+
+
+def client_stats(client_id: int):
+    conn = sqlite3.connect(DATABASE_URL)
+    try:
+        return conn.execute(
+            "SELECT completed_sessions, first_session_date, last_session_date, open_todos"
+            " FROM client_stats WHERE client_id = ?", (client_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+
+def recomputed_stats(client_id: int):
+    conn = sqlite3.connect(DATABASE_URL)
+    try:
+        return conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM sessions WHERE client_id = :c AND status = 'completed'),
+                (SELECT MIN(session_date) FROM sessions WHERE client_id = :c),
+                (SELECT MAX(session_date) FROM sessions WHERE client_id = :c AND status = 'completed'),
+                (SELECT COUNT(*) FROM todos WHERE client_id = :c AND status = 'open')
+        """, {"c": client_id}).fetchone()
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def add_todo(client, auth_headers):
+    def add(client_id: int, text: str, source_session_id=None) -> dict:
+        response = client.post("/api/todos", headers=auth_headers, json={
+            "client_id": client_id, "text": text, "source_session_id": source_session_id
+        })
+        assert response.status_code in (200, 201), response.text
+        return response.json()
+    return add
+
+
+def test_stats_follow_every_session_and_todo_change(client, auth_headers, new_client, new_session, add_todo):
+    client_id = new_client(auth_headers)["id"]
+    first = new_session(auth_headers, client_id, session_date="2024-01-01")
+    middle = new_session(auth_headers, client_id, session_date="2024-02-01")
+    new_session(auth_headers, client_id, session_date="2024-03-01", status="scheduled")
+    todo = add_todo(client_id, "Journal daily", first["id"])
+    add_todo(client_id, "Walk")
+    assert client_stats(client_id) == (2, "2024-01-01", "2024-02-01", 2) == recomputed_stats(client_id)
+
+    client.put(f"/api/sessions/{middle['id']}", headers=auth_headers, json={"status": "cancelled"})
+    client.patch(f"/api/todos/{todo['id']}", headers=auth_headers, json={"status": "completed"})
+    assert client_stats(client_id) == (1, "2024-01-01", "2024-01-01", 1) == recomputed_stats(client_id)
+
+    client.delete(f"/api/sessions/{first['id']}", headers=auth_headers)
+    assert client_stats(client_id) == recomputed_stats(client_id)
+    assert client_stats(client_id)[:3] == (0, "2024-02-01", None)
+
+
+def test_session_prep_shows_the_last_session_todos_and_stats(
+        client, auth_headers, new_client, new_session, add_todo):
+    client_id = new_client(auth_headers)["id"]
+    oldest = new_session(auth_headers, client_id, session_date="2024-01-01", session_time="10:00")
+    new_session(auth_headers, client_id, session_date="2024-01-08", session_time="10:00")
+    latest = new_session(auth_headers, client_id, session_date="2024-01-15", session_time="10:00",
+                         notes="Talked about sleep")
+    new_session(auth_headers, client_id, session_date="2024-01-22", status="scheduled")
+    add_todo(client_id, "From the first session", oldest["id"])
+    add_todo(client_id, "From the latest session", latest["id"])
+
+    prep = client.get(f"/api/clients/{client_id}/session-prep", headers=auth_headers).json()
+
+    assert prep["last_session"]["id"] == latest["id"]
+    assert prep["last_session"]["notes"] == "Talked about sleep"
+    ago = {todo["text"]: todo["sessions_ago"] for todo in prep["open_todos"]}
+    assert ago == {"From the first session": 3, "From the latest session": 1}
+    assert prep["stats"]["total_sessions"] == 3
+    assert prep["stats"]["last_session_date"] == "2024-01-15"
+    assert prep["stats"]["open_todos"] == 2
+
+
+def test_session_prep_query_count_does_not_grow_with_todos(
+        client, auth_headers, new_client, new_session, add_todo, monkeypatch):
+    client_id = new_client(auth_headers)["id"]
+    session = new_session(auth_headers, client_id)
+    statements = []
+    original = database.open_connection
+
+    def open_traced(*args, **kwargs):
+        conn = original(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    database.close_pools()
+    monkeypatch.setattr(database, "open_connection", open_traced)
+
+    counts = []
+    for _ in range(2):
+        for index in range(5):
+            add_todo(client_id, f"Todo {index}", session["id"])
+        statements.clear()
+        assert client.get(f"/api/clients/{client_id}/session-prep", headers=auth_headers).status_code == 200
+        counts.append(len(statements))
+
+    assert counts[0] == counts[1] > 0
+
+
+def test_session_prep_for_another_therapists_client_is_not_found(client, therapist_headers, auth_headers, new_client):
+    client_id = new_client(auth_headers)["id"]
+
+    response = client.get(f"/api/clients/{client_id}/session-prep", headers=therapist_headers("user_2"))
+
+    assert response.status_code == 404
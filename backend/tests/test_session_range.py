@@ -0,0 +1,56 @@
+"""
+Calendar queries: /api/sessions/range
+"""
+import pytest
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def calendar(auth_headers, new_client, new_session):
+    """Sessions on either side of and inside 2024-03-10..2024-03-12"""
+    client_id = new_client(auth_headers, first_name="Ada", last_name="Lovelace")["id"]
+    for day, time, status in (("2024-03-01", "09:00", "scheduled"), ("2024-03-10", "15:00", "scheduled"),
+                              ("2024-03-10", "09:00", "completed"), ("2024-03-12", "11:00", "cancelled"),
+                              ("2024-03-13", "10:00", "scheduled")):
+        new_session(auth_headers, client_id, session_date=day, session_time=time, status=status)
+
+
+def dates(response) -> list:
+    assert response.status_code == 200, response.text
+    return [(row["session_date"], row["session_time"]) for row in response.json()]
+
+
+def test_range_is_inclusive_and_in_calendar_order(client, auth_headers, calendar):
+    response = client.get("/api/sessions/range?from=2024-03-10&to=2024-03-12", headers=auth_headers)
+
+    assert dates(response) == [("2024-03-10", "09:00"), ("2024-03-10", "15:00"), ("2024-03-12", "11:00")]
+    assert {(row["first_name"], row["last_name"]) for row in response.json()} == {("Ada", "Lovelace")}
+
+
+def test_range_filters_by_status(client, auth_headers, calendar):
+    response = client.get("/api/sessions/range?from=2024-03-10&to=2024-03-12&status=scheduled", headers=auth_headers)
+
+    assert dates(response) == [("2024-03-10", "15:00")]
+
+
+def test_without_from_past_due_appointments_are_included(client, auth_headers, calendar):
+    response = client.get("/api/sessions/range?to=2024-03-12&status=scheduled", headers=auth_headers)
+
+    assert dates(response) == [("2024-03-01", "09:00"), ("2024-03-10", "15:00")]
+
+
+def test_range_leaves_out_clinical_text(client, auth_headers, calendar):
+    rows = client.get("/api/sessions/range?to=2024-12-31", headers=auth_headers).json()
+
+    assert set(rows[0]) == {"id", "client_id", "session_date", "session_time", "duration_minutes",
+                            "status", "first_name", "last_name"}
+
+
+def test_other_therapists_sessions_are_not_in_range(client, therapist_headers, calendar):
+    assert client.get("/api/sessions/range?to=2024-12-31", headers=therapist_headers("user_2")).json() == []
+
+
+@pytest.mark.parametrize("query", ["from=2024-03-12&to=2024-03-10", "from=2024-03-10", "to=03/12/2024"])
+def test_invalid_range_is_rejected(client, auth_headers, query):
+    assert client.get(f"/api/sessions/range?{query}", headers=auth_headers).status_code == 422
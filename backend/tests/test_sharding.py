@@ -0,0 +1,164 @@
+"""
+Per-therapist shards: id ranges, the split tool, and the writes that span
+two database files (a message between therapists on different shards, an
+intake link with its directory route)
+
+Failures are injected with triggers that abort the second write, so those
+tests show that no half of the pair is left behind.
+"""
+import sqlite3
+
+import pytest
+
+from database import DATABASE_URL, SHARD_ID_BITS, shard_for_therapist
+
+pytestmark = pytest.mark.integration
+
+
+@pytest.fixture
+def shard_count():
+    return 2
+
+
+def abort_on(database: str, event: str, table: str) -> None:
+    """Make every `event` on `table` in a database file fail"""
+    conn = sqlite3.connect(database)
+    conn.execute(
+        f"CREATE TRIGGER fail_{event.split()[-1].lower()}_{table} BEFORE {event} ON {table}"
+        " BEGIN SELECT RAISE(ABORT, 'injected failure'); END"
+    )
+    conn.commit()
+    conn.close()
+
+
+def count(database: str, query: str, params=()) -> int:
+    conn = sqlite3.connect(database)
+    try:
+        return conn.execute(query, params).fetchone()[0]
+    finally:
+        conn.close()
+
+
+@pytest.fixture
+def two_therapists(client, therapist_headers, therapist_id):
+    sender, recipient = therapist_headers("user_1"), therapist_headers("user_2")
+    sender_id, recipient_id = therapist_id(sender), therapist_id(recipient)
+    assert shard_for_therapist(sender_id) != shard_for_therapist(recipient_id)
+    return sender, sender_id, recipient, recipient_id
+
+
+def send(client, headers, recipient_id, content="Hello"):
+    return client.post("/api/messages", headers=headers, json={
+        "recipient_id": recipient_id, "recipient_type": "therapist", "content": content
+    })
+
+
+def test_message_between_shards_is_stored_in_both(client, two_therapists):
+    sender, sender_id, recipient, recipient_id = two_therapists
+
+    response = send(client, sender, recipient_id)
+    assert response.status_code == 200
+
+    assert client.get("/api/messages/unread-count", headers=recipient).json()["unread_count"] == 1
+    assert count(shard_for_therapist(recipient_id), "SELECT COUNT(*) FROM messages WHERE mirror_id = ?",
+                 (response.json()["id"],)) == 1
+    assert count(shard_for_therapist(sender_id), "SELECT COUNT(*) FROM messages WHERE mirror_id IS NOT NULL") == 1
+
+
+def test_failed_recipient_copy_removes_the_senders(client, two_therapists):
+    sender, sender_id, recipient, recipient_id = two_therapists
+    abort_on(shard_for_therapist(recipient_id), "INSERT", "messages")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        send(client, sender, recipient_id)
+
+    assert count(shard_for_therapist(sender_id), "SELECT COUNT(*) FROM messages") == 0
+    assert count(shard_for_therapist(recipient_id), "SELECT COUNT(*) FROM messages") == 0
+
+
+def test_failed_link_back_removes_both_copies(client, two_therapists):
+    sender, sender_id, recipient, recipient_id = two_therapists
+    abort_on(shard_for_therapist(sender_id), "UPDATE OF mirror_id", "messages")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        send(client, sender, recipient_id)
+
+    assert count(shard_for_therapist(sender_id), "SELECT COUNT(*) FROM messages") == 0
+    assert count(shard_for_therapist(recipient_id), "SELECT COUNT(*) FROM messages") == 0
+    assert client.get("/api/messages/unread-count", headers=recipient).json()["unread_count"] == 0
+
+
+def test_intake_link_is_routed_from_the_directory(client, auth_headers, therapist_id):
+    therapist_id(auth_headers)
+    response = client.post("/api/intake/create-link", headers=auth_headers, json={
+        "client_email": "ada@example.com", "form_type": "therapy"
+    })
+    assert response.status_code == 200
+    token = response.json()["link_token"]
+
+    assert client.get(f"/api/intake/form/{token}").status_code == 200
+
+
+def test_failed_intake_link_leaves_no_route(client, auth_headers, therapist_id):
+    abort_on(shard_for_therapist(therapist_id(auth_headers)), "INSERT", "form_links")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        client.post("/api/intake/create-link", headers=auth_headers, json={
+            "client_email": "ada@example.com", "form_type": "therapy"
+        })
+
+    assert count(DATABASE_URL, "SELECT COUNT(*) FROM intake_link_routes") == 0
+
+
+def test_failed_route_leaves_no_intake_link(client, auth_headers, therapist_id):
+    shard = shard_for_therapist(therapist_id(auth_headers))
+    abort_on(DATABASE_URL, "INSERT", "intake_link_routes")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        client.post("/api/intake/create-link", headers=auth_headers, json={
+            "client_email": "ada@example.com", "form_type": "therapy"
+        })
+
+    assert count(shard, "SELECT COUNT(*) FROM form_links") == 0
+    assert count(shard, "SELECT COUNT(*) FROM intake_responses") == 0
+
+
+def test_each_shard_hands_out_ids_from_its_own_range(client, two_therapists, new_client):
+    sender, sender_id, recipient, recipient_id = two_therapists
+
+    for headers, therapist in ((sender, sender_id), (recipient, recipient_id)):
+        shard = therapist % 2
+        created = new_client(headers)
+        assert shard << SHARD_ID_BITS < created["id"] < (shard + 1) << SHARD_ID_BITS
+
+
+@pytest.mark.parametrize("shard_count", [0])
+def test_split_moves_each_therapists_data_to_their_shard(
+        client, monkeypatch, therapist_headers, therapist_id, new_client, new_session):
+    import database
+    import intake_routes
+    import split_shards
+
+    first, second = therapist_headers("user_1"), therapist_headers("user_2")
+    first_id, second_id = therapist_id(first), therapist_id(second)
+    ada = new_client(first, first_name="Ada")
+    new_session(first, ada["id"])
+    new_client(second, first_name="Grace")
+    sent = send(client, second, first_id, "Before the split").json()
+
+    for module in (database, intake_routes, split_shards):
+        monkeypatch.setattr(module, "SHARD_COUNT", 2)
+    assert split_shards.split_into_shards() == 0
+
+    assert count(DATABASE_URL, "SELECT COUNT(*) FROM clients") == 0
+    assert count(DATABASE_URL, "SELECT COUNT(*) FROM therapists") == 2
+    assert [c["first_name"] for c in client.get("/api/clients", headers=first).json()] == ["Ada"]
+    assert [c["first_name"] for c in client.get("/api/clients", headers=second).json()] == ["Grace"]
+    assert len(client.get("/api/sessions", headers=first).json()) == 1
+    # The message is in both shards, under the id it had
+    for headers, other_id in ((first, second_id), (second, first_id)):
+        thread = client.get(f"/api/messages/thread/{other_id}?other_party_type=therapist", headers=headers).json()
+        assert [message["id"] for message in thread] == [sent["id"]]
+    assert client.get("/api/messages/unread-count", headers=first).json()["unread_count"] == 1
+    # A second run finds the shards in use and changes nothing
+    assert split_shards.split_into_shards() == 1
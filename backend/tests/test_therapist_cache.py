@@ -0,0 +1,51 @@
+"""The in-process therapist cache (auth.therapist_cache)"""
+import threading
+
+import pytest
+
+import auth
+import main
+
+pytestmark = pytest.mark.auth
+
+
+def test_therapist_is_created_once_and_then_served_from_cache(client, auth_headers, monkeypatch):
+    loads = []
+    load_therapist = auth.load_therapist
+    monkeypatch.setattr(auth, "load_therapist", lambda user: loads.append(user) or load_therapist(user))
+
+    first = client.post("/api/auth/sync", headers=auth_headers).json()
+    for _ in range(3):
+        assert client.get("/api/auth/me", headers=auth_headers).json()["id"] == first["id"]
+    assert loads == ["user_1"]
+
+
+def test_cached_record_cannot_be_changed_by_a_caller(client, auth_headers):
+    client.post("/api/auth/sync", headers=auth_headers)
+    cached = auth.therapist_cache.get("user_1")
+    auth.get_current_therapist("user_1")["practice_type"] = "tampered"
+    assert auth.therapist_cache.get("user_1") == cached
+
+
+def test_practice_type_change_is_visible_straight_away(client, auth_headers):
+    client.post("/api/auth/sync", headers=auth_headers)
+    response = client.patch("/api/therapist/practice-type", headers=auth_headers,
+                            json={"practice_type": "coaching"})
+    assert response.json()["practice_type"] == "coaching"
+    assert client.get("/api/auth/me", headers=auth_headers).json()["practice_type"] == "coaching"
+
+
+def test_cache_miss_during_the_update_does_not_keep_the_old_row(client, auth_headers, monkeypatch):
+    client.post("/api/auth/sync", headers=auth_headers)
+
+    # Another request misses the cache right after the invalidation
+    def invalidate_then_reload(clerk_user_id):
+        auth.invalidate_therapist(clerk_user_id)
+        reload = threading.Thread(target=auth._load_and_cache_therapist, args=(clerk_user_id,))
+        reload.start()
+        reload.join()
+
+    monkeypatch.setattr(main, "invalidate_therapist", invalidate_then_reload)
+    client.patch("/api/therapist/practice-type", headers=auth_headers, json={"practice_type": "coaching"})
+
+    assert client.get("/api/auth/me", headers=auth_headers).json()["practice_type"] == "coaching"
@@ -0,0 +1,68 @@
+"""
+Route handlers that touch the database run on the threadpool, not the event loop
+"""
+import inspect
+import sqlite3
+import threading
+import time
+
+import pytest
+from fastapi.routing import APIRoute
+
+import main
+from database import DATABASE_URL
+
+BLOCKING_CALLS = ("get_db(", "requests.", "open(", ".write_bytes(", ".read_bytes(")
+
+
+def dependency_calls(dependant):
+    yield dependant.call
+    for sub in dependant.dependencies:
+        yield from dependency_calls(sub)
+
+
+@pytest.mark.unit
+def test_async_handlers_and_dependencies_do_no_blocking_io():
+    offenders = set()
+    for route in main.app.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        for call in dependency_calls(route.dependant):
+            if call is None or not inspect.iscoroutinefunction(call):
+                continue
+            source = inspect.getsource(call)
+            if any(blocking in source for blocking in BLOCKING_CALLS):
+                offenders.add(f"{call.__module__}.{call.__name__}")
+
+    assert offenders == set()
+
+
+@pytest.mark.integration
+def test_a_request_waiting_on_the_database_does_not_stall_others(client, auth_headers, therapist_id, new_client):
+    therapist_id(auth_headers)
+    new_client(auth_headers)
+
+    # Another process holds the write lock, so the next write waits in busy_timeout
+    locker = sqlite3.connect(DATABASE_URL)
+    locker.execute("BEGIN IMMEDIATE")
+    writes = []
+    writer = threading.Thread(target=lambda: writes.append(client.post(
+        "/api/clients", headers=auth_headers,
+        json={"first_name": "Blocked", "last_name": "Write", "date_of_birth": "1990-01-01"}
+    )))
+    try:
+        writer.start()
+        time.sleep(0.3)
+        assert writer.is_alive()
+
+        started = time.monotonic()
+        response = client.get("/api/clients", headers=auth_headers)
+        assert response.status_code == 200
+        assert time.monotonic() - started < 2
+        assert writer.is_alive()
+    finally:
+        locker.rollback()
+        locker.close()
+        writer.join(10)
+
+    assert writes[0].status_code in (200, 201)
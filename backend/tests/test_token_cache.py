@@ -0,0 +1,122 @@
+"""
+Verified-token cache in auth.verify_token and the cache helpers behind it
+"""
+import threading
+import time
+
+import pytest
+from jwt.algorithms import RSAAlgorithm
+
+import auth
+from cache import SingleFlight, TTLCache
+
+pytestmark = pytest.mark.auth
+
+
+@pytest.fixture
+def decodes(monkeypatch):
+    """Count full JWT verifications"""
+    calls = []
+    original = auth.jwt.decode
+
+    def counting(*args, **kwargs):
+        calls.append(args[0])
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(auth.jwt, "decode", counting)
+    return calls
+
+
+def test_a_repeated_token_is_verified_once(client, auth_headers, decodes):
+    for _ in range(3):
+        assert client.get("/api/clients", headers=auth_headers).status_code == 200
+
+    assert len(decodes) == 1
+
+
+def test_each_token_is_verified_on_its_own(client, therapist_headers, decodes):
+    for user in ("user_1", "user_2"):
+        assert client.get("/api/clients", headers=therapist_headers(user)).status_code == 200
+
+    assert len(decodes) == 2
+
+
+def test_a_cached_token_stops_working_when_it_expires(client, make_token, decodes):
+    headers = {"Authorization": f"Bearer {make_token('user_1', expires_in=1)}"}
+    assert client.get("/api/clients", headers=headers).status_code == 200
+
+    time.sleep(1.1)
+
+    response = client.get("/api/clients", headers=headers)
+    assert response.status_code == 401
+    assert len(decodes) == 2
+
+
+def test_a_rejected_token_is_not_cached(client, make_token, decodes):
+    # Someone else's claims under user_1's signature
+    header, _, signature = make_token("user_1").split(".")
+    forged = f"{header}.{make_token('user_2').split('.')[1]}.{signature}"
+
+    for _ in range(2):
+        assert client.get("/api/clients", headers={"Authorization": f"Bearer {forged}"}).status_code == 401
+
+    assert len(decodes) == 2
+
+
+def test_keys_are_parsed_when_fetched_not_per_request(client, therapist_headers, monkeypatch):
+    parsed = []
+    original = RSAAlgorithm.from_jwk
+    monkeypatch.setattr(RSAAlgorithm, "from_jwk", staticmethod(lambda jwk: parsed.append(jwk) or original(jwk)))
+
+    for user in ("user_1", "user_2", "user_3"):
+        assert client.get("/api/clients", headers=therapist_headers(user)).status_code == 200
+
+    assert parsed == []
+
+
+@pytest.mark.unit
+def test_ttl_cache_evicts_the_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+
+
+@pytest.mark.unit
+def test_ttl_cache_expires_at_the_earlier_of_ttl_and_expires_at(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("cache.time.time", lambda: now[0])
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set("ttl", 1)
+    cache.set("short", 2, expires_at=1010)
+
+    now[0] = 1010
+    assert (cache.get("ttl"), cache.get("short")) == (1, None)
+    now[0] = 1060
+    assert cache.get("ttl") is None
+
+
+@pytest.mark.unit
+def test_single_flight_runs_concurrent_calls_once():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["value"] * 5
@@ -0,0 +1,89 @@
+"""
+Single-statement write paths (UPDATE ... RETURNING, with a fallback for
+SQLite older than 3.35)
+"""
+import sqlite3
+
+import pytest
+
+import database
+from database import update_returning
+
+
+@pytest.fixture(params=[True, False], ids=["returning", "fallback"])
+def returning(request, monkeypatch):
+    if request.param and not sqlite3.sqlite_version_info >= (3, 35, 0):
+        pytest.skip("SQLite without RETURNING")
+    monkeypatch.setattr(database, "SUPPORTS_RETURNING", request.param)
+    return request.param
+
+
+@pytest.fixture
+def statements():
+    return []
+
+
+@pytest.fixture
+def conn(statements):
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, owner INTEGER, name TEXT)")
+    conn.executemany("INSERT INTO items (id, owner, name) VALUES (?, ?, ?)", [(1, 10, "a"), (2, 20, "b")])
+    conn.set_trace_callback(statements.append)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.unit
+def test_update_returns_the_updated_row(conn, statements, returning):
+    row = update_returning(conn, "items", ["name = ?"], ["renamed"], "id = ? AND owner = ?", (1, 10))
+
+    assert dict(row) == {"id": 1, "owner": 10, "name": "renamed"}
+    assert len(statements) == (1 if returning else 2)
+
+
+@pytest.mark.unit
+def test_where_clause_that_matches_nothing_returns_none_and_writes_nothing(conn, returning):
+    assert update_returning(conn, "items", ["name = ?"], ["stolen"], "id = ? AND owner = ?", (2, 10)) is None
+
+    assert conn.execute("SELECT name FROM items WHERE id = 2").fetchone()[0] == "b"
+
+
+@pytest.mark.integration
+def test_client_update_returns_the_row_and_checks_ownership(
+        client, auth_headers, therapist_headers, new_client, returning):
+    created = new_client(auth_headers, phone="555-0000")
+
+    response = client.put(f"/api/clients/{created['id']}", headers=auth_headers, json={"phone": "555-0100"})
+    assert response.status_code == 200
+    assert response.json()["phone"] == "555-0100"
+    assert response.json()["first_name"] == created["first_name"]
+
+    other = client.put(f"/api/clients/{created['id']}", headers=therapist_headers("user_2"), json={"phone": "x"})
+    assert other.status_code == 404
+    assert client.get(f"/api/clients/{created['id']}", headers=auth_headers).json()["phone"] == "555-0100"
+
+
+@pytest.mark.integration
+def test_cancel_returns_the_cancelled_session_with_its_content(
+        client, auth_headers, therapist_headers, new_client, new_session, returning):
+    session = new_session(auth_headers, new_client(auth_headers)["id"], status="scheduled", notes="Agenda")
+
+    assert client.patch(f"/api/sessions/{session['id']}/cancel", headers=therapist_headers("user_2")).status_code == 404
+
+    response = client.patch(f"/api/sessions/{session['id']}/cancel", headers=auth_headers)
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["notes"]) == ("cancelled", "Agenda")
+
+
+@pytest.mark.integration
+def test_todo_update_returns_the_row(client, auth_headers, therapist_headers, new_client, returning):
+    todo = client.post("/api/todos", headers=auth_headers,
+                       json={"client_id": new_client(auth_headers)["id"], "text": "Journal"}).json()
+
+    assert client.patch(f"/api/todos/{todo['id']}", headers=therapist_headers("user_2"),
+                        json={"status": "completed"}).status_code == 404
+
+    response = client.patch(f"/api/todos/{todo['id']}", headers=auth_headers, json={"status": "completed"})
+    assert response.status_code == 200
+    assert (response.json()["status"], response.json()["text"]) == ("completed", "Journal")
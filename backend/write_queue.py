@@ -0,0 +1,193 @@
+"""
+Group-commit write queue for high-frequency autosaves
+
+Autosave endpoints hand their write to a single background writer thread
+instead of committing inline. The writer waits a short window, collapses
+repeated writes to the same row into one, and commits everything it has
+collected in a single transaction per database file.
+
+Reads that must see queued writes flush only the writes of the therapist
+whose data they read, and only when that therapist has any queued: a
+busy read path does not cut every other therapist's commit window short.
+
+The caller has already answered its client by the time a write runs, so a
+write that fails is logged and remembered: the next submit() for the same
+key raises WriteFailed, and the route turns that into an error the client
+can react to by saving again.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from database import current_database, open_connection
+
+# How long the writer collects writes before committing them together
+GROUP_COMMIT_WINDOW = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "50")) / 1000
+
+ApplyFn = Callable[[sqlite3.Connection, Any], None]
+MergeFn = Callable[[Any, Any], Any]
+
+logger = logging.getLogger(__name__)
+
+
+class WriteFailed(RuntimeError):
+    """An earlier queued write with the same key could not be committed"""
+
+
+class GroupCommitWriter:
+    def __init__(self, window: float = GROUP_COMMIT_WINDOW):
+        self.window = window
+        self._pending: "OrderedDict[Tuple[str, Hashable], Tuple[ApplyFn, Any]]" = OrderedDict()
+        self._failed: Dict[Tuple[str, Hashable], Exception] = {}  # writes lost since last submit
+        self._owner_submitted: Dict[Hashable, int] = {}  # owner -> sequence of its last queued write
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._cond = threading.Condition()
+        self._submitted = 0  # sequence number of the last accepted write
+        self._committed = 0  # sequence number up to which writes are durable
+        self._stopping = False
+        self._flush_requested = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._stopping = False
+                self._thread = threading.Thread(
+                    target=self._run, name="group-commit-writer", daemon=True
+                )
+                self._thread.start()
+
+    def submit(
+        self,
+        key: Hashable,
+        apply: ApplyFn,
+        payload: Any,
+        merge: Optional[MergeFn] = None,
+        database: Optional[str] = None,
+        owner: Optional[Hashable] = None
+    ) -> None:
+        """
+        Queue a write
+
+        apply(conn, payload) runs later on the writer thread. If a write with
+        the same key is still queued, the two collapse into one: the newer
+        payload replaces the older, or merge(older, newer) combines them.
+        The write goes to the database the current request is routed to
+        unless one is given. owner (the therapist whose data the write
+        changes) is what flush(owner) waits for.
+
+        Raises WriteFailed, without queueing this write, if the previous
+        write with this key failed; the client should send its whole state
+        again.
+        """
+        self.start()
+        with self._cond:
+            slot = (database or current_database(), key)
+            error = self._failed.pop(slot, None)
+            if error is not None:
+                raise WriteFailed(f"Queued write {key!r} failed: {error}") from error
+            if slot in self._pending and merge is not None:
+                payload = merge(self._pending[slot][1], payload)
+            self._pending[slot] = (apply, payload)
+            self._submitted += 1
+            if owner is not None:
+                self._owner_submitted[owner] = self._submitted
+            self._cond.notify_all()
+
+    def flush(self, owner: Optional[Hashable] = None) -> None:
+        """
+        Block until every write queued so far for owner, or for anyone when
+        owner is None, has been committed
+
+        Returns at once when there is nothing of theirs queued; otherwise
+        the current group commits without waiting out its window.
+        """
+        with self._cond:
+            target = self._submitted if owner is None else self._owner_submitted.get(owner, 0)
+            if target <= self._committed:
+                return
+            self._flush_requested = True
+            self._cond.notify_all()
+            while self._committed < target and self._thread is not None and self._thread.is_alive():
+                self._cond.wait()
+
+    def stop(self) -> None:
+        """Commit queued writes and stop the writer thread"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        for conn in self._connections.values():
+            conn.close()
+        self._connections.clear()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if not self._pending and self._stopping:
+                    return
+
+            # Let more writes arrive (and collapse) before committing, unless
+            # someone is already waiting on flush() or we are shutting down
+            with self._cond:
+                deadline = time.monotonic() + self.window
+                while not (self._stopping or self._flush_requested):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                self._flush_requested = False
+                batch = self._pending
+                self._pending = OrderedDict()
+                sequence = self._submitted
+
+            self._commit(batch)
+
+            with self._cond:
+                self._committed = sequence
+                self._owner_submitted = {
+                    owner: submitted for owner, submitted in self._owner_submitted.items()
+                    if submitted > sequence
+                }
+                self._cond.notify_all()
+
+    def _commit(self, batch: "OrderedDict[Tuple[str, Hashable], Tuple[ApplyFn, Any]]") -> None:
+        by_database: Dict[str, list] = {}
+        for (database, key), write in batch.items():
+            by_database.setdefault(database, []).append((key, write))
+
+        for database, writes in by_database.items():
+            conn = self._connections.get(database)
+            if conn is None:
+                conn = self._connections[database] = open_connection(database)
+
+            try:
+                for _, (apply, payload) in writes:
+                    apply(conn, payload)
+                conn.commit()
+                continue
+            except Exception:
+                conn.rollback()
+
+            # One bad write must not sink the rest of the group; retry each
+            # on its own so only the failing one is lost
+            for key, (apply, payload) in writes:
+                try:
+                    apply(conn, payload)
+                    conn.commit()
+                except Exception as e:
+                    conn.rollback()
+                    logger.exception("Group commit write %r to %s failed", key, database)
+                    with self._cond:
+                        self._failed[(database, key)] = e
+
+
+writer = GroupCommitWriter()
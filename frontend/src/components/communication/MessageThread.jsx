@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useRef } from 'react'
 import './MessageThread.css'
 import RichMessageComposer from './RichMessageComposer'
+import { openEventStream } from '../../utils/eventStream'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
@@ -8,21 +9,43 @@ const MessageThread = ({ clientId, clientName }) => {
   const [messages, setMessages] = useState([])
   const [loading, setLoading] = useState(true)
   const [sending, setSending] = useState(false)
+  const [hasEarlier, setHasEarlier] = useState(false)
+  const [loadingEarlier, setLoadingEarlier] = useState(false)
   const messagesEndRef = useRef(null)
 
   useEffect(() => {
-    if (clientId) {
-      fetchMessages()
-      // Poll for new messages every 10 seconds
-      const interval = setInterval(fetchMessages, 10000)
-      return () => clearInterval(interval)
+    if (!clientId) return
+
+    let cancelled = false
+    let closeStream = null
+    const start = async () => {
+      const loaded = await fetchMessages()
+      if (cancelled) return
+      // New messages are pushed by the server; the stream first replays
+      // anything sent after the thread was loaded
+      const lastId = loaded.reduce((max, msg) => Math.max(max, msg.id), 0)
+      closeStream = openEventStream(
+        `${API_URL}/api/messages/stream?other_party_id=${clientId}&other_party_type=client`,
+        {
+          getHeaders: () => ({ 'Authorization': `Bearer ${localStorage.getItem('token')}` }),
+          lastEventId: String(lastId),
+          onEvent: handleStreamEvent
+        }
+      )
+    }
+    start()
+
+    return () => {
+      cancelled = true
+      if (closeStream) closeStream()
     }
   }, [clientId])
 
+  const lastMessageId = messages.length ? messages[messages.length - 1].id : null
   useEffect(() => {
-    // Scroll to bottom when new messages arrive
+    // Scroll to bottom when new messages arrive (not when older ones load)
     scrollToBottom()
-  }, [messages])
+  }, [lastMessageId])
 
   const fetchMessages = async () => {
     try {
@@ -35,33 +58,85 @@ const MessageThread = ({ clientId, clientName }) => {
         }
       )
       if (response.ok) {
+        // The latest page; older messages load on demand
         const data = await response.json()
         setMessages(data)
+        setHasEarlier(response.headers.get('X-Has-More') === 'true')
 
-        // Mark unread messages as read
-        data.forEach(msg => {
-          if (!msg.read && msg.recipient_type === 'therapist') {
-            markAsRead(msg.id)
-          }
-        })
+        markReceivedAsRead(data)
+        return data
       }
     } catch (err) {
       console.error('Error fetching messages:', err)
     } finally {
       setLoading(false)
     }
+    return []
   }
 
-  const markAsRead = async (messageId) => {
+  const loadEarlierMessages = async () => {
+    if (messages.length === 0) return
+    setLoadingEarlier(true)
     try {
-      await fetch(`${API_URL}/api/messages/${messageId}/read`, {
-        method: 'PATCH',
-        headers: {
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
+      const response = await fetch(
+        `${API_URL}/api/messages/thread/${clientId}?other_party_type=client&before_id=${messages[0].id}`,
+        {
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('token')}`
+          }
         }
-      })
+      )
+      if (response.ok) {
+        const earlier = await response.json()
+        setMessages(current => [...earlier, ...current])
+        setHasEarlier(response.headers.get('X-Has-More') === 'true')
+      }
+    } catch (err) {
+      console.error('Error loading earlier messages:', err)
+    } finally {
+      setLoadingEarlier(false)
+    }
+  }
+
+  const addMessage = (message) => {
+    setMessages(current => (
+      current.some(msg => msg.id === message.id) ? current : [...current, message]
+    ))
+  }
+
+  const handleStreamEvent = ({ event, data }) => {
+    if (event === 'resync') {
+      // Too much was missed to replay; reload the thread
+      fetchMessages()
+      return
+    }
+    if (event !== 'message') return
+
+    const message = JSON.parse(data)
+    addMessage(message)
+    markReceivedAsRead([message])
+  }
+
+  // Marks everything received up to the newest unread message in one request
+  const markReceivedAsRead = async (received) => {
+    const upToId = received.reduce(
+      (max, msg) => (!msg.read && msg.recipient_type === 'therapist' ? Math.max(max, msg.id) : max),
+      0
+    )
+    if (!upToId) return
+
+    try {
+      await fetch(
+        `${API_URL}/api/messages/thread/${clientId}/read?other_party_type=client&up_to_id=${upToId}`,
+        {
+          method: 'POST',
+          headers: {
+            'Authorization': `Bearer ${localStorage.getItem('token')}`
+          }
+        }
+      )
     } catch (err) {
-      console.error('Error marking message as read:', err)
+      console.error('Error marking messages as read:', err)
     }
   }
 
@@ -85,8 +160,8 @@ const MessageThread = ({ clientId, clientName }) => {
       })
 
       if (response.ok) {
-        const newMessage = await response.json()
-        setMessages([...messages, newMessage])
+        // The stream may have delivered it already
+        addMessage(await response.json())
       }
     } catch (err) {
       console.error('Error sending message:', err)
@@ -196,6 +271,15 @@ const MessageThread = ({ clientId, clientName }) => {
           </div>
         ) : (
           <>
+            {hasEarlier && (
+              <button
+                className="load-earlier-messages"
+                onClick={loadEarlierMessages}
+                disabled={loadingEarlier}
+              >
+                {loadingEarlier ? 'Loading...' : 'Load earlier messages'}
+              </button>
+            )}
             {messages.map((message) => (
               <div
                 key={message.id}
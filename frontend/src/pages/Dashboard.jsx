@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react'
+import { useState, useEffect, useRef } from 'react'
 import { useAuth, useUser, UserButton } from '@clerk/clerk-react'
 import { getTrackConfig } from '../config/tracks'
 import PracticeTypeModal from '../components/PracticeTypeModal'
@@ -10,6 +10,33 @@ import '../App.css'
 
 const API_BASE = import.meta.env.VITE_API_URL || 'http://localhost:8000/api'
 
+// Session fields the client view's cards show. The clinical text (insights,
+// homework, risk) is compressed on the server, so it comes with the full
+// session loaded on open rather than with every card. has_risk still flags
+// the cards whose session has a risk assessment
+const SESSION_LIST_FIELDS = [
+  'client_id', 'duration_minutes', 'status', 'overall_progress',
+  'life_domains', 'emotional_themes', 'interventions', 'session_summary', 'has_risk'
+].join(',')
+
+// List endpoints are paginated: follow X-Next-Cursor until the last page.
+// Pass a cursor to continue a list whose first page came from elsewhere.
+const fetchAllPages = async (url, token, startCursor = null) => {
+  const items = []
+  let cursor = startCursor
+  do {
+    const separator = url.includes('?') ? '&' : '?'
+    const pageUrl = cursor ? `${url}${separator}cursor=${encodeURIComponent(cursor)}` : url
+    const response = await fetch(pageUrl, {
+      headers: { 'Authorization': `Bearer ${token}` }
+    })
+    if (!response.ok) return { ok: false, items }
+    items.push(...await response.json())
+    cursor = response.headers.get('X-Next-Cursor')
+  } while (cursor)
+  return { ok: true, items }
+}
+
 // Loading Skeleton Components
 const TodaySessionSkeleton = () => (
   <div className="skeleton-today-card">
@@ -141,6 +168,9 @@ function Dashboard() {
   // Session prep state
   const [sessionPrep, setSessionPrep] = useState(null)
 
+  // Set once the bootstrap request has loaded the current view
+  const bootstrapped = useRef(false)
+
   useEffect(() => {
     const initializeUser = async () => {
       try {
@@ -148,17 +178,19 @@ function Dashboard() {
 
         const token = await getToken()
 
-        // Sync therapist record and get practice_type
-        const syncResponse = await fetch(`${API_BASE}/auth/sync`, {
-          method: 'POST',
+        // One request for first paint: the therapist record (created on
+        // first login), the first page of clients and the current view
+        const view = appView === 'scheduled' ? 'scheduled' : 'today'
+        const bootstrapResponse = await fetch(`${API_BASE}/dashboard/bootstrap?include=clients,${view}`, {
           headers: { 'Authorization': `Bearer ${token}` }
         })
 
-        if (!syncResponse.ok) {
-          throw new Error('Failed to sync user')
+        if (!bootstrapResponse.ok) {
+          throw new Error('Failed to load dashboard')
         }
 
-        const therapistData = await syncResponse.json()
+        const bootstrap = await bootstrapResponse.json()
+        const therapistData = bootstrap.therapist
         console.log('Therapist data:', therapistData)
 
         // Set practice type from backend
@@ -171,15 +203,22 @@ function Dashboard() {
           return
         }
 
-        // Load dashboard data
-        fetchClients()
-        if (appView === 'today') {
-          fetchTodaySessions()
-        } else if (appView === 'scheduled') {
-          fetchAllScheduledSessions()
+        if (bootstrap.today_sessions) setTodaySessions(bootstrap.today_sessions)
+        if (bootstrap.scheduled_sessions) setAllScheduledSessions(bootstrap.scheduled_sessions)
+        bootstrapped.current = true
+
+        let clientList = bootstrap.clients
+        if (bootstrap.clients_next_cursor) {
+          const { ok, items } = await fetchAllPages(`${API_BASE}/clients`, token, bootstrap.clients_next_cursor)
+          if (!ok) throw new Error('Failed to fetch clients')
+          clientList = clientList.concat(items)
         }
+        setClients(clientList)
+        setError(null)
+        setLoading(false)
       } catch (err) {
         setError(err.message)
+        bootstrapped.current = true
         setLoading(false)
       }
     }
@@ -188,9 +227,7 @@ function Dashboard() {
 
   useEffect(() => {
     if (selectedClient) {
-      fetchSessions(selectedClient.id)
-      fetchTodos(selectedClient.id)
-      fetchSessionPrep(selectedClient.id)
+      fetchClientWorkspace(selectedClient.id)
       setClientView('summary')
     } else {
       setClientTodos([])
@@ -199,6 +236,8 @@ function Dashboard() {
   }, [selectedClient])
 
   useEffect(() => {
+    // The initial view comes with the bootstrap request
+    if (!bootstrapped.current) return
     if (appView === 'today') {
       fetchTodaySessions()
     } else if (appView === 'scheduled') {
@@ -210,12 +249,9 @@ function Dashboard() {
     try {
       setLoading(true)
       const token = await getToken()
-      const response = await fetch(`${API_BASE}/clients`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      })
-      if (!response.ok) throw new Error('Failed to fetch clients')
-      const data = await response.json()
-      setClients(data)
+      const { ok, items } = await fetchAllPages(`${API_BASE}/clients`, token)
+      if (!ok) throw new Error('Failed to fetch clients')
+      setClients(items)
       setError(null)
     } catch (err) {
       setError(err.message)
@@ -227,12 +263,37 @@ function Dashboard() {
   const fetchSessions = async (clientId) => {
     try {
       const token = await getToken()
-      const response = await fetch(`${API_BASE}/sessions?client_id=${clientId}`, {
+      const { ok, items } = await fetchAllPages(`${API_BASE}/sessions?client_id=${clientId}&fields=${SESSION_LIST_FIELDS}`, token)
+      if (!ok) throw new Error('Failed to fetch sessions')
+      setSessions(items)
+    } catch (err) {
+      setError(err.message)
+    }
+  }
+
+  // Sessions, open todos and session prep for a client in one request
+  const fetchClientWorkspace = async (clientId) => {
+    try {
+      const token = await getToken()
+      const params = new URLSearchParams({ fields: SESSION_LIST_FIELDS, todo_status: 'open' })
+      const response = await fetch(`${API_BASE}/clients/${clientId}/workspace?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
-      if (!response.ok) throw new Error('Failed to fetch sessions')
-      const data = await response.json()
-      setSessions(data)
+      if (!response.ok) throw new Error('Failed to fetch client')
+      const workspace = await response.json()
+
+      let sessionList = workspace.sessions
+      if (workspace.sessions_next_cursor) {
+        const { ok, items } = await fetchAllPages(
+          `${API_BASE}/sessions?client_id=${clientId}&fields=${SESSION_LIST_FIELDS}`,
+          token, workspace.sessions_next_cursor
+        )
+        if (!ok) throw new Error('Failed to fetch sessions')
+        sessionList = sessionList.concat(items)
+      }
+      setSessions(sessionList)
+      setClientTodos(workspace.todos)
+      setSessionPrep(workspace.session_prep)
     } catch (err) {
       setError(err.message)
     }
@@ -255,21 +316,34 @@ function Dashboard() {
   const fetchAllScheduledSessions = async () => {
     try {
       const token = await getToken()
-      const response = await fetch(`${API_BASE}/sessions`, {
+      // Appointments still scheduled, past-due ones included, through the
+      // next year; already sorted by date/time
+      const to = new Date()
+      to.setFullYear(to.getFullYear() + 1)
+      const params = new URLSearchParams({
+        to: to.toISOString().split('T')[0],
+        status: 'scheduled'
+      })
+      const response = await fetch(`${API_BASE}/sessions/range?${params}`, {
         headers: { 'Authorization': `Bearer ${token}` }
       })
       if (!response.ok) throw new Error('Failed to fetch scheduled sessions')
       const data = await response.json()
-      // Filter for scheduled sessions and sort by date/time
-      const scheduled = data
-        .filter(s => s.status === 'scheduled')
-        .sort((a, b) => {
-          if (a.session_date === b.session_date) {
-            return (a.session_time || '').localeCompare(b.session_time || '')
-          }
-          return a.session_date.localeCompare(b.session_date)
-        })
-      setAllScheduledSessions(scheduled)
+      setAllScheduledSessions(data)
+    } catch (err) {
+      setError(err.message)
+    }
+  }
+
+  // List and calendar entries are partial; load the full session before opening it
+  const openSessionById = async (sessionId) => {
+    try {
+      const token = await getToken()
+      const response = await fetch(`${API_BASE}/sessions/${sessionId}`, {
+        headers: { 'Authorization': `Bearer ${token}` }
+      })
+      if (!response.ok) throw new Error('Failed to fetch session')
+      openSession(await response.json())
     } catch (err) {
       setError(err.message)
     }
@@ -336,20 +410,6 @@ function Dashboard() {
     }
   }
 
-  const fetchSessionPrep = async (clientId) => {
-    try {
-      const token = await getToken()
-      const response = await fetch(`${API_BASE}/clients/${clientId}/session-prep`, {
-        headers: { 'Authorization': `Bearer ${token}` }
-      })
-      if (!response.ok) throw new Error('Failed to fetch session prep')
-      const data = await response.json()
-      setSessionPrep(data)
-    } catch (err) {
-      setError(err.message)
-    }
-  }
-
   const handleClientSubmit = async (e) => {
     e.preventDefault()
     try {
@@ -663,7 +723,7 @@ function Dashboard() {
           ) : (
             <div className="today-sessions-list">
               {todaySessions.map(session => (
-                <div key={session.id} className={`today-session-card status-${session.status}`} onClick={() => openSession(session)}>
+                <div key={session.id} className={`today-session-card status-${session.status}`} onClick={() => openSessionById(session.id)}>
                   <div className="session-time-block">
                     <div className="time-display">
                       {formatTime(session.session_time)} - {formatTime(calculateEndTime(session.session_time, session.duration_minutes))}
@@ -700,7 +760,7 @@ function Dashboard() {
                   <div className="session-actions" onClick={(e) => e.stopPropagation()}>
                     <button className="btn-view" onClick={(e) => {
                       e.stopPropagation()
-                      openSession(session)
+                      openSessionById(session.id)
                     }}>View</button>
                     {session.status === 'scheduled' && (
                       <button className="btn-cancel" onClick={(e) => {
@@ -743,7 +803,7 @@ function Dashboard() {
                 if (!client) return null
 
                 return (
-                  <div key={session.id} className="scheduled-appointment-card" onClick={() => openSession(session)}>
+                  <div key={session.id} className="scheduled-appointment-card" onClick={() => openSessionById(session.id)}>
                     <div className="appointment-date-section">
                       <div className="appointment-date">
                         {new Date(session.session_date).toLocaleDateString('en-US', { weekday: 'short', month: 'short', day: 'numeric' })}
@@ -771,7 +831,7 @@ function Dashboard() {
                     <div className="appointment-actions" onClick={(e) => e.stopPropagation()}>
                       <button className="btn-view" onClick={(e) => {
                         e.stopPropagation()
-                        openSession(session)
+                        openSessionById(session.id)
                       }}>View Details</button>
                       <button className="btn-cancel" onClick={(e) => {
                         e.stopPropagation()
@@ -1331,7 +1391,7 @@ function Dashboard() {
                       <h3>Recent {trackConfig.sessionTermPlural}</h3>
                       <div className="recent-sessions-list">
                         {sessions.slice(0, 5).map(session => (
-                          <div key={session.id} className="recent-session-item" onClick={() => openSession(session)}>
+                          <div key={session.id} className="recent-session-item" onClick={() => openSessionById(session.id)}>
                             <div className="recent-session-date">
                               {new Date(session.session_date).toLocaleDateString('en-US', { month: 'short', day: 'numeric', year: 'numeric' })}
                               {session.session_time && ` • ${formatTime(session.session_time)}`}
@@ -1439,7 +1499,7 @@ function Dashboard() {
                   ) : (
                     <div className="sessions-grid">
                       {sessions.map(session => (
-                        <div key={session.id} className="session-card" onClick={() => openSession(session)}>
+                        <div key={session.id} className="session-card" onClick={() => openSessionById(session.id)}>
                           <div className="session-card-header">
                             <div>
                               <div className="session-date">
@@ -1490,21 +1550,9 @@ function Dashboard() {
                             </div>
                           )}
 
-                          {session.client_insights && (
-                            <div className="session-text">
-                              <strong>Insights:</strong> {session.client_insights}
-                            </div>
-                          )}
-
-                          {session.homework_assigned && (
-                            <div className="session-text">
-                              <strong>Homework:</strong> {session.homework_assigned}
-                            </div>
-                          )}
-
-                          {session.risk_assessment && (
+                          {session.has_risk && (
                             <div className="session-risk">
-                              <strong>⚠️ Risk:</strong> {session.risk_assessment}
+                              <strong>⚠️ Risk:</strong> assessment recorded, open the {trackConfig.sessionTerm.toLowerCase()} to read it
                             </div>
                           )}
                         </div>
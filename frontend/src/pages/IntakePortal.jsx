@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useParams } from 'react-router-dom'
 import './IntakePortal.css'
 import { getIntakeFormByPracticeType } from '../config/intakeForms'
@@ -17,6 +17,8 @@ const IntakePortal = () => {
 
   const [currentStep, setCurrentStep] = useState(0)
   const [responses, setResponses] = useState({})
+  // Newest answers, for resending after a lost save
+  const latestResponses = useRef({})
   const [saving, setSaving] = useState(false)
   const [completed, setCompleted] = useState(false)
 
@@ -48,6 +50,7 @@ const IntakePortal = () => {
       setAssessments(data.included_assessments || [])
       setClientName(data.client_name || '')
       setResponses(data.existing_responses || {})
+      latestResponses.current = data.existing_responses || {}
 
       if (data.status === 'completed') {
         setCompleted(true)
@@ -63,11 +66,15 @@ const IntakePortal = () => {
   const saveProgress = async (newResponses) => {
     setSaving(true)
     try {
-      await fetch(`${API_URL}/api/intake/submit/${token}`, {
+      const response = await fetch(`${API_URL}/api/intake/submit/${token}`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(newResponses)
       })
+      // An earlier save was lost on the server: send the newest answers again
+      if (response.status === 503) {
+        await saveProgress(latestResponses.current)
+      }
     } catch (err) {
       console.error('Error saving:', err)
     } finally {
@@ -78,6 +85,7 @@ const IntakePortal = () => {
   const handleFieldChange = (fieldId, value) => {
     const newResponses = { ...responses, [fieldId]: value }
     setResponses(newResponses)
+    latestResponses.current = newResponses
 
     // Debounced auto-save
     if (window.saveTimeout) clearTimeout(window.saveTimeout)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react'
+import React, { useState, useEffect, useRef } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
 import './SessionSummary.css'
 
@@ -10,6 +10,7 @@ import ClarifyingQuestions from '../components/session-summary/ClarifyingQuestio
 import SummaryTab from '../components/session-summary/SummaryTab'
 import TranscriptTab from '../components/session-summary/TranscriptTab'
 import SessionToDos from '../components/communication/SessionToDos'
+import { createJsonPatch } from '../utils/jsonPatch'
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000'
 
@@ -22,6 +23,7 @@ const SessionSummary = () => {
   const [loading, setLoading] = useState(true)
   const [saving, setSaving] = useState(false)
   const [lastSaved, setLastSaved] = useState(null)
+  const [saveRetries, setSaveRetries] = useState(0)
 
   // Active tab
   const [activeTab, setActiveTab] = useState('review') // review | summary | transcript | todos
@@ -36,6 +38,11 @@ const SessionSummary = () => {
   const [transcript, setTranscript] = useState(null)
   const [isFinalized, setIsFinalized] = useState(false)
 
+  // Last ai_assisted_data the server confirmed, and its version, so
+  // autosaves can send only what changed
+  const savedData = useRef(null)
+  const savedVersion = useRef(0)
+
   // Load session data
   useEffect(() => {
     if (sessionId) {
@@ -65,11 +72,14 @@ const SessionSummary = () => {
           status: data.status
         })
 
+        savedVersion.current = data.ai_assisted_data_version || 0
+
         // Load AI-assisted data if it exists
         if (data.ai_assisted_data) {
           const aiData = typeof data.ai_assisted_data === 'string'
             ? JSON.parse(data.ai_assisted_data)
             : data.ai_assisted_data
+          savedData.current = aiData
 
           setEmotions(aiData.emotions || [])
           setLifeDomains(aiData.lifeDomains || [])
@@ -97,7 +107,7 @@ const SessionSummary = () => {
     }, 2000) // Auto-save 2 seconds after last change
 
     return () => clearTimeout(autoSaveTimer)
-  }, [emotions, lifeDomains, interventions, clarifyingQuestions, draftSummary, therapistNotes, transcript])
+  }, [emotions, lifeDomains, interventions, clarifyingQuestions, draftSummary, therapistNotes, transcript, saveRetries])
 
   const saveSessionData = async () => {
     if (isFinalized) return // Don't auto-save finalized sessions
@@ -115,19 +125,48 @@ const SessionSummary = () => {
         isFinalized
       }
 
-      const response = await fetch(`${API_URL}/api/sessions/${sessionId}`, {
-        method: 'PUT',
-        headers: {
-          'Content-Type': 'application/json',
-          'Authorization': `Bearer ${localStorage.getItem('token')}`
-        },
-        body: JSON.stringify({
-          ai_assisted_data: JSON.stringify(aiAssistedData)
+      const headers = {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${localStorage.getItem('token')}`
+      }
+      let response = null
+
+      // Send a JSON Patch against the last saved copy when there is one
+      if (savedData.current) {
+        const operations = createJsonPatch(savedData.current, aiAssistedData)
+        if (operations.length === 0) return
+
+        response = await fetch(`${API_URL}/api/sessions/${sessionId}/ai-data`, {
+          method: 'PATCH',
+          headers: {
+            ...headers,
+            'Content-Type': 'application/json-patch+json',
+            'If-Match': `"${savedVersion.current}"`
+          },
+          body: JSON.stringify(operations)
         })
-      })
+      }
+
+      // First save, or our copy went stale (412): send the whole document
+      if (!response || response.status === 412) {
+        response = await fetch(`${API_URL}/api/sessions/${sessionId}`, {
+          method: 'PUT',
+          headers,
+          body: JSON.stringify({
+            ai_assisted_data: JSON.stringify(aiAssistedData)
+          })
+        })
+      }
 
       if (response.ok) {
+        const result = await response.json()
+        savedVersion.current = result.ai_assisted_data_version
+        savedData.current = JSON.parse(JSON.stringify(aiAssistedData))
         setLastSaved(new Date())
+      } else if (response.status === 503) {
+        // An earlier autosave was lost on the server: resend everything
+        savedData.current = null
+        setSaveRetries(n => n + 1)
       }
     } catch (error) {
       console.error('Error saving session:', error)
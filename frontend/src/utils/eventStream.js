@@ -0,0 +1,88 @@
+/**
+ * Server-Sent Events over fetch
+ *
+ * EventSource cannot send an Authorization header, so streams are read
+ * with fetch. Like EventSource, a dropped stream is reopened after the
+ * server's `retry:` delay with the last event id in Last-Event-ID, so the
+ * server can replay what was missed.
+ */
+
+const DEFAULT_RETRY_MS = 3000
+
+/**
+ * Parse one SSE block ("field: value" lines) into an event.
+ *
+ * @param {string} block - Text between two blank lines
+ * @returns {{event: string, id: ?string, data: string, retry: ?number}}
+ */
+const parseBlock = (block) => {
+  const event = { event: 'message', id: null, data: '', retry: null }
+  const data = []
+  for (const line of block.split('\n')) {
+    if (!line || line.startsWith(':')) continue // Heartbeat comments
+    const colon = line.indexOf(':')
+    const field = colon === -1 ? line : line.slice(0, colon)
+    const value = colon === -1 ? '' : line.slice(colon + 1).replace(/^ /, '')
+    if (field === 'data') data.push(value)
+    else if (field === 'event') event.event = value
+    else if (field === 'id') event.id = value
+    else if (field === 'retry' && /^\d+$/.test(value)) event.retry = Number(value)
+  }
+  event.data = data.join('\n')
+  return event
+}
+
+/**
+ * Open a stream and keep it open until the returned function is called.
+ *
+ * @param {string} url - Stream URL
+ * @param {Object} options
+ * @param {Function} options.getHeaders - Request headers, read on every (re)connect
+ * @param {?string} [options.lastEventId] - Id to resume after on the first connect
+ * @param {Function} options.onEvent - Called with {event, id, data} for each event
+ * @returns {Function} Closes the stream
+ */
+export const openEventStream = (url, { getHeaders, lastEventId = null, onEvent }) => {
+  const controller = new AbortController()
+  let lastId = lastEventId
+  let retryMs = DEFAULT_RETRY_MS
+  let closed = false
+
+  const connect = async () => {
+    while (!closed) {
+      try {
+        const headers = { ...getHeaders(), Accept: 'text/event-stream' }
+        if (lastId !== null) headers['Last-Event-ID'] = lastId
+        const response = await fetch(url, { headers, signal: controller.signal })
+        if (!response.ok || !response.body) throw new Error(`Stream failed: ${response.status}`)
+
+        const reader = response.body.pipeThrough(new TextDecoderStream()).getReader()
+        let buffer = ''
+        while (true) {
+          const { value, done } = await reader.read()
+          if (done) break
+          buffer += value.replace(/\r\n?/g, '\n')
+          let end
+          while ((end = buffer.indexOf('\n\n')) !== -1) {
+            const event = parseBlock(buffer.slice(0, end))
+            buffer = buffer.slice(end + 2)
+            if (event.retry !== null) retryMs = event.retry
+            if (event.id !== null) lastId = event.id
+            if (event.data) onEvent(event)
+          }
+        }
+      } catch (err) {
+        if (closed) return
+        console.error('Message stream interrupted:', err)
+      }
+      if (!closed) await new Promise(resolve => setTimeout(resolve, retryMs))
+    }
+  }
+
+  connect()
+
+  return () => {
+    closed = true
+    controller.abort()
+  }
+}
@@ -0,0 +1,49 @@
+/**
+ * RFC 6902 JSON Patch generation for autosaves
+ */
+
+const escapePointer = (key) => String(key).replace(/~/g, '~0').replace(/\//g, '~1')
+
+const isPlainObject = (value) => value !== null && typeof value === 'object' && !Array.isArray(value)
+
+const hasValue = (object, key) => Object.prototype.hasOwnProperty.call(object, key) && object[key] !== undefined
+
+/**
+ * Build the operations that turn `before` into `after`.
+ * Objects are diffed key by key and equal-length arrays element by element;
+ * anything else that differs is replaced whole.
+ *
+ * @param {*} before - Last saved document
+ * @param {*} after - Current document
+ * @param {string} [path] - JSON pointer of the values being compared
+ * @returns {Array<Object>} Patch operations (empty when nothing changed)
+ */
+export const createJsonPatch = (before, after, path = '') => {
+  if (before === after) return []
+
+  if (isPlainObject(before) && isPlainObject(after)) {
+    const operations = []
+    for (const key of Object.keys(before)) {
+      if (hasValue(before, key) && !hasValue(after, key)) {
+        operations.push({ op: 'remove', path: `${path}/${escapePointer(key)}` })
+      }
+    }
+    for (const [key, value] of Object.entries(after)) {
+      if (value === undefined) continue
+      const childPath = `${path}/${escapePointer(key)}`
+      if (!hasValue(before, key)) {
+        operations.push({ op: 'add', path: childPath, value })
+      } else {
+        operations.push(...createJsonPatch(before[key], value, childPath))
+      }
+    }
+    return operations
+  }
+
+  if (Array.isArray(before) && Array.isArray(after) && before.length === after.length) {
+    return before.flatMap((item, index) => createJsonPatch(item, after[index], `${path}/${index}`))
+  }
+
+  if (JSON.stringify(before) === JSON.stringify(after)) return []
+  return [{ op: 'replace', path, value: after }]
+}